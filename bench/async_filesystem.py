@@ -0,0 +1,58 @@
+from src.async_filesystem_module import AsyncFileSystemManager
+from src.filesystem_module import FileSystemManager
+from src.process_module import Process
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+def run_sync(base_dir, files, content, process):
+    fsm = FileSystemManager(base_dir=base_dir, blocks=files * 2, block_size=len(content))
+
+    started_at = time.perf_counter()
+    for index in range(files):
+        fsm.create(content, f'dir{index % 16}/file{index}', process)
+    for index in range(files):
+        fsm.read(f'dir{index % 16}/file{index}')
+    for index in range(files):
+        fsm.delete(f'dir{index % 16}/file{index}', process)
+    return time.perf_counter() - started_at
+
+async def run_async(base_dir, files, content, process, workers):
+    afsm = AsyncFileSystemManager(FileSystemManager(base_dir=base_dir, blocks=files * 2, block_size=len(content)), max_workers=workers)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[afsm.create(content, f'dir{index % 16}/file{index}', process) for index in range(files)])
+    await asyncio.gather(*[afsm.read(f'dir{index % 16}/file{index}') for index in range(files)])
+    await asyncio.gather(*[afsm.delete(f'dir{index % 16}/file{index}', process) for index in range(files)])
+    elapsed = time.perf_counter() - started_at
+
+    afsm.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='compares the sync and async filesystem APIs on the same workload')
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=8192)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    process = Process(pid='bench', priority=Process.TYPE_REALTIME)
+    content = os.urandom(args.size)
+    operations = args.files * 3
+
+    base_dir = tempfile.mkdtemp()
+    try:
+        elapsed = run_sync(base_dir + '/sync/', args.files, content, process)
+        print(f'sync:  {operations / elapsed:10.0f} ops/s ({elapsed:.3f}s)')
+
+        elapsed = asyncio.run(run_async(base_dir + '/async/', args.files, content, process, args.workers))
+        print(f'async: {operations / elapsed:10.0f} ops/s ({elapsed:.3f}s, {args.workers} workers)')
+    finally:
+        shutil.rmtree(base_dir)
+
+if __name__ == '__main__':
+    main()
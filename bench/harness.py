@@ -0,0 +1,70 @@
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, max(0, round(fraction * (len(samples) - 1))))
+    return samples[index]
+
+def measure(prepare, warmup=1, repeats=5):
+    # prepare() builds a fresh state untimed and returns the callable to time
+    for _ in range(warmup):
+        prepare()()
+
+    samples = []
+    for _ in range(repeats):
+        run = prepare()
+        gc.collect()
+        started_at = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started_at)
+
+    # tracing slows everything down, so peak memory is measured on a run of its own
+    run = prepare()
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median': statistics.median(samples),
+        'p95': percentile(samples, 0.95),
+        'min': min(samples),
+        'repeats': repeats,
+        'peak_bytes': peak,
+    }
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump({
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        }, f, indent=2)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare(baseline, results, threshold=0.1):
+    # yields (name, baseline median, median, ratio, regressed) for the benchmarks present in both runs
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+
+        ratio = result['median'] / previous['median'] if previous['median'] else float('inf')
+        yield name, previous['median'], result['median'], ratio, ratio > 1 + threshold
@@ -0,0 +1,137 @@
+from bench.harness import compare, load_results, measure, save_results
+from src.filesystem_module import FileSystemManager
+from src.memory_module import MemoryManager
+from src.mini_os import MiniOS
+from src.process_module import Process
+from src.queue_module import QueueManager
+
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+def bench_filesystem_write(blocks, directory):
+    # fills half the disk with one block files, then rewrites every other one twice as large
+    def prepare():
+        fsm = FileSystemManager(base_dir='', blocks=blocks, block_size=64, disk_image=os.path.join(tempfile.mkdtemp(dir=directory), 'sda1.img'))
+        process = Process(pid='bench', priority=Process.TYPE_REALTIME)
+        small, large = b'a' * 64, b'b' * 128
+
+        def run():
+            for index in range(blocks // 2):
+                fsm._write(small, f'dir{index % 16}/file{index}', process)
+            for index in range(0, blocks // 2, 2):
+                fsm._write(large, f'dir{index % 16}/file{index}', process)
+            fsm.close()
+        return run
+    return prepare
+
+def bench_memory_assign(blocks, directory):
+    # fills the pool with processes of 1 to 8 blocks, frees every other one and fills it again
+    def prepare():
+        mm = MemoryManager(blocks={Process.TYPE_USER: blocks})
+        sizes = random.Random(0).choices(range(1, 9), k=blocks // 4)
+        processes = [Process(f'p{index}', priority=Process.TYPE_USER) for index in range(len(sizes) * 2)]
+
+        def run():
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                for process, n in zip(processes, sizes):
+                    mm.assign_memory_blocks(n, process)
+                for process in processes[:len(sizes):2]:
+                    mm.free_memory_blocks(process)
+                for process, n in zip(processes[len(sizes):], sizes):
+                    mm.assign_memory_blocks(n, process)
+        return run
+    return prepare
+
+def bench_queue_run(processes, directory):
+    # runs processes of random priorities and bursts until every queue is empty
+    def prepare():
+        rng = random.Random(0)
+        qm = QueueManager(aging=1, max_process_age=2)
+        for index in range(processes):
+            qm.add_process(Process(f'p{index}', priority=rng.randint(0, 3), cpu_time=rng.randint(1, 8)))
+
+        def run():
+            while len(qm):
+                qm.run_processes()
+        return run
+    return prepare
+
+def bench_mini_os_run(processes, directory):
+    # runs a whole trace of processes arriving over time, without sleeping or printing
+    rng = random.Random(0)
+    processes_path = os.path.join(directory, f'processes_{processes}.txt')
+    with open(processes_path, 'w') as f:
+        for index in range(processes):
+            f.write(f'{index // 2}, {rng.choice((0, 1, 3))}, {rng.randint(1, 8)}, 1, {rng.randint(0, 1)}, 0, 0, 0\n')
+
+    files_path = os.path.join(directory, 'files.txt')
+    with open(files_path, 'w') as f:
+        f.write('64\n1\nX, 0, 8\n')
+
+    def prepare():
+        mini_os = MiniOS(time_scale=0, user_memory_blocks=processes, realtime_memory_blocks=processes)
+
+        def run():
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                mini_os.start(processes_path, files_path)
+        return run
+    return prepare
+
+BENCHMARKS = {
+    'filesystem_write': (bench_filesystem_write, [1024, 16384]),
+    'memory_assign': (bench_memory_assign, [1024, 16384]),
+    'queue_run': (bench_queue_run, [100, 2000]),
+    'mini_os_run': (bench_mini_os_run, [100, 2000]),
+}
+
+def run_suite(names, quick, warmup, repeats, directory):
+    results = {}
+    for name in names:
+        benchmark, sizes = BENCHMARKS[name]
+        for size in sizes[:1] if quick else sizes:
+            result = measure(benchmark(size, directory), warmup, repeats)
+            results[f'{name}[{size}]'] = result
+            print(f'{name}[{size}]'.ljust(28) + f'median {result["median"] * 1e3:9.3f}ms  p95 {result["p95"] * 1e3:9.3f}ms  peak {result["peak_bytes"] / 1024:9.1f}KiB')
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='times the allocators, the scheduler, the filesystem and whole MiniOS runs')
+    parser.add_argument('benchmarks', nargs='*', help=f'benchmarks to run out of {", ".join(BENCHMARKS)}, all of them by default')
+    parser.add_argument('--quick', action='store_true', help='runs only the smallest size of each benchmark')
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help='JSON file to save the results to')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown of the median reported as a regression')
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name}')
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = run_suite(args.benchmarks or list(BENCHMARKS), args.quick, args.warmup, args.repeats, directory)
+    finally:
+        shutil.rmtree(directory)
+
+    if args.output:
+        save_results(results, args.output)
+
+    regressions = 0
+    if args.compare:
+        baseline = load_results(args.compare)
+        print(f'\ncompared to {baseline["commit"]}:')
+        for name, previous, median, ratio, regressed in compare(baseline, results, args.threshold):
+            regressions += regressed
+            print(f'{name}'.ljust(28) + f'{previous * 1e3:9.3f}ms -> {median * 1e3:9.3f}ms  x{ratio:.2f}' + ('  REGRESSION' if regressed else ''))
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
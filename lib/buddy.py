@@ -0,0 +1,142 @@
+import heapq
+
+class BuddyAllocator():
+
+    def __init__(self, size):
+        self.size = size
+        self.max_order = max(size, 1).bit_length() - 1
+        self.free = 0
+
+        # per order, a heap of free block starts plus the set of the ones still valid
+        self._heaps = [[] for _ in range(self.max_order + 1)]
+        self._free = [set() for _ in range(self.max_order + 1)]
+        # start -> (order, requested blocks)
+        self.allocations = {}
+
+        # carves the pool into the largest aligned power-of-two chunks
+        start = 0
+        while start < size:
+            order = self.max_order
+            while start % (1 << order) or start + (1 << order) > size:
+                order -= 1
+            self._push(start, order)
+            start += 1 << order
+
+    @staticmethod
+    def get_order(n):
+        return max(n - 1, 0).bit_length()
+
+    @property
+    def largest(self):
+        for order in range(self.max_order, -1, -1):
+            if self._free[order]:
+                return 1 << order
+        return 0
+
+    @property
+    def capacity(self):
+        return 1 << self.max_order if self.size else 0
+
+    @property
+    def requested(self):
+        return sum(n for _, n in self.allocations.values())
+
+    @property
+    def reserved(self):
+        return sum(1 << order for order, _ in self.allocations.values())
+
+    def _push(self, start, order):
+        heapq.heappush(self._heaps[order], start)
+        self._free[order].add(start)
+        self.free += 1 << order
+
+    def _peek(self, order):
+        heap = self._heaps[order]
+        while heap and heap[0] not in self._free[order]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _pop(self, order):
+        start = self._peek(order)
+        heapq.heappop(self._heaps[order])
+        self._free[order].remove(start)
+        self.free -= 1 << order
+        return start
+
+    def _discard(self, start, order):
+        # stale heap entries are dropped lazily by _peek
+        self._free[order].remove(start)
+        self.free -= 1 << order
+
+    def find(self, n):
+        order = BuddyAllocator.get_order(n)
+        for current in range(order, self.max_order + 1):
+            start = self._peek(current)
+            if start is not None:
+                return start
+        return None
+
+    def get_size(self, n):
+        return 1 << BuddyAllocator.get_order(n)
+
+    def allocate(self, n):
+        order = BuddyAllocator.get_order(n)
+        current = order
+        while current <= self.max_order and self._peek(current) is None:
+            current += 1
+        if current > self.max_order:
+            return None
+
+        # splits the block until it has the requested order, freeing the upper halves
+        start = self._pop(current)
+        while current > order:
+            current -= 1
+            self._push(start + (1 << current), current)
+
+        self.allocations[start] = (order, n)
+        return start
+
+    def get_requested(self, start):
+        return self.allocations[start][1]
+
+    def reserve(self, start, n):
+        # allocates n blocks exactly at start, splitting the free block holding it. Returns the start, None if taken
+        order = BuddyAllocator.get_order(n)
+        if start % (1 << order):
+            return None
+
+        current = order
+        while current <= self.max_order and start - start % (1 << current) not in self._free[current]:
+            current += 1
+        if current > self.max_order:
+            return None
+
+        block = start - start % (1 << current)
+        self._discard(block, current)
+        while current > order:
+            current -= 1
+            half = 1 << current
+            if start >= block + half:
+                self._push(block, current)
+                block += half
+            else:
+                self._push(block + half, current)
+
+        self.allocations[start] = (order, n)
+        return start
+
+    def free_blocks(self, start):
+        order, _ = self.allocations.pop(start)
+        size = 1 << order
+
+        # coalesces with the buddy while it is free
+        while order < self.max_order:
+            buddy = start ^ (1 << order)
+            if buddy not in self._free[order]:
+                break
+            self._discard(buddy, order)
+            start = min(start, buddy)
+            order += 1
+
+        self._push(start, order)
+        return size
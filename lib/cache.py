@@ -0,0 +1,156 @@
+from collections import OrderedDict
+
+class CacheEntry():
+    __slots__ = ('value', 'dirty', 'referenced')
+
+    def __init__(self, value, dirty):
+        self.value = value
+        self.dirty = dirty
+        self.referenced = True
+
+class Cache():
+    # entries are bounded by the total length of their values, evicted entries are handed to on_evict
+
+    def __init__(self, capacity, on_evict=None):
+        self.capacity = capacity
+        self.size = 0
+        self.on_evict = on_evict
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touch(key, entry)
+        return entry.value
+
+    def peek(self, key):
+        entry = self.entries.get(key)
+        return entry.value if entry is not None else None
+
+    def put(self, key, value, dirty=False):
+        if len(value) > self.capacity:
+            return False
+
+        self.invalidate(key)
+        self._insert(key, CacheEntry(value, dirty))
+        self.size += len(value)
+
+        while self.size > self.capacity:
+            key, entry = self._evict()
+            self.size -= len(entry.value)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, entry.value, entry.dirty)
+        return True
+
+    def invalidate(self, key):
+        entry = self._remove(key)
+        if entry is not None:
+            self.size -= len(entry.value)
+        return entry
+
+    def mark_clean(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.dirty = False
+
+    def mark_dirty(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.dirty = True
+
+    def dirty_keys(self):
+        return [key for key, entry in self.entries.items() if entry.dirty]
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': self.size,
+            'capacity': self.capacity,
+        }
+
+class LRUCache(Cache):
+
+    def __init__(self, capacity, on_evict=None):
+        super().__init__(capacity, on_evict)
+        self.entries = OrderedDict()
+
+    def _touch(self, key, entry):
+        self.entries.move_to_end(key)
+
+    def _insert(self, key, entry):
+        self.entries[key] = entry
+
+    def _remove(self, key):
+        return self.entries.pop(key, None)
+
+    def _evict(self):
+        return self.entries.popitem(last=False)
+
+class ClockCache(Cache):
+
+    def __init__(self, capacity, on_evict=None):
+        super().__init__(capacity, on_evict)
+        self.entries = {}
+        # circular buffer of keys, None where an entry was invalidated
+        self.slots = []
+        self.slot_of = {}
+        self.hand = 0
+
+    def _touch(self, key, entry):
+        entry.referenced = True
+
+    def _insert(self, key, entry):
+        # compacts the buffer once it is mostly holes
+        if len(self.slots) > 2 * len(self.entries) + 16:
+            self.slots = [slot for slot in self.slots if slot is not None]
+            self.slot_of = {slot: index for index, slot in enumerate(self.slots)}
+            self.hand = 0
+
+        self.entries[key] = entry
+        self.slot_of[key] = len(self.slots)
+        self.slots.append(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.slots[self.slot_of.pop(key)] = None
+        return entry
+
+    def _evict(self):
+        while True:
+            if self.hand >= len(self.slots):
+                self.hand = 0
+
+            key = self.slots[self.hand]
+            self.hand += 1
+            if key is None:
+                continue
+
+            entry = self.entries[key]
+            if entry.referenced:
+                entry.referenced = False
+                continue
+
+            self._remove(key)
+            return key, entry
+
+CACHES = {
+    'lru': LRUCache,
+    'clock': ClockCache,
+}
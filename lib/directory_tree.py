@@ -0,0 +1,90 @@
+class DirectoryNode():
+    __slots__ = ('directories', 'files', 'count')
+
+    def __init__(self):
+        self.directories = {}
+        self.files = set()
+        # files anywhere below this directory
+        self.count = 0
+
+class DirectoryTree():
+
+    def __init__(self):
+        self.root = DirectoryNode()
+
+    @staticmethod
+    def split(path):
+        return [component for component in path.split('/') if component]
+
+    def _find(self, components):
+        node = self.root
+        for component in components:
+            node = node.directories.get(component)
+            if node is None:
+                return None
+        return node
+
+    def get_directory(self, path):
+        return self._find(DirectoryTree.split(path))
+
+    def is_file(self, path):
+        components = DirectoryTree.split(path)
+        if not components:
+            return False
+
+        node = self._find(components[:-1])
+        return node is not None and components[-1] in node.files
+
+    def add(self, path):
+        components = DirectoryTree.split(path)
+        if not components or self.is_file(path):
+            return
+
+        node = self.root
+        node.count += 1
+        for component in components[:-1]:
+            node = node.directories.setdefault(component, DirectoryNode())
+            node.count += 1
+        node.files.add(components[-1])
+
+    def remove(self, path):
+        components = DirectoryTree.split(path)
+        if not self.is_file(path):
+            return False
+
+        # drops the directories left empty on the way back up
+        nodes = [self.root]
+        for component in components[:-1]:
+            nodes.append(nodes[-1].directories[component])
+        nodes[-1].files.remove(components[-1])
+
+        for depth in range(len(nodes) - 1, -1, -1):
+            nodes[depth].count -= 1
+            if depth and not nodes[depth].count:
+                del nodes[depth - 1].directories[components[depth - 1]]
+        return True
+
+    def listdir(self, path=''):
+        node = self.get_directory(path)
+        if node is None:
+            return None
+        return sorted(node.directories) + sorted(node.files)
+
+    def walk(self, path=''):
+        # yields (directory, subdirectories, files) for every directory below path, top down
+        node = self.get_directory(path)
+        if node is None:
+            return
+
+        stack = [('/'.join(DirectoryTree.split(path)), node)]
+        while stack:
+            directory, node = stack.pop()
+            yield directory, sorted(node.directories), sorted(node.files)
+
+            for name in sorted(node.directories, reverse=True):
+                stack.append((f'{directory}/{name}' if directory else name, node.directories[name]))
+
+    def files(self, path=''):
+        for directory, _, files in self.walk(path):
+            for name in files:
+                yield f'{directory}/{name}' if directory else name
@@ -0,0 +1,318 @@
+import random
+
+# treap priorities only need to be well spread, keep them off the global random state
+_priorities = random.Random(0)
+
+class _Extent():
+    __slots__ = ('key', 'start', 'length', 'max_length', 'priority', 'left', 'right')
+
+    def __init__(self, start, length):
+        self.key = start
+        self.start = start
+        self.length = length
+        self.max_length = length
+        self.priority = _priorities.random()
+        self.left = None
+        self.right = None
+
+    def update(self):
+        max_length = self.length
+        if self.left is not None and self.left.max_length > max_length:
+            max_length = self.left.max_length
+        if self.right is not None and self.right.max_length > max_length:
+            max_length = self.right.max_length
+        self.max_length = max_length
+
+class _Length():
+    # an extent in the treap ordered by (length, start)
+    __slots__ = ('key', 'priority', 'left', 'right')
+
+    def __init__(self, length, start):
+        self.key = (length, start)
+        self.priority = _priorities.random()
+        self.left = None
+        self.right = None
+
+    def update(self):
+        pass
+
+
+def _split(node, key):
+    # splits a treap into (nodes with a key before key, nodes with a key at or after key), walking down once
+    left = right = left_tail = right_tail = None
+    path = []
+    while node is not None:
+        path.append(node)
+        if node.key < key:
+            if left_tail is None:
+                left = node
+            else:
+                left_tail.right = node
+            left_tail = node
+            node = node.right
+        else:
+            if right_tail is None:
+                right = node
+            else:
+                right_tail.left = node
+            right_tail = node
+            node = node.left
+
+    if left_tail is not None:
+        left_tail.right = None
+    if right_tail is not None:
+        right_tail.left = None
+    for node in reversed(path):
+        node.update()
+    return left, right
+
+
+def _merge(left, right):
+    # joins two treaps, every key of left before every key of right
+    root = parent = None
+    path = []
+    while left is not None and right is not None:
+        if left.priority > right.priority:
+            node, left = left, left.right
+            attach_right = True
+        else:
+            node, right = right, right.left
+            attach_right = False
+
+        if parent is None:
+            root = node
+        elif parent_right:
+            parent.right = node
+        else:
+            parent.left = node
+        parent, parent_right = node, attach_right
+        path.append(node)
+
+    rest = left if left is not None else right
+    if parent is None:
+        return rest
+    if parent_right:
+        parent.right = rest
+    else:
+        parent.left = rest
+    for node in reversed(path):
+        node.update()
+    return root
+
+
+def _first_fit(node, n):
+    while node is not None and node.max_length >= n:
+        if node.left is not None and node.left.max_length >= n:
+            node = node.left
+        elif node.length >= n:
+            return node
+        else:
+            node = node.right
+    return None
+
+
+def _first_fit_from(node, position, n):
+    if node is None or node.max_length < n:
+        return None
+
+    if node.start < position:
+        return _first_fit_from(node.right, position, n)
+
+    found = _first_fit_from(node.left, position, n)
+    if found is not None:
+        return found
+    if node.length >= n:
+        return node
+    return _first_fit(node.right, n)
+
+
+class FreeExtentIndex():
+    FIRST_FIT = 'first_fit'
+    BEST_FIT = 'best_fit'
+    NEXT_FIT = 'next_fit'
+    POLICIES = (FIRST_FIT, BEST_FIT, NEXT_FIT)
+
+    def __init__(self, size, policy=FIRST_FIT):
+        if policy not in FreeExtentIndex.POLICIES:
+            raise ValueError(f'unknown allocation policy {policy}')
+
+        self.size = size
+        self.policy = policy
+        self.free = 0
+        self.cursor = 0
+
+        # free extents, ordered by start (treap augmented with the largest length of each subtree)
+        self._root = None
+        # the same extents in a treap ordered by (length, start), for best fit
+        self._by_length = None
+        self.count = 0
+
+        if size > 0:
+            self._add(0, size)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.start, node.length
+            node = node.right
+
+    @property
+    def largest(self):
+        if self._root is None:
+            return 0
+        return self._root.max_length
+
+    @property
+    def fragmentation(self):
+        if not self.free:
+            return 0.0
+        return 1 - self.largest / self.free
+
+    def fits(self, n):
+        return n <= self.largest
+
+    def is_free(self, position):
+        return self.get_free_run(position) > 0
+
+    def get_free_run(self, position):
+        # free blocks from position up to the next used one
+        extent = self._floor(position)
+        if extent is None or position >= extent.start + extent.length:
+            return 0
+        return extent.start + extent.length - position
+
+    def get_next_free(self, position):
+        # (start, length) of the first free extent holding or following position
+        extent = self._floor(position)
+        if extent is None or position >= extent.start + extent.length:
+            extent = self._ceiling(position)
+        if extent is None:
+            return None
+        return extent.start, extent.length
+
+    def find(self, n):
+        if n <= 0 or not self.fits(n):
+            return None
+
+        if self.policy == FreeExtentIndex.BEST_FIT:
+            # the smallest (length, start) at or after (n, -1)
+            node, found = self._by_length, None
+            while node is not None:
+                if node.key >= (n, -1):
+                    found = node
+                    node = node.left
+                else:
+                    node = node.right
+            return found.key[1]
+
+        if self.policy == FreeExtentIndex.NEXT_FIT:
+            # the extent holding the cursor can be used from the cursor onwards
+            extent = self._floor(self.cursor)
+            if extent is not None and extent.start + extent.length - self.cursor >= n:
+                return self.cursor
+
+            extent = _first_fit_from(self._root, self.cursor, n)
+            if extent is None:
+                extent = _first_fit(self._root, n)
+            return extent.start
+
+        return _first_fit(self._root, n).start
+
+    def allocate(self, n):
+        start = self.find(n)
+        if start is not None:
+            self.take(start, n)
+        return start
+
+    def take(self, start, n):
+        reserved = self.reserve(start, n)
+        self.cursor = start + n if start + n < self.size else 0
+        return reserved
+
+    def reserve(self, start, n):
+        # removes every free block within [start, start + n), returns how many were free
+        end = start + n
+        reserved = 0
+
+        extent = self._floor(start)
+        if extent is None or extent.start + extent.length <= start:
+            extent = self._ceiling(start)
+
+        while extent is not None and extent.start < end:
+            extent_start, extent_end = extent.start, extent.start + extent.length
+            self._remove(extent)
+
+            if extent_start < start:
+                self._add(extent_start, start - extent_start)
+            if extent_end > end:
+                self._add(end, extent_end - end)
+
+            reserved += min(extent_end, end) - max(extent_start, start)
+            extent = self._ceiling(extent_end) if extent_end < end else None
+
+        return reserved
+
+    def release(self, start, n):
+        if n <= 0:
+            return
+
+        # coalesces with the neighbouring free extents
+        previous = self._floor(start - 1) if start > 0 else None
+        if previous is not None and previous.start + previous.length == start:
+            start, n = previous.start, previous.length + n
+            self._remove(previous)
+
+        following = self._ceiling(start + n)
+        if following is not None and following.start == start + n:
+            n += following.length
+            self._remove(following)
+
+        self._add(start, n)
+
+    def _add(self, start, length):
+        left, right = _split(self._root, start)
+        self._root = _merge(_merge(left, _Extent(start, length)), right)
+
+        left, right = _split(self._by_length, (length, start))
+        self._by_length = _merge(_merge(left, _Length(length, start)), right)
+        self.free += length
+        self.count += 1
+
+    def _remove(self, extent):
+        left, right = _split(self._root, extent.start)
+        _, right = _split(right, extent.start + 1)
+        self._root = _merge(left, right)
+
+        left, right = _split(self._by_length, (extent.length, extent.start))
+        _, right = _split(right, (extent.length, extent.start + 1))
+        self._by_length = _merge(left, right)
+        self.free -= extent.length
+        self.count -= 1
+
+    def _floor(self, position):
+        node, found = self._root, None
+        while node is not None:
+            if node.start <= position:
+                found = node
+                node = node.right
+            else:
+                node = node.left
+        return found
+
+    def _ceiling(self, position):
+        node, found = self._root, None
+        while node is not None:
+            if node.start >= position:
+                found = node
+                node = node.left
+            else:
+                node = node.right
+        return found
@@ -0,0 +1,54 @@
+class FenwickTree():
+    # prefix sums over non-negative weights, updated and searched in O(log n)
+
+    def __init__(self, size=0):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.weights = [0] * size
+        self.total = 0
+
+    def __len__(self):
+        return self.size
+
+    def grow(self, size):
+        # rebuilds the tree for size slots, in O(size)
+        weights = self.weights + [0] * (size - self.size)
+        self.size = size
+        self.weights = weights
+        self.tree = [0] + weights
+        for index in range(1, size + 1):
+            parent = index + (index & -index)
+            if parent <= size:
+                self.tree[parent] += self.tree[index]
+
+    def add(self, index, delta):
+        self.weights[index] += delta
+        self.total += delta
+
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def get(self, index):
+        return self.weights[index]
+
+    def prefix(self, index):
+        # sum of the weights before index
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, value):
+        # the slot whose weight covers value, 0 <= value < total, walking down the implicit tree
+        index = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            child = index + step
+            if child <= self.size and self.tree[child] <= value:
+                index = child
+                value -= self.tree[child]
+            step >>= 1
+        return index
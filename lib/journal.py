@@ -0,0 +1,100 @@
+import os
+import struct
+import zlib
+
+class Journal():
+    # payload length, crc32 of sequence and payload, sequence
+    HEADER = struct.Struct('<IIQ')
+
+    def __init__(self, path, checkpoint_path):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.sequence = 0
+        # records appended since the last checkpoint
+        self.records = 0
+        self.file = None
+
+    @staticmethod
+    def _encode(sequence, payload):
+        crc = zlib.crc32(payload, zlib.crc32(struct.pack('<Q', sequence)))
+        return Journal.HEADER.pack(len(payload), crc, sequence) + payload
+
+    @staticmethod
+    def _decode(data):
+        # yields (offset after the record, sequence, payload), stopping at the first torn or corrupt record
+        offset = 0
+        while offset + Journal.HEADER.size <= len(data):
+            length, crc, sequence = Journal.HEADER.unpack_from(data, offset)
+            end = offset + Journal.HEADER.size + length
+            if end > len(data):
+                return
+
+            payload = data[offset + Journal.HEADER.size:end]
+            if zlib.crc32(payload, zlib.crc32(struct.pack('<Q', sequence))) != crc:
+                return
+
+            offset = end
+            yield offset, sequence, payload
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return b''
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def replay(self):
+        # yields the payloads of the checkpoint, then the ones journaled after it
+        checkpoint_sequence = 0
+        for _, sequence, payload in Journal._decode(Journal._read(self.checkpoint_path)):
+            checkpoint_sequence = sequence
+            if payload:
+                yield payload
+
+        self.sequence = checkpoint_sequence
+        valid_until = 0
+        for offset, sequence, payload in Journal._decode(Journal._read(self.path)):
+            valid_until = offset
+            # records already folded into the checkpoint, if it was written but the journal not yet truncated
+            if sequence <= checkpoint_sequence:
+                continue
+
+            self.sequence = sequence
+            self.records += 1
+            yield payload
+
+        # drops the torn tail so new records are appended right after the last valid one
+        if os.path.exists(self.path) and os.path.getsize(self.path) != valid_until:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_until)
+
+    def append(self, payload):
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+
+        self.sequence += 1
+        self.records += 1
+        self.file.write(Journal._encode(self.sequence, payload))
+        self.file.flush()
+
+    def checkpoint(self, payloads):
+        # every checkpoint record carries the sequence of the last record it includes,
+        # the leading empty record keeps it even when there is nothing else to write
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(Journal._encode(self.sequence, b''))
+            for payload in payloads:
+                f.write(Journal._encode(self.sequence, payload))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.checkpoint_path)
+
+        if self.file is not None:
+            self.file.close()
+        self.file = open(self.path, 'wb')
+        self.records = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+class FIFOPolicy():
+    # frames in the order they were filled, the oldest is evicted first
+
+    def __init__(self, frames, window=None):
+        self.frames = OrderedDict()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def insert(self, frame, now):
+        self.frames[frame] = now
+
+    def touch(self, frame, now):
+        pass
+
+    def remove(self, frame):
+        del self.frames[frame]
+
+    def victim(self):
+        return next(iter(self.frames))
+
+    def expire(self, now):
+        return []
+
+class LRUPolicy(FIFOPolicy):
+    # frames by last use, the least recently used is evicted first
+
+    def touch(self, frame, now):
+        self.frames[frame] = now
+        self.frames.move_to_end(frame)
+
+class ClockPolicy():
+    # second chance over the frames in a circle, referenced frames are skipped once
+
+    def __init__(self, frames, window=None):
+        self.present = bytearray(frames)
+        self.referenced = bytearray(frames)
+        self.count = 0
+        self.hand = 0
+
+    def __len__(self):
+        return self.count
+
+    def insert(self, frame, now):
+        self.present[frame] = 1
+        self.referenced[frame] = 1
+        self.count += 1
+
+    def touch(self, frame, now):
+        self.referenced[frame] = 1
+
+    def remove(self, frame):
+        self.present[frame] = 0
+        self.count -= 1
+
+    def victim(self):
+        while True:
+            frame = self.hand
+            self.hand = (self.hand + 1) % len(self.present)
+            if not self.present[frame]:
+                continue
+            if self.referenced[frame]:
+                self.referenced[frame] = 0
+                continue
+            return frame
+
+    def expire(self, now):
+        return []
+
+class WorkingSetPolicy(LRUPolicy):
+    # frames not used in the last window ticks leave the working set and are released on expire
+
+    def __init__(self, frames, window=16):
+        super().__init__(frames)
+        self.window = window
+
+    def expire(self, now):
+        expired = []
+        for frame, used_at in self.frames.items():
+            if used_at >= now - self.window:
+                break
+            expired.append(frame)
+        return expired
+
+POLICIES = {
+    'fifo': FIFOPolicy,
+    'lru': LRUPolicy,
+    'clock': ClockPolicy,
+    'working_set': WorkingSetPolicy,
+}
@@ -4,5 +4,34 @@ import random
 def get_random_byte():
     return random.randint(0, 255)
 
-def get_random_bytes(n):
-    return bytes([get_random_byte() for _ in range(n)])
\ No newline at end of file
+def get_random_bytes(n, rng=None):
+    # in bulk from the given random.Random, so seeded generators give the same bytes
+    return (rng or random).randbytes(n)
+
+# characters of the density bar, from an empty to a full cell
+DENSITY_LEVELS = ' .:-=+*#'
+
+def get_density_bar(runs, size, width=64):
+    # one character per cell of about size / width blocks, darker the more of them the runs of (start, length) cover
+    width = max(1, min(width, size))
+    used = [0.0] * width
+    cell = size / width
+    for start, length in runs:
+        end = start + length
+        index = int(start / cell)
+        while index < width and index * cell < end:
+            used[index] += min(end, (index + 1) * cell) - max(start, index * cell)
+            index += 1
+
+    # partly used cells never show as empty nor as full
+    top = len(DENSITY_LEVELS) - 1
+    bar = []
+    for blocks in used:
+        fraction = blocks / cell
+        if fraction >= 1 - 1e-9:
+            bar.append(DENSITY_LEVELS[top])
+        elif fraction > 0:
+            bar.append(DENSITY_LEVELS[max(1, min(top - 1, int(fraction * top)))])
+        else:
+            bar.append(DENSITY_LEVELS[0])
+    return ''.join(bar)
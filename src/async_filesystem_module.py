@@ -0,0 +1,175 @@
+from src.filesystem_module import FileSystemManager
+from src.trace_module import TraceRecorder
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class PendingWrite():
+
+    def __init__(self, bytes, owner, result):
+        self.bytes = bytes
+        self.owner = owner
+        self.result = result
+
+class AsyncFileSystemManager():
+
+    def __init__(self, filesystem_manager=None, max_workers=4):
+        if filesystem_manager is None:
+            filesystem_manager = FileSystemManager()
+
+        self.filesystem_manager = filesystem_manager
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        # guards the block bookkeeping, host I/O runs outside of it
+        self.lock = threading.Lock()
+
+        # path -> write queued but not started yet, later writes to the path replace its content
+        self.pending_writes = {}
+        # path -> result of the last operation queued on it, operations on a path run in order
+        self.tails = {}
+
+        self.stats = {
+            'writes': 0,
+            'coalesced_writes': 0,
+            'reads': 0,
+            'deletes': 0,
+        }
+
+    async def create(self, bytes, path, owner):
+        return await self._submit_write(bytes, path, owner)
+
+    async def update(self, bytes, path, owner):
+        return await self._submit_write(bytes, path, owner)
+
+    async def read(self, path):
+        # reads what was written before, waiting for queued writes to the path
+        tail = self.tails.get(path)
+        if tail is not None:
+            await asyncio.wait([tail])
+
+        self.stats['reads'] += 1
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._read, path)
+
+    async def delete(self, path, process):
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        previous = self._chain(path, result)
+
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+
+            self.stats['deletes'] += 1
+            deleted = await loop.run_in_executor(self.executor, self._delete, path, process)
+            result.set_result(deleted)
+            return deleted
+        finally:
+            self._unchain(path, result)
+
+    def _chain(self, path, result):
+        previous = self.tails.get(path)
+        self.tails[path] = result
+        return previous
+
+    def _unchain(self, path, result):
+        if not result.done():
+            result.set_result(False)
+        if self.tails.get(path) is result:
+            del self.tails[path]
+
+    async def _submit_write(self, bytes, path, owner):
+        pending = self.pending_writes.get(path)
+        if pending is not None:
+            pending.bytes = bytes
+            pending.owner = owner
+            self.stats['coalesced_writes'] += 1
+            return await asyncio.shield(pending.result)
+
+        loop = asyncio.get_running_loop()
+        pending = PendingWrite(bytes, owner, loop.create_future())
+        self.pending_writes[path] = pending
+        previous = self._chain(path, pending.result)
+
+        try:
+            # lets writes issued in the same batch join this one
+            await asyncio.sleep(0)
+            if previous is not None:
+                await asyncio.wait([previous])
+
+            del self.pending_writes[path]
+            self.stats['writes'] += 1
+            written = await loop.run_in_executor(self.executor, self._write, pending.bytes, path, pending.owner)
+            pending.result.set_result(written)
+            return written
+        finally:
+            if self.pending_writes.get(path) is pending:
+                del self.pending_writes[path]
+            self._unchain(path, pending.result)
+
+    def _write(self, bytes, path, owner):
+        fsm = self.filesystem_manager
+
+        # the cache is not thread safe, so cached writes run entirely under the lock
+        if fsm.cache is not None:
+            with self.lock:
+                return fsm._write(bytes, path, owner)
+
+        path = fsm.BASE_DIR + path
+        with self.lock:
+            created = path not in fsm.paths
+            extent = fsm._place(path, len(bytes), owner)
+            if extent is None:
+                return False
+            start = extent.start
+            # keeps the defragmenter from moving the extent before its content lands
+            fsm.in_flight[path] += 1
+
+        try:
+            fsm._store(path, start, bytes)
+        except Exception as e:
+            with self.lock:
+                self._unpin(path)
+                if created:
+                    fsm._release(path)
+            return False
+
+        with self.lock:
+            self._unpin(path)
+            fsm.save_paths_lock(FileSystemManager.OPERATION_WRITE, path)
+            if fsm.tracer is not None:
+                fsm.tracer.record(TraceRecorder.EVENT_FILE_WRITE, path, len(bytes))
+        return True
+
+    def _unpin(self, path):
+        in_flight = self.filesystem_manager.in_flight
+        in_flight[path] -= 1
+        if not in_flight[path]:
+            del in_flight[path]
+
+    def _read(self, path):
+        fsm = self.filesystem_manager
+        if fsm.cache is not None:
+            with self.lock:
+                return fsm.read(path)
+
+        # the tracer is not thread safe, so the event is recorded under the lock once the content is read
+        with self.lock:
+            fsm.in_flight[fsm.BASE_DIR + path] += 1
+        content, read = bytes(), False
+        try:
+            content, read = fsm._read(path)
+            return content, read
+        finally:
+            with self.lock:
+                self._unpin(fsm.BASE_DIR + path)
+                if read and fsm.tracer is not None:
+                    fsm.tracer.record(TraceRecorder.EVENT_FILE_READ, fsm.BASE_DIR + path, len(content))
+
+    def _delete(self, path, process):
+        with self.lock:
+            return self.filesystem_manager.delete(path, process)
+
+    def close(self):
+        self.executor.shutdown()
+        self.filesystem_manager.close()
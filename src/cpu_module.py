@@ -0,0 +1,157 @@
+from src.scheduling_module import SCHEDULER_PRIORITY, create_scheduler
+from src.trace_module import TraceRecorder
+
+class CPUManager():
+    PLACEMENT_LEAST_LOADED = 'least_loaded'
+    PLACEMENT_ROUND_ROBIN = 'round_robin'
+
+    def __init__(self, cores=1, aging=1, max_process_age=2, placement=PLACEMENT_LEAST_LOADED, work_stealing=True, scheduler=SCHEDULER_PRIORITY, quanta=None, seed=0):
+        # every core runs its own scheduler of the given policy, advancing one tick per run_processes
+        self.scheduler = scheduler
+        self.quanta = quanta
+        self.seed = seed
+        self.cores = [
+            create_scheduler(scheduler, aging=aging, max_process_age=max_process_age, quanta=quanta, seed=seed + index) for index in range(cores)
+        ]
+        self.aging = aging
+        self.max_process_age = max_process_age
+        self.placement = placement
+        self.work_stealing = work_stealing
+        self.next_core = 0
+
+        # process -> index of the core queueing it
+        self.core_of = {}
+        # processes blocked out of every core until woken
+        self.parked = set()
+
+        # process each core ran on the last tick, to record dispatches and preemptions
+        self.running = [None] * cores
+        self.tracer = None
+
+        self.ticks = 0
+        self.busy_ticks = [0] * cores
+        # processes each core took from the queues of another
+        self.migrations = [0] * cores
+
+    def set_tracer(self, tracer):
+        self.tracer = tracer
+        for index, core in enumerate(self.cores):
+            core.tracer = tracer
+            core.core = index
+
+    def __len__(self):
+        return len(self.core_of)
+
+    def _place(self):
+        if self.placement == CPUManager.PLACEMENT_ROUND_ROBIN:
+            index = self.next_core
+            self.next_core = (self.next_core + 1) % len(self.cores)
+            return index
+
+        return min(range(len(self.cores)), key=lambda index: len(self.cores[index]))
+
+    def add_process(self, process):
+        index = self._place()
+        self.cores[index].add_process(process)
+        self.core_of[process] = index
+        return index
+
+    def remove_process(self, process):
+        index = self.core_of.pop(process, None)
+        if index is None:
+            return False
+        return self.cores[index].remove_process(process)
+
+    def park(self, process):
+        self.remove_process(process)
+        self.parked.add(process)
+
+    def wake(self, process):
+        if process not in self.parked:
+            return False
+
+        self.parked.remove(process)
+        self.add_process(process)
+        return True
+
+    def get_core(self, process):
+        return self.core_of.get(process)
+
+    def get_active_processes(self):
+        return [core.get_active_process() for core in self.cores]
+
+    def balance(self):
+        # idle cores steal a waiting process from the busiest core
+        if not self.work_stealing:
+            return
+
+        for index, core in enumerate(self.cores):
+            if len(core):
+                continue
+
+            busiest = max(range(len(self.cores)), key=lambda other: len(self.cores[other]))
+            if len(self.cores[busiest]) < 2:
+                return
+
+            process = self.cores[busiest].get_stealable_process()
+            level = self.cores[busiest].get_level(process)
+            self.cores[busiest].remove_process(process)
+            core.add_process(process, level)
+
+            self.core_of[process] = index
+            self.migrations[index] += 1
+            if self.tracer is not None:
+                self.tracer.record(TraceRecorder.EVENT_MIGRATE, process.pid, busiest, index)
+
+    def run_processes(self):
+        # runs a tick on every core, returning the processes that finished
+        self.balance()
+
+        finished_processes = []
+        for index, core in enumerate(self.cores):
+            active_process = core.get_active_process()
+            if active_process is not None:
+                self.busy_ticks[index] += 1
+
+            if self.tracer is not None and active_process is not self.running[index]:
+                if self.running[index] is not None:
+                    self.tracer.record(TraceRecorder.EVENT_PREEMPT, self.running[index].pid, 0, index)
+                if active_process is not None:
+                    self.tracer.record(TraceRecorder.EVENT_DISPATCH, active_process.pid, 0, index)
+            self.running[index] = active_process
+
+            finished_process = core.run_processes()
+            if finished_process is not None:
+                del self.core_of[finished_process]
+                finished_processes.append(finished_process)
+
+                self.running[index] = None
+                if self.tracer is not None:
+                    self.tracer.record(TraceRecorder.EVENT_FINISH, finished_process.pid, 0, index)
+
+        self.ticks += 1
+        return finished_processes
+
+    def get_core_stats(self):
+        return [
+            {
+                'core': index,
+                'busy_ticks': self.busy_ticks[index],
+                'utilization': self.busy_ticks[index] / self.ticks if self.ticks else 0.0,
+                'migrations': self.migrations[index],
+            } for index in range(len(self.cores))
+        ]
+
+    def show_queues(self):
+        for index, core in enumerate(self.cores):
+            if len(self.cores) > 1:
+                print(f'\nCORE {index}:', end='')
+            core.show_queues()
+
+        if self.parked:
+            print(f'\tPARKED: {sorted(process.pid for process in self.parked)}')
+
+    def show_core_stats(self):
+        print('\nCores:')
+        for stats in self.get_core_stats():
+            print(f'\tCORE {stats["core"]}: {stats["utilization"]:.2%} utilization, {stats["migrations"]} migrations')
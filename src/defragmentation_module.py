@@ -0,0 +1,114 @@
+import time
+
+class Defragmenter():
+
+    def __init__(self, threshold=0.5, blocks_per_tick=64):
+        # fragmentation ratio above which each tick compacts up to blocks_per_tick blocks
+        self.threshold = threshold
+        self.blocks_per_tick = blocks_per_tick
+        self.position = 0
+
+        self.stats = {
+            'runs': 0,
+            'blocks_moved': 0,
+            'extents_moved': 0,
+            'seconds': 0.0,
+        }
+
+    @property
+    def fragmentation(self):
+        return self.free_extents.fragmentation
+
+    def tick(self):
+        if self.blocks_per_tick <= 0 or self.fragmentation <= self.threshold:
+            return 0
+        return self.step(self.blocks_per_tick)
+
+    def step(self, max_blocks):
+        # slides the extents that follow free gaps towards the start, moving about max_blocks blocks at most.
+        # An extent is never split, so a slice moves at least one of them to always make progress
+        started_at = time.perf_counter()
+        moved = 0
+        while moved < max_blocks:
+            gap = self.free_extents.get_next_free(self.position)
+            if gap is None:
+                self.position = 0
+                break
+
+            start, length = gap
+            n = self._get_extent_length(start + length)
+            if not n:
+                # only free blocks are left past this gap
+                self.position = 0
+                break
+
+            if self._is_pinned(start + length):
+                # the extent cannot move right now, the gaps past it are tried instead
+                self.position = start + length + n
+                continue
+
+            if moved and moved + n > max_blocks:
+                break
+
+            self._move(start + length, start)
+            self.position = start + n
+            moved += n
+            self.stats['extents_moved'] += 1
+
+        self.stats['runs'] += 1
+        self.stats['blocks_moved'] += moved
+        self.stats['seconds'] += time.perf_counter() - started_at
+        return moved
+
+    def compact(self, n=None):
+        # compacts until there is a free run of n blocks, or as far as possible
+        self.position = 0
+        while n is None or not self.free_extents.fits(n):
+            if not self.step(max(self.blocks_per_tick, 1)):
+                break
+        return self.free_extents.fits(n) if n is not None else True
+
+    def _is_pinned(self, position):
+        return False
+
+class DiskDefragmenter(Defragmenter):
+
+    def __init__(self, filesystem_manager, threshold=0.5, blocks_per_tick=64):
+        super().__init__(threshold, blocks_per_tick)
+        self.filesystem_manager = filesystem_manager
+
+    @property
+    def free_extents(self):
+        return self.filesystem_manager.free_extents
+
+    def _get_extent_length(self, position):
+        if position >= self.filesystem_manager.blocks.size:
+            return 0
+
+        path = self.filesystem_manager.blocks.get_path(position)
+        extent = self.filesystem_manager.paths.get(path) or self.filesystem_manager.reserved[path]
+        return extent.length
+
+    def _is_pinned(self, position):
+        path = self.filesystem_manager.blocks.get_path(position)
+        return path in self.filesystem_manager.in_flight or path in self.filesystem_manager.reserved
+
+    def _move(self, source, target):
+        self.filesystem_manager.move(self.filesystem_manager.blocks.get_path(source), target)
+
+class MemoryDefragmenter(Defragmenter):
+
+    def __init__(self, memory_manager, priority, threshold=0.5, blocks_per_tick=64):
+        super().__init__(threshold, blocks_per_tick)
+        self.memory_manager = memory_manager
+        self.priority = priority
+
+    @property
+    def free_extents(self):
+        return self.memory_manager.allocators[self.priority].free_extents
+
+    def _get_extent_length(self, position):
+        return self.memory_manager.allocators[self.priority].allocations.get(position, 0)
+
+    def _move(self, source, target):
+        self.memory_manager.move(self.priority, source, target)
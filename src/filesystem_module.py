@@ -1,72 +1,395 @@
-import os
-import pickle
+import struct
+from array import array
+from collections import Counter
+
+from lib.cache import CACHES
+from lib.directory_tree import DirectoryTree
+from lib.extents import FreeExtentIndex
+from lib.journal import Journal
+from lib.utils import get_density_bar
+from src.defragmentation_module import DiskDefragmenter
+from src.process_module import Process
+from src.storage_module import DiskImageStorage, STORAGES
+from src.trace_module import TraceRecorder
 
 class Block():
+    __slots__ = ('table', 'id')
 
-    def __init__(self, id, size, owner=None, path=None, content=None):
+    def __init__(self, table, id):
+        self.table = table
         self.id = id
-        self.size = size
-        
-        self.owner = owner
-        self.path = path
-        if content is None:
-            self.content = [None] * size
+
+    @property
+    def size(self):
+        return self.table.block_size
+
+    @property
+    def owner(self):
+        return self.table.get_owner(self.id)
+
+    @property
+    def path(self):
+        return self.table.get_path(self.id)
 
     @property
     def is_free(self):
-        return self.owner is None and self.path is None
+        return self.table.is_free(self.id)
+
+class Extent():
+    __slots__ = ('start', 'length', 'size')
+
+    def __init__(self, start, length, size):
+        self.start = start
+        self.length = length
+        self.size = size
+
+class InternTable():
+    # values referenced by id from a block column, counted per block so the ids of values no block holds anymore are reused
+
+    def __init__(self):
+        self.values = [None]
+        self.counts = [0]
+        self.ids = {}
+        self.free_ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+    @staticmethod
+    def _key(value):
+        return value if isinstance(value, str) else id(value)
+
+    def acquire(self, value, n):
+        if value is None:
+            return 0
+
+        key = InternTable._key(value)
+        value_id = self.ids.get(key)
+        if value_id is None:
+            if self.free_ids:
+                value_id = self.free_ids.pop()
+                self.values[value_id] = value
+            else:
+                value_id = len(self.values)
+                self.values.append(value)
+                self.counts.append(0)
+            self.ids[key] = value_id
+
+        self.counts[value_id] += n
+        return value_id
+
+    def release(self, value_id, n):
+        if not value_id:
+            return
+
+        self.counts[value_id] -= n
+        if self.counts[value_id] <= 0:
+            del self.ids[InternTable._key(self.values[value_id])]
+            self.values[value_id] = None
+            self.counts[value_id] = 0
+            self.free_ids.append(value_id)
+
+class BlockTable():
+    # blocks per lazily materialized page of the owner/path columns
+    PAGE_SIZE = 4096
+
+    def __init__(self, blocks, block_size):
+        self.size = blocks
+        self.block_size = block_size
+
+        # owner-id and path-id columns, 0 means no owner/path
+        self._owner_pages = {}
+        self._path_pages = {}
+
+        self._owners = InternTable()
+        self._paths = InternTable()
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for id in range(self.size):
+            yield Block(self, id)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [Block(self, id) for id in range(*key.indices(self.size))]
+
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError('block index out of range')
+        return Block(self, key)
+
+    @staticmethod
+    def _get(pages, id):
+        page = pages.get(id // BlockTable.PAGE_SIZE)
+        if page is None:
+            return 0
+        return page[id % BlockTable.PAGE_SIZE]
+
+    def _fill(self, pages, interned, start, n, value):
+        end = min(start + n, self.size)
+        if end <= start:
+            return
+
+        # taken before the old ids are released, so rewriting blocks with their own value keeps its id
+        value = interned.acquire(value, end - start)
+        while start < end:
+            index, offset = divmod(start, BlockTable.PAGE_SIZE)
+            count = min(end - start, BlockTable.PAGE_SIZE - offset)
+
+            page = pages.get(index)
+            if page is None:
+                if not value:
+                    start += count
+                    continue
+                page = pages[index] = array('i', bytes(array('i').itemsize * BlockTable.PAGE_SIZE))
+            else:
+                for old, blocks in Counter(page[offset:offset + count]).items():
+                    interned.release(old, blocks)
+
+            page[offset:offset + count] = array('i', [value]) * count
+            start += count
+
+    def get_owner(self, id):
+        return self._owners[BlockTable._get(self._owner_pages, id)]
+
+    def get_path(self, id):
+        return self._paths[BlockTable._get(self._path_pages, id)]
+
+    def is_free(self, id):
+        return not BlockTable._get(self._owner_pages, id) and not BlockTable._get(self._path_pages, id)
+
+    def assign(self, start, n, path, owner):
+        self._fill(self._path_pages, self._paths, start, n, path)
+        self._fill(self._owner_pages, self._owners, start, n, owner)
+
+    def clear(self, start, n):
+        self._fill(self._path_pages, self._paths, start, n, None)
+        self._fill(self._owner_pages, self._owners, start, n, None)
+
+    def runs(self):
+        # yields (start, length, path, owner) for every run of blocks sharing path and owner
+        start, current = 0, (0, 0)
+        for index in range(0, self.size, BlockTable.PAGE_SIZE):
+            page_index = index // BlockTable.PAGE_SIZE
+            length = min(BlockTable.PAGE_SIZE, self.size - index)
+            path_page = self._path_pages.get(page_index)
+            owner_page = self._owner_pages.get(page_index)
+
+            if path_page is None and owner_page is None:
+                if current != (0, 0):
+                    yield start, index - start, self._paths[current[0]], self._owners[current[1]]
+                    start, current = index, (0, 0)
+                continue
+
+            for offset in range(length):
+                value = (path_page[offset] if path_page is not None else 0, owner_page[offset] if owner_page is not None else 0)
+                if value != current:
+                    if index + offset > start:
+                        yield start, index + offset - start, self._paths[current[0]], self._owners[current[1]]
+                    start, current = index + offset, value
+
+        if self.size > start:
+            yield start, self.size - start, self._paths[current[0]], self._owners[current[1]]
 
 class FileSystemManager():
-    LOCK_PATH = 'filesystem_manager.lock'
+    JOURNAL_PATH = 'filesystem_manager.journal'
+    CHECKPOINT_PATH = 'filesystem_manager.checkpoint'
+
+    OPERATION_WRITE = 0
+    OPERATION_DELETE = 1
+    # operation, starting block, blocks, bytes, owner priority (-1 without owner), owner pid length, path length
+    RECORD = struct.Struct('<BQQQbHI')
 
-    def __init__(self, base_dir='src/drives/sda1/', blocks=1024, block_size=8192, use_lock=False):
+    def __init__(self, base_dir='src/drives/sda1/', blocks=1024, block_size=8192, use_lock=False, allocation_policy=FreeExtentIndex.FIRST_FIT, checkpoint_interval=1024, disk_image=None, cache_size=0, cache_policy='lru', write_back=False, defragment=False, storage='host'):
         self.BASE_DIR = base_dir
         self.BLOCK_SIZE = block_size
 
         self.max_available_blocks = blocks
-        self.blocks = [Block(id=id, size=block_size) for id in range(blocks)]
+        self.blocks = BlockTable(blocks, block_size)
+        self.free_extents = FreeExtentIndex(blocks, allocation_policy)
         self.use_lock = use_lock
+        self.checkpoint_interval = checkpoint_interval
+
+        # where the content lives, a name from STORAGES or a storage instance. A disk image overrides it
+        if disk_image is not None:
+            self.storage = DiskImageStorage(disk_image, blocks, block_size)
+        elif isinstance(storage, str):
+            self.storage = STORAGES[storage](blocks, block_size)
+        else:
+            self.storage = storage
+
+        # block cache bounded by cache_size bytes, keyed by block id
+        self.cache = None
+        self.write_back = write_back
+        self.dirty_paths = set()
+        if cache_size > 0:
+            self.cache = CACHES[cache_policy](cache_size, on_evict=self._on_cache_evict)
+
+        # compacts the disk when a write finds enough free blocks but no run long enough, and on ticks
+        self.defragment = defragment
+        self.defragmenter = DiskDefragmenter(self)
+        # path -> reads and writes running on its blocks outside of the manager, the defragmenter leaves them in place
+        self.in_flight = Counter()
+
+        self.tracer = None
+
+        self.paths = {}
+        # the same files as paths, by directory, relative to BASE_DIR
+        self.directories = DirectoryTree()
+        # label -> extent of blocks held for something else than a file, like swap. They stay out of the
+        # directories and the journal, and the defragmenter never moves them
+        self.reserved = {}
+
+        self.journal = None
+        if self.use_lock:
+            self.journal = Journal(self.JOURNAL_PATH, self.CHECKPOINT_PATH)
+            for record in self.journal.replay():
+                self._apply_record(*FileSystemManager._decode_record(record))
+
+    @staticmethod
+    def _encode_record(operation, path, start=0, length=0, size=0, owner=None):
+        pid = str(owner.pid).encode() if owner is not None else b''
+        priority = owner.priority if owner is not None else -1
+        path = path.encode()
+        return FileSystemManager.RECORD.pack(operation, start, length, size, priority, len(pid), len(path)) + pid + path
+
+    @staticmethod
+    def _decode_record(record):
+        operation, start, length, size, priority, pid_length, path_length = FileSystemManager.RECORD.unpack_from(record)
+        offset = FileSystemManager.RECORD.size
+        pid = record[offset:offset + pid_length].decode()
+        path = record[offset + pid_length:offset + pid_length + path_length].decode()
+
+        owner = Process(pid=pid, priority=priority) if priority >= 0 else None
+        return operation, path, start, length, size, owner
+
+    def _apply_record(self, operation, path, start, length, size, owner):
+        if path in self.paths:
+            self._release(path)
+
+        if operation == FileSystemManager.OPERATION_WRITE:
+            self._allocate(path, start, length, size, owner)
+            self.max_available_blocks -= self.free_extents.reserve(start, length)
+
+    def save_paths_lock(self, operation, path):
+        if not self.use_lock:
+            return
 
-        if os.path.exists(self.LOCK_PATH) and self.use_lock:
-            with open(self.LOCK_PATH, 'rb') as f:
-                self.paths = pickle.load(f)
+        if operation == FileSystemManager.OPERATION_WRITE:
+            extent = self.paths[path]
+            self.journal.append(FileSystemManager._encode_record(operation, path, extent.start, extent.length, extent.size, self.blocks.get_owner(extent.start)))
         else:
-            self.paths = {}
+            self.journal.append(FileSystemManager._encode_record(operation, path))
+
+        # folds the journal into a checkpoint of the live files once it grows long enough
+        if self.journal.records >= self.checkpoint_interval:
+            self.checkpoint()
 
-    def save_paths_lock(self):
+    def checkpoint(self):
         if not self.use_lock:
             return
 
-        with open(self.LOCK_PATH, 'wb') as f:
-            pickle.dump(self.paths, f)
+        self.journal.checkpoint(
+            FileSystemManager._encode_record(FileSystemManager.OPERATION_WRITE, path, extent.start, extent.length, extent.size, self.blocks.get_owner(extent.start))
+            for path, extent in self.paths.items()
+        )
+
+    def close(self):
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+        self.storage.close()
+
+    def get_blocks_count(self, size):
+        # even empty files hold a block
+        return max(1, -(-size // self.BLOCK_SIZE))
+
+    @property
+    def largest_free_extent(self):
+        return self.free_extents.largest
+
+    @property
+    def fragmentation(self):
+        return self.free_extents.fragmentation
 
     def get_available_blocks(self, size):
         if size / self.BLOCK_SIZE > self.max_available_blocks:
             return []
 
-        blocks = []
-        remaining_size = size
-        for block in self.blocks:
-            if block.is_free:
-                remaining_size -= self.BLOCK_SIZE
-                blocks.append(block)
+        n = self.get_blocks_count(size)
+        start = self.free_extents.find(n)
+        if start is None and self.defragment and self.defragmenter.compact(n):
+            start = self.free_extents.find(n)
+        if start is None:
+            raise Exception('size available suggest there is enough space, but it was NOT found')
+
+        return self.blocks[start:start + n]
+
+    def get_utilization_map(self, encoded=False):
+        # encoded, the map is a list of (start, length, path) runs with path None for free blocks
+        if encoded:
+            return [(start, length, path) for start, length, path, _ in self.blocks.runs()]
+
+        utilization_map = []
+        for start, length, path, owner in self.blocks.runs():
+            if path is None and owner is None:
+                utilization_map.extend([None] * length)
             else:
-                blocks = []
-                remaining_size = size
+                utilization_map.extend(self.blocks[start:start + length])
+        return utilization_map
+
+    def _relative(self, path):
+        if path.startswith(self.BASE_DIR):
+            return path[len(self.BASE_DIR):]
+        return path
+
+    def _allocate(self, path, start, length, size, owner):
+        self.blocks.assign(start, length, path, owner)
+        self.paths[path] = Extent(start, length, size)
+        self.directories.add(self._relative(path))
+
+    def _release(self, path):
+        extent = self.paths.pop(path)
+        self.directories.remove(self._relative(path))
 
-            if remaining_size <= 0:
-                return blocks
+        self.blocks.clear(extent.start, extent.length)
+        self.free_extents.release(extent.start, extent.length)
+        self.max_available_blocks += extent.length
+        return extent
 
-        raise Exception('size available suggest there is enough space, but it was NOT found')
+    def reserve_extent(self, label, n):
+        # takes a run of n blocks labelled label in the block table, None when no run is long enough
+        if label in self.reserved or label in self.paths:
+            raise Exception(f'{label} already holds blocks')
 
-    def get_utilization_map(self):
-        return [ (block if not block.is_free else None) for block in self.blocks ]
+        if not self.free_extents.fits(n) and not (self.defragment and self.defragmenter.compact(n)):
+            return None
+
+        start = self.free_extents.find(n)
+        self.blocks.assign(start, n, label, None)
+        self.max_available_blocks -= self.free_extents.take(start, n)
+        extent = self.reserved[label] = Extent(start, n, n * self.BLOCK_SIZE)
+        return extent
+
+    def release_extent(self, label):
+        extent = self.reserved.pop(label, None)
+        if extent is None:
+            return False
+
+        self.blocks.clear(extent.start, extent.length)
+        self.free_extents.release(extent.start, extent.length)
+        self.max_available_blocks += extent.length
+        return True
 
     def load_block(self, path, starting_block, size):
-        for block in self.blocks[starting_block:starting_block + size]:
-            block.path = path
-            block.owner = None
-        self.paths[path] = self.blocks[starting_block:starting_block + size]
+        self._allocate(path, starting_block, size, size * self.BLOCK_SIZE, None)
+        self.max_available_blocks -= self.free_extents.reserve(starting_block, size)
 
     def create(self, bytes, path, owner):
         return self._write(bytes, path, owner)
@@ -74,64 +397,354 @@ class FileSystemManager():
     def update(self, bytes, path, owner):
         return self._write(bytes, path, owner)
 
+    def _store(self, path, start, bytes):
+        self.storage.store(path, start, bytes)
+
+    def _store_at(self, path, start, offset, bytes):
+        self.storage.store_at(path, start, offset, bytes)
+
+    def _load(self, path, copy=True):
+        extent = self.paths.get(path)
+        if extent is None:
+            return self.storage.load(path, None, None, copy)
+        return self.storage.load(path, extent.start, extent.size, copy)
+
+    def _get_data_blocks(self, extent):
+        return range(extent.start, extent.start + -(-extent.size // self.BLOCK_SIZE))
+
+    def _cache_content(self, extent, bytes):
+        for index in range(0, len(bytes), self.BLOCK_SIZE):
+            self.cache.put(extent.start + index // self.BLOCK_SIZE, bytes[index:index + self.BLOCK_SIZE])
+
+        # whether the whole content is still cached
+        return all(id in self.cache for id in self._get_data_blocks(extent))
+
+    def _join_cached_content(self, extent, evicted_id=None, evicted_content=None):
+        pages = [evicted_content if id == evicted_id else self.cache.peek(id) for id in self._get_data_blocks(extent)]
+        return b''.join(pages)
+
+    def _invalidate_cache(self, start, length):
+        if self.cache is None:
+            return
+
+        for id in range(start, start + length):
+            self.cache.invalidate(id)
+
+    def _on_cache_evict(self, id, content, dirty):
+        if not dirty:
+            return
+
+        # every block of a dirty file is cached, writes the whole file back once any of them leaves
+        path = self.blocks.get_path(id)
+        extent = self.paths[path]
+        self._store(path, extent.start, self._join_cached_content(extent, id, content))
+
+        for block_id in self._get_data_blocks(extent):
+            self.cache.mark_clean(block_id)
+        self.dirty_paths.discard(path)
+
+    def _flush_path(self, path):
+        extent = self.paths[path]
+        self._store(path, extent.start, self._join_cached_content(extent))
+
+        for id in self._get_data_blocks(extent):
+            self.cache.mark_clean(id)
+        self.dirty_paths.discard(path)
+
+    def flush(self):
+        for path in list(self.dirty_paths):
+            self._flush_path(path)
+
+    def _write_content(self, path, extent, bytes):
+        if self.cache is not None:
+            cached = self._cache_content(extent, bytes)
+
+            # write back keeps the content only in the cache, unless it cannot hold the whole file
+            if self.write_back and cached:
+                self.dirty_paths.add(path)
+                for id in self._get_data_blocks(extent):
+                    self.cache.mark_dirty(id)
+                return
+
+        self._store(path, extent.start, bytes)
+
+    def get_cache_stats(self):
+        if self.cache is None:
+            return {}
+        return self.cache.get_stats()
+
+    def _place(self, path, size, owner):
+        # gives path an extent for size bytes, without writing its content
+        if path in self.reserved:
+            return None
+
+        if path in self.paths:
+            extent = self.paths[path]
+            if not self._resize(path, self.get_blocks_count(size)):
+                return None
+
+            # the whole content is replaced, including any only held by the cache
+            self._invalidate_cache(extent.start, extent.length)
+            self.dirty_paths.discard(path)
+
+            self.blocks.assign(extent.start, extent.length, path, owner)
+            extent.size = size
+            return extent
+
+        if size / self.BLOCK_SIZE > self.max_available_blocks:
+            return None
+
+        # rejects writes without a large enough contiguous run upfront
+        n = self.get_blocks_count(size)
+        if not self.free_extents.fits(n) and not (self.defragment and self.defragmenter.compact(n)):
+            return None
+
+        start = self.free_extents.find(n)
+        self._allocate(path, start, n, size, owner)
+        self.max_available_blocks -= self.free_extents.take(start, n)
+        return self.paths[path]
+
     def _write(self, bytes, path, owner):
         path = self.BASE_DIR + path
-        if len(bytes) / self.BLOCK_SIZE > self.max_available_blocks:
+        created = path not in self.paths
+
+        extent = self._place(path, len(bytes), owner)
+        if extent is None:
             return False
 
-        blocks = self.get_available_blocks(len(bytes))
         try:
-            if not os.path.exists(os.path.dirname(path)):
-                os.makedirs(os.path.dirname(path))
-
-            with open(path, 'wb') as f:
-                f.write(bytes)
-            
-            for block in blocks:
-                block.path = path
-                block.owner = owner
-            
-            self.max_available_blocks -= len(blocks)
-            self.paths[path] = blocks
-            self.save_paths_lock()
+            self._write_content(path, extent, bytes)
+        except Exception as e:
+            # a failed create leaves no trace
+            if created:
+                self._release(path)
+            return False
+
+        self.save_paths_lock(FileSystemManager.OPERATION_WRITE, path)
+        if self.tracer is not None:
+            self.tracer.record(TraceRecorder.EVENT_FILE_WRITE, path, len(bytes))
+        return True
+
+    def _resize(self, path, n, preserve=False):
+        # makes the extent of path n blocks long, in place when possible, otherwise somewhere else
+        extent = self.paths[path]
+        owner = self.blocks.get_owner(extent.start)
+
+        if n <= extent.length:
+            tail = extent.length - n
+            if tail:
+                self._invalidate_cache(extent.start + n, tail)
+                self.blocks.clear(extent.start + n, tail)
+                self.free_extents.release(extent.start + n, tail)
+                self.max_available_blocks += tail
+                extent.length = n
+            return True
+
+        extra = n - extent.length
+        if extra > self.max_available_blocks:
+            return False
+
+        end = extent.start + extent.length
+        if self.free_extents.get_free_run(end) >= extra:
+            self.max_available_blocks -= self.free_extents.reserve(end, extra)
+            self.blocks.assign(end, extra, path, owner)
+            extent.length = n
+            return True
+
+        # the blocks of the file are free to take for its new location
+        self.free_extents.release(extent.start, extent.length)
+        start = self.free_extents.find(n)
+        if start is None:
+            self.free_extents.reserve(extent.start, extent.length)
+            return False
+
+        self.free_extents.take(start, n)
+        self.max_available_blocks -= extra
+
+        self._invalidate_cache(extent.start, extent.length)
+        self.blocks.clear(extent.start, extent.length)
+        self.blocks.assign(start, n, path, owner)
+
+        self.storage.move(path, extent.start, start, extent.size if preserve else 0)
+
+        extent.start = start
+        extent.length = n
+        return True
+
+    def move(self, path, start):
+        # relocates the blocks of path to start, which must be free apart from blocks of path itself
+        extent = self.paths[path]
+        owner = self.blocks.get_owner(extent.start)
+
+        # the content has to be on the disk before it is moved
+        if path in self.dirty_paths:
+            self._flush_path(path)
+
+        self.storage.move(path, extent.start, start, extent.size)
+
+        self._invalidate_cache(extent.start, extent.length)
+        self.blocks.clear(extent.start, extent.length)
+        self.free_extents.release(extent.start, extent.length)
+        self.free_extents.reserve(start, extent.length)
+        self.blocks.assign(start, extent.length, path, owner)
+
+        extent.start = start
+        self.save_paths_lock(FileSystemManager.OPERATION_WRITE, path)
+
+    def get_defragmentation_stats(self):
+        return self.defragmenter.stats
+
+    def write_at(self, path, offset, data):
+        path = self.BASE_DIR + path
+        extent = self.paths.get(path)
+        if extent is None or offset < 0:
+            return False
+
+        if path in self.dirty_paths:
+            self._flush_path(path)
+
+        size = max(extent.size, offset + len(data))
+        if not self._resize(path, self.get_blocks_count(size), preserve=True):
+            return False
+
+        try:
+            # zero fills any gap past the end of the file
+            if offset > extent.size:
+                data = bytes(offset - extent.size) + data
+                offset = extent.size
+
+            self._store_at(path, extent.start, offset, data)
+            extent.size = size
+
+            first_block = offset // self.BLOCK_SIZE
+            self._invalidate_cache(extent.start + first_block, self.get_blocks_count(offset + len(data)) - first_block)
+            self.save_paths_lock(FileSystemManager.OPERATION_WRITE, path)
+            if self.tracer is not None:
+                self.tracer.record(TraceRecorder.EVENT_FILE_WRITE, path, len(data))
 
             return True
         except Exception as e:
             return False
 
-    def read(self, path):
+    def append(self, path, data):
+        extent = self.paths.get(self.BASE_DIR + path)
+        if extent is None:
+            return False
+
+        return self.write_at(path, extent.size, data)
+
+    def read(self, path, copy=True):
+        content, read = self._read(path, copy)
+        if read and self.tracer is not None:
+            self.tracer.record(TraceRecorder.EVENT_FILE_READ, self.BASE_DIR + path, len(content))
+        return content, read
+
+    def _read(self, path, copy=True):
+        # reads without recording an event, for callers that record it themselves
         path = self.BASE_DIR + path
+        extent = self.paths.get(path)
+        if self.cache is not None and extent is not None and copy:
+            pages = []
+            for id in self._get_data_blocks(extent):
+                page = self.cache.get(id)
+                if page is None:
+                    break
+                pages.append(page)
+            else:
+                return b''.join(pages), True
+
         try:
-            with open(path, 'rb') as f:
-                return f.read(), True
+            content = self._load(path, copy)
         except Exception as e:
             return bytes(), False
 
+        if self.cache is not None and extent is not None and copy:
+            self._cache_content(extent, content)
+        return content, True
+
     def delete(self, path, process):
         path = self.BASE_DIR + path
         try:
             if path in self.paths:
-                blocks = self.paths[path]
-                if blocks and process.type < blocks[0].owner.type:
+                extent = self.paths[path]
+                if process.type < self.blocks.get_owner(extent.start).type:
                     return False
-                
-                for block in blocks:
-                    block.owner = None
-                    block.path = None
 
-                del self.paths[path]
-                self.save_paths_lock()
+                # dirty content never written to the storage is dropped along with the file
+                stored = True
+                if self.cache is not None:
+                    self._invalidate_cache(extent.start, extent.length)
+                    if path in self.dirty_paths:
+                        self.dirty_paths.discard(path)
+                        stored = self.storage.contains(path, extent.start)
 
-                self.max_available_blocks += len(blocks)
-            os.remove(path)
-            return True
+                self._release(path)
+                self.save_paths_lock(FileSystemManager.OPERATION_DELETE, path)
+                if self.tracer is not None:
+                    self.tracer.record(TraceRecorder.EVENT_FILE_DELETE, path)
+
+                if stored:
+                    self.storage.remove(path, extent.start)
+                return True
+
+            # only host files can exist without blocks
+            return self.storage.remove(path, None)
         except:
             pass
 
-    def show_disk_usage(self):
+    def listdir(self, path=''):
+        return self.directories.listdir(path)
+
+    def walk(self, path=''):
+        return self.directories.walk(path)
+
+    def stat(self, path):
+        if self.directories.is_file(path):
+            extent = self.paths.get(self.BASE_DIR + path) or self.paths[path]
+            owner = self.blocks.get_owner(extent.start)
+            return {
+                'type': 'file',
+                'size': extent.size,
+                'start': extent.start,
+                'blocks': extent.length,
+                'owner': owner.pid if owner is not None else None,
+            }
+
+        node = self.directories.get_directory(path)
+        if node is None:
+            return None
+        return {
+            'type': 'directory',
+            'entries': len(node.directories) + len(node.files),
+            'files': node.count,
+        }
+
+    def delete_tree(self, path, process):
+        # deletes every file below path the process may delete, returns how many were
+        deleted = 0
+        for file in list(self.directories.files(path)):
+            if self.delete(file, process):
+                deleted += 1
+        return deleted
+
+    DISK_USAGE_BLOCKS = 'blocks'
+    DISK_USAGE_EXTENTS = 'extents'
+    DISK_USAGE_BAR = 'bar'
+
+    def show_disk_usage(self, mode=DISK_USAGE_BLOCKS, width=64):
         print('Disk utilization:')
-        for block in self.blocks:
-            if block.is_free:
-                print('\tBlock {}: [   ]'.format(block.id))
-            else:
-                print('\tBlock {}: [ {} ]'.format(block.id, block.path))
\ No newline at end of file
+        if mode == FileSystemManager.DISK_USAGE_BAR:
+            used = [(start, length) for start, length, path, owner in self.blocks.runs() if path is not None or owner is not None]
+            print(f'\t[{get_density_bar(used, self.blocks.size, width)}] {self.blocks.size - self.free_extents.free}/{self.blocks.size} blocks used')
+            return
+
+        for start, length, path, owner in self.blocks.runs():
+            if mode == FileSystemManager.DISK_USAGE_EXTENTS:
+                print(f'\tBlocks {start}-{start + length - 1}: ' + (f'[ {path} ]' if path is not None else '[   ]'))
+                continue
+
+            for id in range(start, start + length):
+                if path is None and owner is None:
+                    print('\tBlock {}: [   ]'.format(id))
+                else:
+                    print('\tBlock {}: [ {} ]'.format(id, path))
\ No newline at end of file
@@ -1,4 +1,11 @@
 from src.process_module import Process
+from src.trace_module import TraceRecorder
+from lib.buddy import BuddyAllocator
+from lib.extents import FreeExtentIndex
+from lib.utils import get_density_bar
+from src.defragmentation_module import MemoryDefragmenter
+
+import time
 
 class MemoryBlock():
 
@@ -11,9 +18,125 @@ class MemoryBlock():
     def is_free(self):
         return self.owner is None
 
+class FirstFitAllocator():
+
+    def __init__(self, size):
+        self.size = size
+        self.free_extents = FreeExtentIndex(size)
+        # start -> blocks
+        self.allocations = {}
+
+    @property
+    def free(self):
+        return self.free_extents.free
+
+    @property
+    def capacity(self):
+        # the largest allocation the pool could ever hold
+        return self.size
+
+    @property
+    def largest(self):
+        return self.free_extents.largest
+
+    @property
+    def requested(self):
+        return sum(self.allocations.values())
+
+    @property
+    def reserved(self):
+        return self.requested
+
+    def find(self, n):
+        return self.free_extents.find(n)
+
+    def get_size(self, n):
+        return n
+
+    def allocate(self, n):
+        start = self.free_extents.allocate(n)
+        if start is not None:
+            self.allocations[start] = n
+        return start
+
+    def get_requested(self, start):
+        return self.allocations[start]
+
+    def reserve(self, start, n):
+        # allocates n blocks exactly at start, None if any of them is taken
+        if self.free_extents.get_free_run(start) < n:
+            return None
+
+        self.free_extents.reserve(start, n)
+        self.allocations[start] = n
+        return start
+
+    def free_blocks(self, start):
+        n = self.allocations.pop(start)
+        self.free_extents.release(start, n)
+        return n
+
+    def move(self, start, target):
+        # target must be free apart from the blocks of the allocation itself
+        n = self.allocations.pop(start)
+        self.free_extents.release(start, n)
+        self.free_extents.reserve(target, n)
+        self.allocations[target] = n
+        return n
+
+class AllocationStats():
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.allocations = 0
+        self.frees = 0
+        self.failures = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.free_latency = 0.0
+        self.peak_used = 0
+
+    def record_allocation(self, latency, succeeded=True):
+        if succeeded:
+            self.allocations += 1
+        else:
+            self.failures += 1
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def record_free(self, latency):
+        self.frees += 1
+        self.free_latency += latency
+
+    def record_occupancy(self, used):
+        self.peak_used = max(self.peak_used, used)
+
+    def to_dict(self, allocator):
+        attempts = self.allocations + self.failures
+        return {
+            'engine': self.engine,
+            'allocations': self.allocations,
+            'frees': self.frees,
+            'failures': self.failures,
+            'mean_latency': self.latency / attempts if attempts else 0.0,
+            'max_latency': self.max_latency,
+            'mean_free_latency': self.free_latency / self.frees if self.frees else 0.0,
+            'peak_used': self.peak_used,
+            # blocks reserved beyond what was requested
+            'internal_fragmentation': 1 - allocator.requested / allocator.reserved if allocator.reserved else 0.0,
+            # free blocks outside the largest free run
+            'external_fragmentation': 1 - allocator.largest / allocator.free if allocator.free else 0.0,
+        }
+
 class MemoryManager():
+    ENGINE_FIRST_FIT = 'first_fit'
+    ENGINE_BUDDY = 'buddy'
+    ENGINES = {
+        ENGINE_FIRST_FIT: FirstFitAllocator,
+        ENGINE_BUDDY: BuddyAllocator,
+    }
 
-    def __init__(self, blocks={}, block_size=1048576) -> None:
+    def __init__(self, blocks={}, block_size=1048576, engines={}, defragment=False) -> None:
         self.blocks = {
             priority: MemoryManager._create_memory_blocks(blocks[priority], block_size) for priority in blocks
         }
@@ -21,53 +144,186 @@ class MemoryManager():
             priority: blocks[priority] for priority in blocks
         }
 
+        # allocation engine of each priority pool, first fit unless told otherwise
+        self.allocators = {
+            priority: MemoryManager.ENGINES[engines.get(priority, MemoryManager.ENGINE_FIRST_FIT)](blocks[priority]) for priority in blocks
+        }
+        self.stats = {
+            priority: AllocationStats(engines.get(priority, MemoryManager.ENGINE_FIRST_FIT)) for priority in blocks
+        }
+
+        # process -> (pool, starting block) of its allocation
+        self.allocations = {}
+
+        # first fit pools are compacted when an allocation finds enough free blocks but no run long enough,
+        # buddy pools are left alone as moving their blocks would break the alignment of their orders
+        self.tracer = None
+
+        self.defragment = defragment
+        self.defragmenters = {
+            priority: MemoryDefragmenter(self, priority) for priority in blocks if isinstance(self.allocators[priority], FirstFitAllocator)
+        }
+
     @staticmethod
     def _create_memory_blocks(n, block_size):
         return [MemoryBlock(i, block_size) for i in range(n)]
 
-        
-    def get_available_blocks(self, n, priority):
+    @staticmethod
+    def get_pool(priority):
         if priority > 0:
-            priority = 3
+            return 3
+        return priority
+
+    def get_available_blocks(self, n, priority):
+        priority = MemoryManager.get_pool(priority)
+        n = max(n, 1)
 
         if n > self.available_memory_blocks[priority]:
             return []
 
-        blocks = []
-        remaining_blocks = n
-        for block in self.blocks[priority]:
-            if block.is_free:
-                remaining_blocks -= 1
-                blocks.append(block)
-            else:
-                blocks = []
-                remaining_blocks = n
+        start = self.allocators[priority].find(n)
+        if start is None and self._defragment(n, priority):
+            start = self.allocators[priority].find(n)
+        if start is None:
+            raise Exception('size available suggest there is enough space, but it was NOT found')
+
+        return self.blocks[priority][start:start + self.allocators[priority].get_size(n)]
+
+    def can_fit(self, n, priority):
+        # whether the pool could hold n blocks once enough of it is free
+        priority = MemoryManager.get_pool(priority)
+        return max(n, 1) <= self.allocators[priority].capacity
 
-            if remaining_blocks <= 0:
-                return blocks
+    def can_assign(self, n, priority):
+        # whether n blocks can be assigned right now, compacting the pool if that is what it takes
+        priority = MemoryManager.get_pool(priority)
+        n = max(n, 1)
 
-        raise Exception('size available suggest there is enough space, but it was NOT found')
+        if n > self.available_memory_blocks[priority]:
+            return False
+        return self.allocators[priority].find(n) is not None or self._defragment(n, priority)
 
+    def get_used_blocks(self, priority):
+        return len(self.blocks[priority]) - self.available_memory_blocks[priority]
 
     def assign_memory_blocks(self, n, process):
-        priority = process.priority
-        if priority > 0:
-            priority = 3
-
-        try:
-            blocks = self.get_available_blocks(n, priority)
-            for block in blocks:
-                block.owner = process
-            
-            self.available_memory_blocks[priority] -= len(blocks)
-            return True
-        except Exception as e:
+        priority = MemoryManager.get_pool(process.priority)
+        n = max(n, 1)
+
+        started_at = time.perf_counter()
+        start = None
+        if n <= self.available_memory_blocks[priority]:
+            start = self.allocators[priority].allocate(n)
+            if start is None and self._defragment(n, priority):
+                start = self.allocators[priority].allocate(n)
+        self.stats[priority].record_allocation(time.perf_counter() - started_at, start is not None)
+
+        if start is None:
             print('ERROR::\tfailed to write content to memory block')
             return False
 
+        blocks = self.blocks[priority][start:start + self.allocators[priority].get_size(n)]
+        for block in blocks:
+            block.owner = process
+
+        self.allocations[process] = (priority, start)
+        self.available_memory_blocks[priority] -= len(blocks)
+        self.stats[priority].record_occupancy(self.get_used_blocks(priority))
+        if self.tracer is not None:
+            self.tracer.record(TraceRecorder.EVENT_ALLOCATE, process.pid, len(blocks), priority)
+        return True
+
+    def reserve_memory_blocks(self, n, process, start):
+        # assigns the blocks from start to process, as restored from a snapshot
+        priority = MemoryManager.get_pool(process.priority)
+        if self.allocators[priority].reserve(start, n) is None:
+            return False
+
+        blocks = self.blocks[priority][start:start + self.allocators[priority].get_size(n)]
+        for block in blocks:
+            block.owner = process
+
+        self.allocations[process] = (priority, start)
+        self.available_memory_blocks[priority] -= len(blocks)
+        self.stats[priority].record_occupancy(self.get_used_blocks(priority))
+        return True
+
+    def _defragment(self, n, priority):
+        if not self.defragment or priority not in self.defragmenters:
+            return False
+        return self.defragmenters[priority].compact(n)
+
+    def move(self, priority, start, target):
+        n = self.allocators[priority].move(start, target)
+
+        blocks = self.blocks[priority]
+        owner = blocks[start].owner
+        for block in blocks[start:start + n]:
+            block.owner = None
+        for block in blocks[target:target + n]:
+            block.owner = owner
+
+        self.allocations[owner] = (priority, target)
+        return n
+
+    def get_defragmentation_stats(self):
+        return {
+            priority: defragmenter.stats for priority, defragmenter in self.defragmenters.items()
+        }
+
+    def free_memory_blocks(self, process):
+        if process not in self.allocations:
+            return False
+
+        priority, start = self.allocations.pop(process)
+
+        started_at = time.perf_counter()
+        n = self.allocators[priority].free_blocks(start)
+        self.stats[priority].record_free(time.perf_counter() - started_at)
+
+        for block in self.blocks[priority][start:start + n]:
+            block.owner = None
+
+        self.available_memory_blocks[priority] += n
+        if self.tracer is not None:
+            self.tracer.record(TraceRecorder.EVENT_FREE, process.pid, n, priority)
+        return True
+
+    def get_allocation_stats(self):
+        return {
+            priority: self.stats[priority].to_dict(self.allocators[priority]) for priority in self.stats
+        }
+
+    def get_utilization_map(self, priority):
+        # (start, length, owner) runs of the pool, owner None for free blocks
+        utilization_map = []
+        for block in self.blocks[priority]:
+            if utilization_map and utilization_map[-1][2] is block.owner:
+                start, length, owner = utilization_map[-1]
+                utilization_map[-1] = (start, length + 1, owner)
+            else:
+                utilization_map.append((block.id, 1, block.owner))
+        return utilization_map
+
+    def show_memory_map(self, width=64):
+        print('\nMemory utilization:')
+        for priority, blocks in self.blocks.items():
+            used = [(start, length) for start, length, owner in self.get_utilization_map(priority) if owner is not None]
+            print(f'\t{Process.get_priority_description(priority)}: [{get_density_bar(used, len(blocks), width)}] '
+                  f'{len(blocks) - self.available_memory_blocks[priority]}/{len(blocks)} blocks used')
+
     def show_available_memory(self):
         print('\nAvailable memory:')
 
         for priority, memory_blocks in self.available_memory_blocks.items():
             print(f'\t{Process.get_priority_description(priority)}: {memory_blocks}')
-     
+
+    def show_allocation_stats(self):
+        print('\nMemory allocation:')
+
+        for priority, stats in self.get_allocation_stats().items():
+            print(f'\t{Process.get_priority_description(priority)} ({stats["engine"]}): '
+                  f'{stats["allocations"]} allocations, {stats["failures"]} failures, {stats["peak_used"]} blocks peak use, '
+                  f'{stats["mean_latency"] * 1e6:.2f}us mean latency, '
+                  f'{stats["internal_fragmentation"]:.2%} internal / {stats["external_fragmentation"]:.2%} external fragmentation')
+
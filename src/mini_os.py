@@ -1,26 +1,68 @@
 from src.process_module import Process
 from src.resource_module import ResourceManager
 from src.memory_module import MemoryManager
-from src.queue_module import QueueManager
+from src.cpu_module import CPUManager
 from src.filesystem_module import FileSystemManager
+from src.virtual_memory_module import VirtualMemoryManager
+from src.trace_module import TraceRecorder
+from src.snapshot_module import Snapshot, decode_state, encode_state
 
 import os
+import heapq
+import zlib
 
 DEBUG = os.environ.get('debug', 'false').lower() == 'true'
 import time
 class MiniOS():
+    # quiet prints only the final report, summary adds compact maps and a status line every summary_interval ticks
+    VERBOSITY_QUIET = 0
+    VERBOSITY_SUMMARY = 1
+    VERBOSITY_FULL = 2
 
-    def __init__(self, quantum=1) -> None:
+    def __init__(self, quantum=1, time_scale=1, defragment=False, cores=1, aging=1, max_process_age=2, user_memory_blocks=960, realtime_memory_blocks=64, disk_blocks=None, tracer=None, verbosity=VERBOSITY_FULL, summary_interval=1000, virtual_memory=None, swap_blocks=64, storage='host', scheduler='priority', quanta=None, seed=0) -> None:
         self.processes = {}
         self.quantum = quantum
+        # wall clock seconds slept per tick are quantum * time_scale, 0 runs as fast as possible
+        self.time_scale = time_scale
+        self.verbosity = verbosity
+        self.summary_interval = summary_interval
+        # compacts memory pools and the disk a slice per tick while they are fragmented
+        self.defragment = defragment
+
+        # heap of (start_time, sequence, process) not yet arrived
+        self.arrivals = []
+        self.arrival_sequence = 0
+        self.cpu_time = 0
+
+        # stream of processes read from the trace, pulled as their arrivals come near
+        self.loader = None
+        self.processes_path = None
+        self.loaded_until = None
+        self.loader_stats = {'rows': 0, 'seconds': 0.0}
+
+        # totals over the processes that finished, and the ones never run
+        self.metrics = {
+            'finished': 0,
+            'wait': 0,
+            'turnaround': 0,
+            'spawn_failures': 0,
+            'admission_failures': 0,
+        }
 
         self.memory_manager = MemoryManager(
             blocks={
-                Process.TYPE_USER: 960,
-                Process.TYPE_REALTIME: 64,
-            }
+                Process.TYPE_USER: user_memory_blocks,
+                Process.TYPE_REALTIME: realtime_memory_blocks,
+            },
+            defragment=defragment,
         )
 
+        # memory is taken on arrival and given back on completion. Per pool, a heap of (priority, sequence, process)
+        # arrived without enough memory, retried in order whenever the pool gets blocks back
+        self.pending = {pool: [] for pool in self.memory_manager.blocks}
+        self.pending_sequence = 0
+        self.admission_stats = {pool: MiniOS._create_admission_stats() for pool in self.memory_manager.blocks}
+
         self.resource_manager = ResourceManager(
             scanners=1,
             printers=2,
@@ -28,65 +70,306 @@ class MiniOS():
             sata_devices=2,
         )
 
-        self.queue_manager = QueueManager(
-            aging=1,
-            max_process_age=2,
+        # one scheduler per simulated core, running one of the policies of scheduling_module
+        self.cpu_manager = CPUManager(
+            cores=cores,
+            aging=aging,
+            max_process_age=max_process_age,
+            scheduler=scheduler,
+            quanta=quanta,
+            seed=seed,
         )
 
+        # user processes page their memory in on demand, with the given replacement policy, instead of
+        # holding all of it contiguously. Realtime processes keep their contiguous pool
+        self.virtual_memory_manager = None
+        self.swap_blocks = swap_blocks
+        if virtual_memory is not None:
+            self.virtual_memory_manager = VirtualMemoryManager(frames=user_memory_blocks, policy=virtual_memory)
+
+        # overrides the disk size read from the files description. Files live on the host, or in memory with storage='memory'
+        self.disk_blocks = disk_blocks
+        self.storage = storage
         self.filesystem_manager  = FileSystemManager(
-            blocks=100,
+            blocks=disk_blocks or 100,
             block_size=8192,
+            defragment=defragment,
+            storage=storage,
         )
+        if self.virtual_memory_manager is not None:
+            self.virtual_memory_manager.attach_swap(self.filesystem_manager, swap_blocks)
 
-    def _parse_process_description(self, start_time, priority, cpu_time, memory_blocks, printer, scanner, modem, disk):
-        start_time = int(start_time)
-        priority = int(priority)
-        cpu_time = int(cpu_time)
-        memory_blocks = int(memory_blocks)
-        printer = int(printer)
-        scanner = int(scanner)
-        modem = int(modem)
-        disk = int(disk)
+        # records the events of the run when set
+        self.set_tracer(tracer)
+
+        # last snapshot written and the crc of each of its sections, incremental snapshots write the ones changed since
+        self.snapshot_path = None
+        self.snapshot_crcs = {}
+        # real paths of that snapshot and its parents, none of them can be overwritten by an increment
+        self.snapshot_chain = set()
+
+    @staticmethod
+    def _create_admission_stats():
+        return {
+            'admitted': 0,
+            'delay': 0,
+            'max_delay': 0,
+            'peak_pending': 0,
+        }
 
-        return start_time, priority, cpu_time, memory_blocks, printer, scanner, modem, disk
+    def set_tracer(self, tracer):
+        self.tracer = tracer
+        if tracer is not None:
+            self.memory_manager.tracer = tracer
+            self.cpu_manager.set_tracer(tracer)
+            self.filesystem_manager.tracer = tracer
+
+    def snapshot(self, path, incremental=False):
+        # page tables, frames and swap slots are not part of the format, so paged runs cannot be saved
+        if self.virtual_memory_manager is not None:
+            raise ValueError('snapshots do not support virtual memory')
+
+        # blocks only held by a write-back cache would be missing from the saved content
+        self.filesystem_manager.flush()
+        sections = encode_state(self)
+        crcs = {id: zlib.crc32(payload) for id, payload in sections.items()}
+
+        parent = None
+        if incremental and self.snapshot_path is not None:
+            if os.path.realpath(path) in self.snapshot_chain:
+                raise ValueError(f'{path} is part of the snapshot chain of {self.snapshot_path}, an increment cannot overwrite it')
+            parent = self.snapshot_path
+            sections = {id: payload for id, payload in sections.items() if self.snapshot_crcs.get(id) != crcs[id]}
+
+        Snapshot.write(path, sections, parent)
+        if parent is None:
+            self.snapshot_chain = set()
+        self.snapshot_chain.add(os.path.realpath(path))
+        self.snapshot_path = path
+        self.snapshot_crcs = crcs
+        return len(sections)
+
+    def restore(self, path):
+        # replaces the whole state of the simulator with the snapshot, run() resumes from it
+        sections = Snapshot.read(path)
+        decode_state(self, sections)
+        self.set_tracer(self.tracer)
+
+        self.snapshot_path = path
+        self.snapshot_crcs = {id: zlib.crc32(payload) for id, payload in sections.items()}
+        self.snapshot_chain = set(Snapshot.get_chain(path))
+
+    def _parse_process_description(self, start_time, priority, cpu_time, memory_blocks, printer, scanner, modem, disk):
+        return tuple(map(int, (start_time, priority, cpu_time, memory_blocks, printer, scanner, modem, disk)))
 
     def _parse_occupied_blocks_data(self, path, starting_block, size):
         return path, int(starting_block), int(size)
 
-    def load_processes(self, path):
-        # reads input file
-        data = []
+    @staticmethod
+    def _read_lines(path, chunk_size):
+        # reads the file in chunks, yielding one line at a time
         with open(path) as f:
-            data = f.read().split('\n')
+            remainder = ''
+            for chunk in iter(lambda: f.read(chunk_size), ''):
+                lines = (remainder + chunk).split('\n')
+                remainder = lines.pop()
+                yield from lines
+            yield remainder
+
+    def _stream_processes(self, path, chunk_size, skip=0):
+        id = 0
+        for line in MiniOS._read_lines(path, chunk_size):
+            # tolerates blank and trailing lines
+            if not line.strip():
+                continue
+
+            # rows loaded before a snapshot was taken
+            if skip:
+                skip -= 1
+                id += 1
+                continue
 
-        # parses read data
-        processes = []
-        for id, line in enumerate(data):
             start_time, priority, cpu_time, memory_blocks, printer, scanner, modem, disk = self._parse_process_description(*line.split(','))
-            
-            if not self.memory_manager.get_available_blocks(memory_blocks, priority):
-                print(f'ERROR::\tfailed to spawn process p{id}. No more memory avaialble for priority {priority}')
+            id += 1
+            self.loader_stats['rows'] += 1
+
+            # only processes that could never fit are rejected, the others wait for memory once they arrive
+            if not self.is_paged(priority) and not self.memory_manager.can_fit(memory_blocks, priority):
+                if self.verbosity >= MiniOS.VERBOSITY_FULL:
+                    print(f'ERROR::\tfailed to spawn process p{id - 1}. Not enough memory for priority {priority}')
+                self.metrics['spawn_failures'] += 1
                 continue
 
-            processes.append(
-                Process(
-                    pid=f'p{id}',
-                    start_time=start_time,
-                    priority=priority,
-                    cpu_time=cpu_time,
-                    memory_blocks=memory_blocks,
-                    printer=printer,
-                    scanner=scanner,
-                    modem=modem,
-                    disk=disk,
-                )
+            process = Process(
+                pid=f'p{id - 1}',
+                start_time=start_time,
+                priority=priority,
+                cpu_time=cpu_time,
+                memory_blocks=memory_blocks,
+                printer=printer,
+                scanner=scanner,
+                modem=modem,
+                disk=disk,
             )
-            
-            # assign memory blocks
-            self.memory_manager.assign_memory_blocks(memory_blocks, processes[-1])
+            yield process
+
+    def load_processes(self, path, chunk_size=1 << 16, skip=0):
+        self.processes_path = path
+        self.loader = self._stream_processes(path, chunk_size, skip)
+        self.loaded_until = None
+        self.feed_arrivals()
+
+    def feed_arrivals(self):
+        # pulls processes from the trace until one arrives after the current time. Traces are expected
+        # sorted by start time, processes listed out of order arrive as soon as they are read
+        while self.loader is not None and (self.loaded_until is None or self.loaded_until <= self.cpu_time):
+            started_at = time.perf_counter()
+            process = next(self.loader, None)
+            self.loader_stats['seconds'] += time.perf_counter() - started_at
+
+            if process is None:
+                self.loader = None
+                break
+
+            self.processes[process.pid] = process
+            self.schedule_arrival(process)
+            self.loaded_until = process.start_time
+
+    def schedule_arrival(self, process):
+        heapq.heappush(self.arrivals, (process.start_time, self.arrival_sequence, process))
+        self.arrival_sequence += 1
+
+    @property
+    def loader_throughput(self):
+        if not self.loader_stats['seconds']:
+            return 0.0
+        return self.loader_stats['rows'] / self.loader_stats['seconds']
 
-        # save to OS list of processes
-        self.processes = processes
+    def is_paged(self, priority):
+        return self.virtual_memory_manager is not None and priority != Process.TYPE_REALTIME
+
+    def allocate_memory(self, process):
+        # paged processes get their frames as they touch their pages
+        if self.is_paged(process.priority):
+            self.virtual_memory_manager.add_process(process)
+            return True
+
+        if not self.memory_manager.can_assign(process.memory_blocks, process.priority):
+            return False
+        return self.memory_manager.assign_memory_blocks(process.memory_blocks, process)
+
+    def admit(self, process):
+        if not self.resource_manager.can_satisfy(process):
+            if self.verbosity >= MiniOS.VERBOSITY_FULL:
+                print(f'ERROR::\tfailed to run process {process.pid}. Requested resources do not exist')
+            self.metrics['admission_failures'] += 1
+            del self.processes[process.pid]
+            return
+
+        if self.tracer is not None:
+            self.tracer.record(TraceRecorder.EVENT_ARRIVAL, process.pid)
+
+        # arrivals queue behind the processes already waiting for the pool
+        pool = MemoryManager.get_pool(process.priority)
+        heapq.heappush(self.pending[pool], (process.priority, self.pending_sequence, process))
+        self.pending_sequence += 1
+
+        if process not in self.admit_pending(pool):
+            stats = self.admission_stats[pool]
+            stats['peak_pending'] = max(stats['peak_pending'], len(self.pending[pool]))
+            if self.tracer is not None:
+                self.tracer.record(TraceRecorder.EVENT_PEND, process.pid, process.memory_blocks)
+
+    def admit_pending(self, pool):
+        # admits waiting processes in order until the first one that does not fit yet
+        admitted = []
+        pending = self.pending[pool]
+        while pending and self.allocate_memory(pending[0][2]):
+            process = heapq.heappop(pending)[2]
+            admitted.append(process)
+
+            delay = self.cpu_time - process.start_time
+            stats = self.admission_stats[pool]
+            stats['admitted'] += 1
+            stats['delay'] += delay
+            stats['max_delay'] = max(stats['max_delay'], delay)
+            if delay and self.tracer is not None:
+                self.tracer.record(TraceRecorder.EVENT_ADMIT, process.pid, delay)
+
+            self.enqueue(process)
+        return admitted
+
+    def enqueue(self, process):
+        # processes wait out of the queues for their resources
+        if self.resource_manager.acquire(process):
+            self.cpu_manager.add_process(process)
+        else:
+            self.cpu_manager.park(process)
+            if self.tracer is not None:
+                self.tracer.record(TraceRecorder.EVENT_PARK, process.pid)
+
+    def finish(self, process):
+        del self.processes[process.pid]
+
+        # finished during the current tick
+        turnaround = self.cpu_time + 1 - process.start_time
+        self.metrics['finished'] += 1
+        self.metrics['turnaround'] += turnaround
+        self.metrics['wait'] += turnaround - process.burst_time
+
+        for woken_process in self.resource_manager.release(process):
+            self.cpu_manager.wake(woken_process)
+            if self.tracer is not None:
+                self.tracer.record(TraceRecorder.EVENT_WAKE, woken_process.pid)
+
+        # processes woken above had their memory already, the memory freed goes to the ones waiting for it
+        if self.is_paged(process.priority):
+            self.virtual_memory_manager.remove_process(process)
+        elif self.memory_manager.free_memory_blocks(process):
+            self.admit_pending(MemoryManager.get_pool(process.priority))
+
+    def get_admission_stats(self):
+        # per pool, processes admitted, their delay from arrival to admission, the longest pending queue and the peak blocks in use
+        allocation_stats = self.memory_manager.get_allocation_stats()
+        return {
+            pool: {
+                'admitted': stats['admitted'],
+                'pending': len(self.pending[pool]),
+                'average_delay': stats['delay'] / stats['admitted'] if stats['admitted'] else 0.0,
+                'max_delay': stats['max_delay'],
+                'peak_pending': stats['peak_pending'],
+                'peak_used': allocation_stats[pool]['peak_used'],
+                'size': len(self.memory_manager.blocks[pool]),
+            } for pool, stats in self.admission_stats.items()
+        }
+
+    def show_admission_stats(self):
+        print('ADMISSION:')
+        for pool, stats in self.get_admission_stats().items():
+            print(f'\t{Process.get_priority_description(pool)}: {stats["admitted"]} admitted, {stats["average_delay"]:.2f} average / '
+                  f'{stats["max_delay"]} max delay, {stats["peak_pending"]} peak pending, {stats["peak_used"]}/{stats["size"]} blocks peak use')
+
+    def get_metrics(self):
+        finished = self.metrics['finished']
+        admitted = sum(stats['admitted'] for stats in self.admission_stats.values())
+        return {
+            'makespan': self.cpu_time,
+            'finished': finished,
+            'average_wait': self.metrics['wait'] / finished if finished else 0.0,
+            'average_turnaround': self.metrics['turnaround'] / finished if finished else 0.0,
+            # processes finished per tick
+            'throughput': finished / self.cpu_time if self.cpu_time else 0.0,
+            'spawn_failures': self.metrics['spawn_failures'],
+            'admission_failures': self.metrics['admission_failures'],
+            'average_admission_delay': sum(stats['delay'] for stats in self.admission_stats.values()) / admitted if admitted else 0.0,
+            'max_admission_delay': max((stats['max_delay'] for stats in self.admission_stats.values()), default=0),
+            'allocation_failures': self.metrics['spawn_failures'] + sum(stats['failures'] for stats in self.memory_manager.get_allocation_stats().values()),
+        }
+
+    def defragment_tick(self):
+        for defragmenter in self.memory_manager.defragmenters.values():
+            defragmenter.tick()
+        self.filesystem_manager.defragmenter.tick()
 
     def load_files(self, path):
         # reads input file
@@ -97,59 +380,145 @@ class MiniOS():
         for index, line in enumerate(data):
             data[index] = line.split(',')
 
-        blocks = int(data[0][0])
+        blocks = self.disk_blocks or int(data[0][0])
         occupied_blocks = int(data[1][0])
         occupied_blocks_data = data[2:2+occupied_blocks]
 
         self.filesystem_manager = FileSystemManager(
             blocks=blocks,
-            block_size=1
+            block_size=1,
+            defragment=self.defragment,
+            storage=self.storage,
         )
+        self.filesystem_manager.tracer = self.tracer
         for i in range(occupied_blocks):
             self.filesystem_manager.load_block(*self._parse_occupied_blocks_data(*occupied_blocks_data[i]))
+
+        # swap takes free blocks of the new disk, after the files described are in place
+        if self.virtual_memory_manager is not None:
+            self.virtual_memory_manager.attach_swap(self.filesystem_manager, self.swap_blocks)
             
 
-    def start(self):
-        print('------[ START ]------')
-        # prints initial states
-        self.memory_manager.show_available_memory()
-        self.resource_manager.show_available_resources()
-        self.queue_manager.show_queues()
-        print('\n==================================\n\n')
-        # time.sleep(self.quantum)
+    def show_summary(self):
+        print(f'CPU TIME: {self.cpu_time} | RUNNING: {sum(process is not None for process in self.cpu_manager.get_active_processes())} '
+              f'| QUEUED: {len(self.cpu_manager)} | PARKED: {len(self.cpu_manager.parked)} | PENDING: {sum(map(len, self.pending.values()))} '
+              f'| FINISHED: {self.metrics["finished"]}')
+
+    def start(self, processes_path='processes.txt', files_path='files.txt', until=None):
+        full = self.verbosity >= MiniOS.VERBOSITY_FULL
+        summary = self.verbosity >= MiniOS.VERBOSITY_SUMMARY
 
+        if full:
+            print('------[ START ]------')
+            # prints initial states
+            self.memory_manager.show_available_memory()
+            self.resource_manager.show_available_resources()
+            self.cpu_manager.show_queues()
+            print('\n==================================\n\n')
+            # time.sleep(self.quantum)
 
-        print('------[ LOADING PROCESSES ]------')
+
+            print('------[ LOADING PROCESSES ]------')
         # loads processes, then print states
-        self.load_processes('processes.txt')
-        self.memory_manager.show_available_memory()
-        print('\n==================================\n\n')
-        # time.sleep(self.quantum)
+        self.load_processes(processes_path)
+        if full:
+            self.memory_manager.show_available_memory()
+            print('\n==================================\n\n')
+            # time.sleep(self.quantum)
 
-        print('------[ LOADING FILES ]------')
+            print('------[ LOADING FILES ]------')
         # loads processes, then print states
-        self.load_files('files.txt')
-        self.filesystem_manager.show_disk_usage()
-        print('\n==================================\n\n')
-        # time.sleep(self.quantum)
-
-        cpu_time = 0
-        finished = False
-        while not finished:
-            
+        self.load_files(files_path)
+        if full:
+            self.filesystem_manager.show_disk_usage()
+            print('\n==================================\n\n')
+            # time.sleep(self.quantum)
+        elif summary:
+            self.memory_manager.show_memory_map()
+            self.filesystem_manager.show_disk_usage(FileSystemManager.DISK_USAGE_BAR)
+            print()
+
+        self.cpu_time = 0
+        return self.run(until)
+
+    def run(self, until=None):
+        # runs until every process finished, or until the cpu time reaches until, resuming from the current state.
+        # Returns whether every process finished
+        full = self.verbosity >= MiniOS.VERBOSITY_FULL
+        summary = self.verbosity >= MiniOS.VERBOSITY_SUMMARY
+
+        next_summary = self.cpu_time
+        self.feed_arrivals()
+        while self.arrivals or len(self.cpu_manager) or self.cpu_manager.parked or any(self.pending.values()):
+            if until is not None and self.cpu_time >= until:
+                return False
+
+            # skips idle periods straight to the next arrival
+            if not len(self.cpu_manager) and self.arrivals and self.arrivals[0][0] > self.cpu_time:
+                # never past until, so a paused run resumes where it was asked to stop
+                if until is not None and self.arrivals[0][0] >= until:
+                    self.cpu_time = until
+                    return False
+                self.cpu_time = self.arrivals[0][0]
+                self.feed_arrivals()
+
+            if self.tracer is not None:
+                self.tracer.clock = self.cpu_time
+
             # add processes when its start time has arrived
-            for process in self.processes:
-                if process.start_time == cpu_time:
-                    self.queue_manager.add_process(process)
+            while self.arrivals and self.arrivals[0][0] <= self.cpu_time:
+                self.admit(heapq.heappop(self.arrivals)[2])
             
-            active_process = self.queue_manager.get_active_process()
-            if active_process is None:
-                active_process = ''
+            if full:
+                print(f'CPU TIME: {self.cpu_time}')
+                active_processes = self.cpu_manager.get_active_processes()
+                for core, active_process in enumerate(active_processes):
+                    if active_process is None:
+                        active_process = ''
 
-            print(f'CPU TIME: {cpu_time}')
-            print(f'ACTIVE PROCESS: {active_process}\n')
-            self.queue_manager.run_processes()
+                    if len(active_processes) > 1:
+                        print(f'ACTIVE PROCESS (CORE {core}): {active_process}\n')
+                    else:
+                        print(f'ACTIVE PROCESS: {active_process}\n')
+            elif summary and self.cpu_time >= next_summary:
+                self.show_summary()
+                next_summary = self.cpu_time - self.cpu_time % self.summary_interval + self.summary_interval
+
+            if self.virtual_memory_manager is not None:
+                self.virtual_memory_manager.tick(self.cpu_time)
+                for active_process in self.cpu_manager.get_active_processes():
+                    if active_process is not None:
+                        self.virtual_memory_manager.run(active_process)
+
+            for finished_process in self.cpu_manager.run_processes():
+                self.finish(finished_process)
             
-            cpu_time += 1
-            time.sleep(self.quantum)
+            if self.defragment:
+                self.defragment_tick()
+
+            self.cpu_time += 1
+            self.feed_arrivals()
+            if self.time_scale:
+                time.sleep(self.quantum * self.time_scale)
 
+        print('------[ FINISHED ]------')
+        print(f'CPU TIME: {self.cpu_time}')
+        print(f'LOADED PROCESSES: {self.loader_stats["rows"]} ({self.loader_throughput:.0f} rows/s)')
+        metrics = self.get_metrics()
+        print(f'SCHEDULER: {self.cpu_manager.scheduler} | FINISHED: {metrics["finished"]} | AVERAGE WAIT: {metrics["average_wait"]:.2f} '
+              f'| AVERAGE TURNAROUND: {metrics["average_turnaround"]:.2f} | THROUGHPUT: {metrics["throughput"]:.4f}/tick')
+        if metrics['spawn_failures'] or metrics['admission_failures']:
+            # each failure is only printed as it happens at full verbosity
+            print(f'FAILED: {metrics["spawn_failures"]} spawns, {metrics["admission_failures"]} admissions')
+        self.cpu_manager.show_core_stats()
+        self.show_admission_stats()
+        if summary and not full:
+            self.memory_manager.show_memory_map()
+        if self.virtual_memory_manager is not None:
+            self.virtual_memory_manager.show_stats(per_process=full)
+        if self.tracer is not None:
+            self.tracer.show_process_summary()
+        if self.defragment:
+            stats = self.filesystem_manager.get_defragmentation_stats()
+            print(f'DEFRAGMENTED DISK: {stats["blocks_moved"]} blocks moved in {stats["seconds"] * 1e3:.2f}ms')
+        return True
@@ -9,6 +9,8 @@ class Process():
         self.start_time = start_time
         self.priority = priority
         self.cpu_time = cpu_time
+        # cpu_time left counts down as the process runs, burst_time keeps the total
+        self.burst_time = cpu_time
         self.memory_blocks = memory_blocks
         self.printer = printer
         self.scanner = scanner
@@ -1,64 +1,187 @@
 from src.process_module import Process
-import time
-import json
+from src.trace_module import TraceRecorder
+from collections import deque
+import heapq
+
+class QueueEntry():
+    __slots__ = ('process', 'level', 'enqueued_at', 'queued')
+
+    def __init__(self, process, level, enqueued_at):
+        self.process = process
+        self.level = level
+        self.enqueued_at = enqueued_at
+        self.queued = True
 
 class QueueManager():
+    LEVELS = 4
 
-    def __init__(self, aging=1, max_process_age=2):
+    def __init__(self, aging=1, max_process_age=2, quanta=None):
         self.aging = aging
         self.max_process_age = max_process_age
         self.queues = {
-            0: [],
-            1: [],
-            2: [],
-            3: [],
+            0: deque(),
+            1: deque(),
+            2: deque(),
+            3: deque(),
         }
         self.cpu_time = 0
 
-    
-    def add_process(self, process):
-        self.queues[process.priority].append(process)
+        # level -> ticks a process runs per turn before going to the tail of its level, levels left out run to completion
+        self.quanta = {int(level): quantum for level, quantum in (quanta or {}).items() if quantum}
+        # entry taking its turn and the ticks it has used of it
+        self.turn_entry = None
+        self.turn_ticks = 0
 
-    def get_active_process(self):
-        priorities = sorted(self.queues)
-        for priority in priorities:
-            if self.queues[priority]:
-                return self.queues[priority][0]
-        
+        # live entries per level, and a bitmap of the levels holding any
+        self.sizes = {level: 0 for level in self.queues}
+        self.non_empty_levels = 0
+
+        # process -> its live entry, entries left behind in the deques are skipped lazily
+        self.entries = {}
+
+        # heap of (tick, sequence, entry) with the next promotion of each waiting process
+        self.promotions = []
+        self.sequence = 0
+
+        # records promotions when set, as happening on core
+        self.tracer = None
+        self.core = 0
+
+    @property
+    def promotion_period(self):
+        # ticks waited before the age of a process exceeds max_process_age
+        if self.aging <= 0:
+            return None
+        return self.max_process_age // self.aging + 1
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _enqueue(self, process, level, aging_from=None):
+        if aging_from is None:
+            aging_from = self.cpu_time
+
+        entry = QueueEntry(process, level, aging_from)
+        self.entries[process] = entry
+        self.queues[level].append(entry)
+        self.sizes[level] += 1
+        self.non_empty_levels |= 1 << level
+
+        # ages on every tick from aging_from on
+        if level > 0 and self.promotion_period is not None:
+            self._schedule_promotion(entry, aging_from + self.promotion_period - 1)
+        return entry
+
+    def _schedule_promotion(self, entry, tick):
+        heapq.heappush(self.promotions, (tick, self.sequence, entry))
+        self.sequence += 1
+
+    def _dequeue(self, entry):
+        entry.queued = False
+        del self.entries[entry.process]
+
+        self.sizes[entry.level] -= 1
+        if not self.sizes[entry.level]:
+            self.non_empty_levels &= ~(1 << entry.level)
+
+    def add_process(self, process, level=None):
+        self._enqueue(process, process.priority if level is None else level)
+
+    def remove_process(self, process):
+        entry = self.entries.get(process)
+        if entry is None:
+            return False
+
+        self._dequeue(entry)
+        return True
+
+    def get_stealable_process(self):
+        # the waiting process least likely to run soon, never the active one
+        active_entry = self._get_active_entry()
+        for level in sorted(self.queues, reverse=True):
+            for entry in reversed(self.queues[level]):
+                if entry.queued and entry is not active_entry:
+                    return entry.process
         return None
 
+    def get_level(self, process):
+        entry = self.entries.get(process)
+        return entry.level if entry is not None else None
+
+    def get_process_age(self, process):
+        entry = self.entries.get(process)
+        if entry is None or entry.level == 0:
+            return 0
+        return (self.cpu_time - entry.enqueued_at) * self.aging
+
+    def get_queue(self, priority):
+        return [entry.process for entry in self.queues[priority] if entry.queued]
+
+    def _get_active_entry(self):
+        if not self.non_empty_levels:
+            return None
+
+        level = (self.non_empty_levels & -self.non_empty_levels).bit_length() - 1
+        queue = self.queues[level]
+        while not queue[0].queued:
+            queue.popleft()
+        return queue[0]
+
+    def get_active_process(self):
+        entry = self._get_active_entry()
+        return entry.process if entry is not None else None
+
     def age_processes(self):
         active_process = self.get_active_process()
-        
-        priorities = sorted(self.queues, reverse=True)
-        for priority in priorities:
-            for process in self.queues[priority]:
-                if process == active_process:
-                    continue
-
-                if process.start_time > self.cpu_time:
-                    process.age += self.aging 
-        
-                if process.age > self.max_process_age and priority > 0:
-                    process.age = 0
-                    self.queues[priority].remove(process)
-                    self.queues[priority-1].append(process)
+
+        while self.promotions and self.promotions[0][0] <= self.cpu_time:
+            _, _, entry = heapq.heappop(self.promotions)
+            if not entry.queued:
+                continue
+
+            # the running process does not age
+            if entry.process == active_process:
+                self._schedule_promotion(entry, self.cpu_time + self.promotion_period)
+                continue
+
+            self._dequeue(entry)
+            entry.process.age = 0
+            self._enqueue(entry.process, entry.level - 1, self.cpu_time + 1)
+            if self.tracer is not None:
+                self.tracer.record(TraceRecorder.EVENT_PROMOTE, entry.process.pid, entry.level - 1, self.core)
 
     def run_processes(self):
-        active_process = self.get_active_process()
-        if not active_process:
-            return 
+        entry = self._get_active_entry()
+        if entry is None:
+            self.cpu_time += 1
+            return
 
+        active_process = entry.process
         active_process.cpu_time -= 1
 
+        if entry is not self.turn_entry:
+            self.turn_entry = entry
+            self.turn_ticks = 0
+        self.turn_ticks += 1
+
         self.age_processes()
-        
+
+        # the active process is always at the head of its level
+        finished_process = None
         if active_process.cpu_time <= 0:
-            self.queues[active_process.priority].remove(active_process)
+            self._dequeue(entry)
+            self.queues[entry.level].popleft()
+            finished_process = active_process
+        elif entry.level in self.quanta and self.turn_ticks >= self.quanta[entry.level]:
+            # out of its turn, the process waits behind the others of its level
+            self._dequeue(entry)
+            self.queues[entry.level].popleft()
+            self._enqueue(active_process, entry.level, self.cpu_time + 1)
 
         self.cpu_time += 1
+        return finished_process
 
     def show_queues(self):
         print('\nQueues status:')
         for priority in self.queues:
-            print(f'\t{Process.get_priority_description(priority, True)}: {self.queues[priority]}')
\ No newline at end of file
+            print(f'\t{Process.get_priority_description(priority, True)}: {self.get_queue(priority)}')
@@ -1,5 +1,7 @@
 from src.process_module import Process
 
+import heapq
+
 class Resource():
     
     def __init__(self, name, process=None):
@@ -7,7 +9,7 @@ class Resource():
         self.process = process
 
     def allocate(self, process):
-        if process.type == Process.TYPE_REALTIME:
+        if process.priority == Process.TYPE_REALTIME:
             print('ERROR::\trealtime processes cannot allocate resources')
             return 
 
@@ -29,21 +31,86 @@ class Resource():
 
 
 class ResourceManager():
+    # process attribute requesting a resource -> type of the resource
+    REQUESTS = {
+        'printer': 'printers',
+        'scanner': 'scanners',
+        'modem': 'modems',
+        'disk': 'sata_devices',
+    }
 
     def __init__(self, scanners, printers, modems, sata_devices):
         self.scanners = [Resource('scanner') for _ in range(scanners)]
         self.printers = [Resource('printer') for _ in range(printers)]
         self.modems = [Resource('modem') for _ in range(modems)]
-        self.sata_devices = [Resource('sata_device') for _ in range(sata_devices)]
+        self.sata_devices = [Resource('disk') for _ in range(sata_devices)]
+
+        # type -> stack of its available resources
+        self.free = {
+            type: list(reversed(self.__dict__[type])) for type in ResourceManager.REQUESTS.values()
+        }
+        # type -> heap of (priority, sequence, process) waiting for one of its resources
+        self.waiting = {type: [] for type in self.free}
+        self.sequence = 0
+
+        # process -> resources it holds, and process -> type it waits for
+        self.held = {}
+        self.blocked = {}
 
     def has_resource_available(self, type):
-        return len([r for r in self.__dict__[type] if r.available]) > 0
+        return len(self.free[type]) > 0
 
     def get_available_resource(self, type):
         if not self.has_resource_available(type):
             return None
 
-        return [r for r in self.__dict__[type] if r.available][0]
+        return self.free[type][-1]
+
+    @staticmethod
+    def get_requested_types(process):
+        # realtime processes do not use resources
+        if process.priority == Process.TYPE_REALTIME:
+            return []
+        return [type for request, type in ResourceManager.REQUESTS.items() if getattr(process, request)]
+
+    def can_satisfy(self, process):
+        return all(self.__dict__[type] for type in ResourceManager.get_requested_types(process))
+
+    def acquire(self, process):
+        # takes every resource the process requested or none of them, so waiting processes hold nothing.
+        # Otherwise the process waits for the first type missing
+        types = ResourceManager.get_requested_types(process)
+        for type in types:
+            if not self.free[type]:
+                heapq.heappush(self.waiting[type], (process.priority, self.sequence, process))
+                self.sequence += 1
+                self.blocked[process] = type
+                return False
+
+        resources = [self.free[type].pop() for type in types]
+        for resource in resources:
+            resource.allocate(process)
+        self.held[process] = resources
+        self.blocked.pop(process, None)
+        return True
+
+    def release(self, process):
+        # frees the resources of process, returning the waiting processes that got theirs, in priority order
+        resources = self.held.pop(process, [])
+        for resource in resources:
+            resource.free()
+            self.free[ResourceManager.REQUESTS[resource.name]].append(resource)
+
+        woken = []
+        for type in dict.fromkeys(ResourceManager.REQUESTS[resource.name] for resource in resources):
+            waiting = self.waiting[type]
+            while waiting and self.free[type]:
+                priority, sequence, waiter = heapq.heappop(waiting)
+                del self.blocked[waiter]
+                if self.acquire(waiter):
+                    woken.append((priority, sequence, waiter))
+
+        return [waiter for _, _, waiter in sorted(woken)]
     
     def show_available_resources(self):
         print('\nAvailable resources:')
@@ -0,0 +1,255 @@
+from lib.fenwick import FenwickTree
+from src.queue_module import QueueManager
+
+import heapq
+import random
+
+class Scheduler():
+    # what the policies other than the priority queues share: the clock and the tracer
+
+    def __init__(self):
+        self.cpu_time = 0
+
+        self.tracer = None
+        self.core = 0
+
+    def get_level(self, process):
+        # the level a migrated process keeps, these policies only use it for display
+        return process.priority if self.contains(process) else None
+
+    def run_processes(self):
+        active_process = self.get_active_process()
+        if active_process is None:
+            self.cpu_time += 1
+            return
+
+        active_process.cpu_time -= 1
+        finished_process = None
+        if active_process.cpu_time <= 0:
+            self.remove_process(active_process)
+            finished_process = active_process
+        else:
+            self.charge(active_process)
+
+        self.cpu_time += 1
+        return finished_process
+
+    def charge(self, process):
+        pass
+
+    def show_queues(self):
+        print('\nQueue status:')
+        print(f'\tREADY: {self.get_queue()}')
+
+class ShortestJobScheduler(Scheduler):
+    # runs the process with the least cpu time left, from a heap of (cpu time, sequence, process).
+    # Without preemption the running process keeps the cpu until it finishes (SJF), with it any shorter arrival takes over (SRTF)
+
+    def __init__(self, preemptive=False):
+        super().__init__()
+        self.preemptive = preemptive
+
+        # process -> sequence of its live heap entry, entries of removed processes are skipped lazily
+        self.heap = []
+        self.entries = {}
+        self.sequence = 0
+        # process holding the cpu, out of the heap while it runs
+        self.current = None
+
+    def __len__(self):
+        return len(self.entries) + (self.current is not None)
+
+    def contains(self, process):
+        return process is self.current or process in self.entries
+
+    def _push(self, process):
+        heapq.heappush(self.heap, (process.cpu_time, self.sequence, process))
+        self.entries[process] = self.sequence
+        self.sequence += 1
+
+    def _peek(self):
+        while self.heap and self.entries.get(self.heap[0][2]) != self.heap[0][1]:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def _pop(self):
+        _, _, process = heapq.heappop(self.heap)
+        del self.entries[process]
+        return process
+
+    def add_process(self, process, level=None):
+        self._push(process)
+
+    def remove_process(self, process):
+        if process is self.current:
+            self.current = None
+            return True
+        return self.entries.pop(process, None) is not None
+
+    def get_stealable_process(self):
+        # the longest job waiting, never the running one
+        waiting = [item for item in self.heap if self.entries.get(item[2]) == item[1]]
+        return max(waiting)[2] if waiting else None
+
+    def get_active_process(self):
+        top = self._peek()
+        if self.current is None:
+            if top is None:
+                return None
+            self.current = self._pop()
+        elif self.preemptive and top is not None and top[0] < self.current.cpu_time:
+            self._push(self.current)
+            self.current = self._pop()
+        return self.current
+
+    def get_queue(self):
+        waiting = [process for _, _, process in sorted(item for item in self.heap if self.entries.get(item[2]) == item[1])]
+        return ([self.current] if self.current is not None else []) + waiting
+
+class LotteryScheduler(Scheduler):
+    # every tick draws a ticket, the process holding it runs. Tickets live in a Fenwick tree over slots,
+    # so drawing, joining and leaving are O(log n)
+    TICKETS = {0: 64, 1: 8, 2: 4, 3: 2}
+
+    def __init__(self, seed=0):
+        super().__init__()
+        self.random = random.Random(seed)
+        self.tickets = FenwickTree(16)
+
+        # slot -> process holding it, None when free
+        self.slots = []
+        self.slot_of = {}
+        self.free_slots = []
+        # drawn for the current tick, drawn again when the processes change
+        self.winner = None
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def contains(self, process):
+        return process in self.slot_of
+
+    def get_tickets(self, process):
+        return LotteryScheduler.TICKETS.get(process.priority, 1)
+
+    def add_process(self, process, level=None):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.slots[slot] = process
+        else:
+            slot = len(self.slots)
+            self.slots.append(process)
+            if slot >= len(self.tickets):
+                self.tickets.grow(2 * len(self.tickets))
+
+        self.slot_of[process] = slot
+        self.tickets.add(slot, self.get_tickets(process))
+        self.winner = None
+
+    def remove_process(self, process):
+        slot = self.slot_of.pop(process, None)
+        if slot is None:
+            return False
+
+        self.tickets.add(slot, -self.tickets.get(slot))
+        self.slots[slot] = None
+        self.free_slots.append(slot)
+        self.winner = None
+        return True
+
+    def get_stealable_process(self):
+        active_process = self.get_active_process()
+        for process in self.slot_of:
+            if process is not active_process:
+                return process
+        return None
+
+    def get_active_process(self):
+        if self.winner is None and self.tickets.total:
+            self.winner = self.slots[self.tickets.find(self.random.randrange(self.tickets.total))]
+        return self.winner
+
+    def charge(self, process):
+        self.winner = None
+
+    def get_queue(self):
+        return [process for process in self.slots if process is not None]
+
+class StrideScheduler(Scheduler):
+    # runs the process with the lowest pass, which advances by a stride inversely proportional to its tickets.
+    # A heap of (pass, sequence, process) picks it in O(log n), deterministic unlike the lottery
+    STRIDE = 1 << 20
+
+    def __init__(self):
+        super().__init__()
+        self.heap = []
+        # process -> (pass, sequence) of its live heap entry
+        self.entries = {}
+        self.sequence = 0
+        # pass given to processes joining, so they do not take over the cpu to catch up
+        self.global_pass = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def contains(self, process):
+        return process in self.entries
+
+    def get_stride(self, process):
+        return StrideScheduler.STRIDE // LotteryScheduler.TICKETS.get(process.priority, 1)
+
+    def _push(self, process, process_pass):
+        heapq.heappush(self.heap, (process_pass, self.sequence, process))
+        self.entries[process] = (process_pass, self.sequence)
+        self.sequence += 1
+
+    def _peek(self):
+        while self.heap and self.entries.get(self.heap[0][2]) != self.heap[0][:2]:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def add_process(self, process, level=None):
+        self._push(process, self.global_pass)
+
+    def remove_process(self, process):
+        return self.entries.pop(process, None) is not None
+
+    def get_stealable_process(self):
+        waiting = [item for item in self.heap if self.entries.get(item[2]) == item[:2]]
+        return max(waiting)[2] if len(waiting) > 1 else None
+
+    def get_active_process(self):
+        top = self._peek()
+        return top[2] if top is not None else None
+
+    def charge(self, process):
+        process_pass, _, _ = heapq.heappop(self.heap)
+        self.global_pass = process_pass
+        self._push(process, process_pass + self.get_stride(process))
+
+    def get_queue(self):
+        return [process for _, _, process in sorted(item for item in self.heap if self.entries.get(item[2]) == item[:2])]
+
+SCHEDULER_PRIORITY = 'priority'
+SCHEDULER_ROUND_ROBIN = 'round_robin'
+SCHEDULER_SJF = 'sjf'
+SCHEDULER_SRTF = 'srtf'
+SCHEDULER_LOTTERY = 'lottery'
+SCHEDULER_STRIDE = 'stride'
+SCHEDULERS = (SCHEDULER_PRIORITY, SCHEDULER_ROUND_ROBIN, SCHEDULER_SJF, SCHEDULER_SRTF, SCHEDULER_LOTTERY, SCHEDULER_STRIDE)
+
+# ticks per turn of each level under round robin, realtime processes still run to completion
+ROUND_ROBIN_QUANTA = {0: None, 1: 1, 2: 2, 3: 4}
+
+def create_scheduler(policy, aging=1, max_process_age=2, quanta=None, seed=0):
+    if policy == SCHEDULER_PRIORITY:
+        return QueueManager(aging=aging, max_process_age=max_process_age, quanta=quanta)
+    if policy == SCHEDULER_ROUND_ROBIN:
+        return QueueManager(aging=aging, max_process_age=max_process_age, quanta=ROUND_ROBIN_QUANTA if quanta is None else quanta)
+    if policy in (SCHEDULER_SJF, SCHEDULER_SRTF):
+        return ShortestJobScheduler(preemptive=policy == SCHEDULER_SRTF)
+    if policy == SCHEDULER_LOTTERY:
+        return LotteryScheduler(seed)
+    if policy == SCHEDULER_STRIDE:
+        return StrideScheduler()
+    raise ValueError(f'unknown scheduling policy {policy!r}')
@@ -0,0 +1,490 @@
+from src.cpu_module import CPUManager
+from src.filesystem_module import FileSystemManager
+from src.memory_module import MemoryManager
+from src.process_module import Process
+from src.queue_module import QueueEntry, QueueManager
+from src.scheduling_module import LotteryScheduler, ShortestJobScheduler, StrideScheduler
+from src.resource_module import ResourceManager
+from src.storage_module import MemoryStorage, STORAGES
+
+import heapq
+import os
+import struct
+import zlib
+
+class Writer():
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def pack(self, format, *values):
+        self.buffer += struct.pack('<' + format, *values)
+
+    def blob(self, value):
+        self.pack('I', len(value))
+        self.buffer += value
+
+    def string(self, value):
+        self.blob((value or '').encode())
+
+    def integers(self, values):
+        values = list(values)
+        self.pack(f'I{len(values)}q', len(values), *values)
+
+class Reader():
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, format):
+        format = '<' + format
+        values = struct.unpack_from(format, self.data, self.offset)
+        self.offset += struct.calcsize(format)
+        return values
+
+    def blob(self):
+        length, = self.unpack('I')
+        self.offset += length
+        return bytes(self.data[self.offset - length:self.offset])
+
+    def string(self):
+        return self.blob().decode()
+
+    def integers(self):
+        length, = self.unpack('I')
+        return list(self.unpack(f'{length}q'))
+
+class Snapshot():
+    # magic, format version, flags
+    HEADER = struct.Struct('<4sHB')
+    # section id, payload length, crc32 of the payload
+    SECTION = struct.Struct('<BII')
+
+    MAGIC = b'MOSS'
+    VERSION = 5
+    FLAG_INCREMENTAL = 1
+
+    SECTION_CONFIG = 0
+    SECTION_CLOCK = 1
+    SECTION_PROCESSES = 2
+    SECTION_QUEUES = 3
+    SECTION_MEMORY = 4
+    SECTION_RESOURCES = 5
+    SECTION_FILESYSTEM = 6
+    SECTIONS = [SECTION_CONFIG, SECTION_CLOCK, SECTION_PROCESSES, SECTION_QUEUES, SECTION_MEMORY, SECTION_RESOURCES, SECTION_FILESYSTEM]
+
+    @staticmethod
+    def write(path, sections, parent=None):
+        # incremental snapshots hold only the sections that changed since parent, relative to their directory
+        if parent is not None and os.path.realpath(path) == os.path.realpath(parent):
+            raise ValueError(f'{path} cannot be its own parent')
+
+        with open(path, 'wb') as f:
+            f.write(Snapshot.HEADER.pack(Snapshot.MAGIC, Snapshot.VERSION, Snapshot.FLAG_INCREMENTAL if parent is not None else 0))
+            if parent is not None:
+                writer = Writer()
+                writer.string(os.path.relpath(parent, os.path.dirname(os.path.abspath(path))))
+                f.write(writer.buffer)
+
+            for id, payload in sections.items():
+                f.write(Snapshot.SECTION.pack(id, len(payload), zlib.crc32(payload)))
+                f.write(payload)
+
+    @staticmethod
+    def _read_header(f, path):
+        # checks the header and returns the path of the parent, None for full snapshots
+        header = f.read(Snapshot.HEADER.size)
+        if len(header) < Snapshot.HEADER.size:
+            raise ValueError(f'{path} is not a snapshot')
+
+        magic, version, flags = Snapshot.HEADER.unpack(header)
+        if magic != Snapshot.MAGIC:
+            raise ValueError(f'{path} is not a snapshot')
+        if version != Snapshot.VERSION:
+            raise ValueError(f'{path} has snapshot format version {version}, only {Snapshot.VERSION} is supported')
+
+        if not flags & Snapshot.FLAG_INCREMENTAL:
+            return None
+        length, = struct.unpack('<I', f.read(4))
+        return os.path.join(os.path.dirname(os.path.abspath(path)), f.read(length).decode())
+
+    @staticmethod
+    def get_chain(path):
+        # real paths of the snapshot and its parents, from the snapshot to the full one at the root
+        chain = []
+        seen = set()
+        while path is not None:
+            real_path = os.path.realpath(path)
+            if real_path in seen:
+                raise ValueError(f'{chain[0]} has a parent chain looping through {path}')
+            chain.append(real_path)
+            seen.add(real_path)
+
+            with open(path, 'rb') as f:
+                path = Snapshot._read_header(f, path)
+        return chain
+
+    @staticmethod
+    def read(path):
+        # the sections of the snapshot, filled in from its parents when incremental. The chain is applied
+        # from the full snapshot at its root, so any length of chain reads without recursing
+        sections = {}
+        for snapshot_path in reversed(Snapshot.get_chain(path)):
+            with open(snapshot_path, 'rb') as f:
+                Snapshot._read_header(f, snapshot_path)
+                data = f.read()
+
+            reader = Reader(data)
+            while reader.offset < len(data):
+                id, length, crc = reader.unpack('BII')
+                payload = data[reader.offset:reader.offset + length]
+                reader.offset += length
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    raise ValueError(f'{snapshot_path} is corrupt')
+                sections[id] = payload
+
+        missing = [id for id in Snapshot.SECTIONS if id not in sections]
+        if missing:
+            raise ValueError(f'{path} misses sections {missing}')
+        return sections
+
+def _encode_process(writer, process, live):
+    writer.string(str(process.pid))
+    writer.pack('11q', process.start_time, process.priority, process.cpu_time, process.burst_time, process.memory_blocks,
+                int(process.printer), int(process.scanner), int(process.modem), int(process.disk), process.age, live)
+
+def _decode_process(reader):
+    pid = reader.string()
+    start_time, priority, cpu_time, burst_time, memory_blocks, printer, scanner, modem, disk, age, live = reader.unpack('11q')
+    process = Process(pid, start_time, priority, cpu_time, memory_blocks, printer, scanner, modem, disk)
+    process.burst_time = burst_time
+    process.age = age
+    return process, live
+
+def encode_state(mini_os):
+    # section id -> payload, processes are referred to by their index in the processes section
+    cm = mini_os.cpu_manager
+    mm = mini_os.memory_manager
+    rm = mini_os.resource_manager
+    fsm = mini_os.filesystem_manager
+
+    processes = list(mini_os.processes.values())
+    live = len(processes)
+    # finished processes still owning memory are kept too
+    index = {process: i for i, process in enumerate(processes)}
+    for process in mm.allocations:
+        if process not in index:
+            index[process] = len(processes)
+            processes.append(process)
+
+    def get_index(process):
+        return index[process] if process is not None else -1
+
+    sections = {}
+
+    writer = Writer()
+    writer.pack('ddBBq', mini_os.quantum, mini_os.time_scale, mini_os.defragment, mini_os.verbosity, mini_os.summary_interval)
+    writer.pack('Iqq', len(cm.cores), cm.aging, cm.max_process_age)
+    writer.string(cm.placement)
+    writer.pack('B', cm.work_stealing)
+    writer.string(cm.scheduler)
+    # the quanta in effect per level, 0 for running to completion
+    quanta = cm.cores[0].quanta if isinstance(cm.cores[0], QueueManager) else {}
+    writer.integers(quanta.get(level, 0) for level in range(QueueManager.LEVELS))
+    writer.pack('q', cm.seed)
+    writer.pack('IqB', len(mm.blocks), next((blocks[0].size for blocks in mm.blocks.values() if blocks), 0), mm.defragment)
+    for priority, blocks in mm.blocks.items():
+        writer.pack('qI', priority, len(blocks))
+        writer.string(mm.stats[priority].engine)
+    writer.pack('4I', len(rm.scanners), len(rm.printers), len(rm.modems), len(rm.sata_devices))
+    writer.string(fsm.BASE_DIR)
+    writer.pack('QQq', fsm.blocks.size, fsm.BLOCK_SIZE, mini_os.disk_blocks or 0)
+    writer.string(fsm.free_extents.policy)
+    writer.string(fsm.storage.name)
+    writer.string(getattr(fsm.storage, 'path', ''))
+    writer.string(mini_os.processes_path)
+    sections[Snapshot.SECTION_CONFIG] = bytes(writer.buffer)
+
+    writer = Writer()
+    writer.pack('qqqdBq', mini_os.cpu_time, mini_os.arrival_sequence, mini_os.loader_stats['rows'], mini_os.loader_stats['seconds'],
+                mini_os.loader is not None, mini_os.loaded_until if mini_os.loaded_until is not None else -1)
+    writer.integers(mini_os.metrics[name] for name in ('finished', 'wait', 'turnaround', 'spawn_failures', 'admission_failures'))
+    sections[Snapshot.SECTION_CLOCK] = bytes(writer.buffer)
+
+    writer = Writer()
+    writer.pack('I', len(processes))
+    for i, process in enumerate(processes):
+        _encode_process(writer, process, i < live)
+    writer.pack('I', len(mini_os.arrivals))
+    for start_time, sequence, process in mini_os.arrivals:
+        writer.pack('qqq', start_time, sequence, index[process])
+    sections[Snapshot.SECTION_PROCESSES] = bytes(writer.buffer)
+
+    writer = Writer()
+    writer.pack('qq', cm.next_core, cm.ticks)
+    writer.integers(cm.busy_ticks)
+    writer.integers(cm.migrations)
+    writer.integers(get_index(process) for process in cm.running)
+    writer.integers(index[process] for process in cm.parked)
+    for core in cm.cores:
+        writer.pack('q', core.cpu_time)
+        _encode_scheduler(writer, core, index, get_index)
+    sections[Snapshot.SECTION_QUEUES] = bytes(writer.buffer)
+
+    writer = Writer()
+    for priority in mm.blocks:
+        allocations = [(start, process) for process, (pool, start) in mm.allocations.items() if pool == priority]
+        writer.pack('I', len(allocations))
+        for start, process in allocations:
+            writer.pack('qqq', start, mm.allocators[priority].get_requested(start), index[process])
+
+        stats = mm.stats[priority]
+        writer.pack('qqqdddq', stats.allocations, stats.frees, stats.failures, stats.latency, stats.max_latency, stats.free_latency, stats.peak_used)
+
+        # processes arrived and waiting for the pool
+        writer.pack('I', len(mini_os.pending[priority]))
+        for process_priority, sequence, process in mini_os.pending[priority]:
+            writer.pack('qqq', process_priority, sequence, index[process])
+        writer.integers(mini_os.admission_stats[priority][name] for name in ('admitted', 'delay', 'max_delay', 'peak_pending'))
+    writer.pack('q', mini_os.pending_sequence)
+    sections[Snapshot.SECTION_MEMORY] = bytes(writer.buffer)
+
+    writer = Writer()
+    writer.pack('q', rm.sequence)
+    types = list(ResourceManager.REQUESTS.values())
+    positions = {id(resource): position for type in types for position, resource in enumerate(rm.__dict__[type])}
+    for type in types:
+        writer.integers(positions[id(resource)] for resource in rm.free[type])
+        writer.pack('I', len(rm.waiting[type]))
+        for priority, sequence, process in rm.waiting[type]:
+            writer.pack('qqq', priority, sequence, index[process])
+    writer.pack('I', len(rm.held))
+    for process, resources in rm.held.items():
+        writer.pack('qI', index[process], len(resources))
+        for resource in resources:
+            writer.pack('II', types.index(ResourceManager.REQUESTS[resource.name]), positions[id(resource)])
+    sections[Snapshot.SECTION_RESOURCES] = bytes(writer.buffer)
+
+    writer = Writer()
+    writer.pack('I', len(fsm.paths))
+    for path, extent in fsm.paths.items():
+        writer.blob(FileSystemManager._encode_record(FileSystemManager.OPERATION_WRITE, path, extent.start, extent.length, extent.size, fsm.blocks.get_owner(extent.start)))
+    # content on the host or in a disk image outlives the run, a RAM disk is saved along with its files
+    in_memory = isinstance(fsm.storage, MemoryStorage)
+    writer.pack('B', in_memory)
+    if in_memory:
+        for path, extent in fsm.paths.items():
+            stored = fsm.storage.contains(path, extent.start)
+            writer.pack('B', stored)
+            if stored:
+                writer.blob(fsm.storage.load(path, extent.start, extent.size))
+    sections[Snapshot.SECTION_FILESYSTEM] = bytes(writer.buffer)
+
+    return sections
+
+def _encode_scheduler(writer, core, index, get_index):
+    if isinstance(core, QueueManager):
+        # the pending promotion of every queued entry, stale heap items are left behind
+        promotions = {id(entry): (tick, sequence) for tick, sequence, entry in core.promotions if entry.queued}
+        writer.pack('q', core.sequence)
+        for level, queue in core.queues.items():
+            entries = [entry for entry in queue if entry.queued]
+            writer.pack('I', len(entries))
+            for entry in entries:
+                writer.pack('qqqq', index[entry.process], entry.enqueued_at, *promotions.get(id(entry), (-1, -1)))
+        turn_entry = core.turn_entry if core.turn_entry is not None and core.turn_entry.queued else None
+        writer.pack('qq', get_index(turn_entry.process if turn_entry is not None else None), core.turn_ticks)
+    elif isinstance(core, ShortestJobScheduler):
+        entries = [item for item in core.heap if core.entries.get(item[2]) == item[1]]
+        writer.pack('qqI', core.sequence, get_index(core.current), len(entries))
+        for key, sequence, process in entries:
+            writer.pack('qqq', key, sequence, index[process])
+    elif isinstance(core, LotteryScheduler):
+        writer.pack('qq', len(core.tickets), get_index(core.winner))
+        writer.integers(get_index(process) for process in core.slots)
+        writer.integers(core.free_slots)
+        writer.integers(core.random.getstate()[1])
+    elif isinstance(core, StrideScheduler):
+        entries = [item for item in core.heap if core.entries.get(item[2]) == item[:2]]
+        writer.pack('qqI', core.sequence, core.global_pass, len(entries))
+        for process_pass, sequence, process in entries:
+            writer.pack('qqq', process_pass, sequence, index[process])
+
+def _decode_scheduler(reader, core, processes):
+    # restores the scheduler of a core, returning the processes it holds
+    def get_process(i):
+        return processes[i] if i >= 0 else None
+
+    if isinstance(core, QueueManager):
+        core.sequence, = reader.unpack('q')
+        for level in core.queues:
+            for _ in range(reader.unpack('I')[0]):
+                i, enqueued_at, tick, sequence = reader.unpack('qqqq')
+                entry = QueueEntry(processes[i], level, enqueued_at)
+                core.entries[entry.process] = entry
+                core.queues[level].append(entry)
+                core.sizes[level] += 1
+                core.non_empty_levels |= 1 << level
+                if tick >= 0:
+                    core.promotions.append((tick, sequence, entry))
+        heapq.heapify(core.promotions)
+        turn_process, core.turn_ticks = reader.unpack('qq')
+        core.turn_entry = core.entries.get(get_process(turn_process))
+        return list(core.entries)
+
+    if isinstance(core, ShortestJobScheduler):
+        core.sequence, current, n = reader.unpack('qqI')
+        core.current = get_process(current)
+        for _ in range(n):
+            key, sequence, i = reader.unpack('qqq')
+            core.heap.append((key, sequence, processes[i]))
+            core.entries[processes[i]] = sequence
+        heapq.heapify(core.heap)
+        return list(core.entries) + ([core.current] if core.current is not None else [])
+
+    if isinstance(core, LotteryScheduler):
+        size, winner = reader.unpack('qq')
+        core.tickets.grow(size)
+        core.slots = [get_process(i) for i in reader.integers()]
+        for slot, process in enumerate(core.slots):
+            if process is not None:
+                core.slot_of[process] = slot
+                core.tickets.add(slot, core.get_tickets(process))
+        core.free_slots = reader.integers()
+        core.winner = get_process(winner)
+        core.random.setstate((3, tuple(reader.integers()), None))
+        return list(core.slot_of)
+
+    core.sequence, core.global_pass, n = reader.unpack('qqI')
+    for _ in range(n):
+        process_pass, sequence, i = reader.unpack('qqq')
+        core.heap.append((process_pass, sequence, processes[i]))
+        core.entries[processes[i]] = (process_pass, sequence)
+    heapq.heapify(core.heap)
+    return list(core.entries)
+
+def decode_state(mini_os, sections):
+    reader = Reader(sections[Snapshot.SECTION_CONFIG])
+    mini_os.quantum, mini_os.time_scale, defragment, mini_os.verbosity, mini_os.summary_interval = reader.unpack('ddBBq')
+    mini_os.defragment = bool(defragment)
+
+    cores, aging, max_process_age = reader.unpack('Iqq')
+    placement = reader.string()
+    work_stealing, = reader.unpack('B')
+    scheduler = reader.string()
+    quanta = {level: quantum for level, quantum in enumerate(reader.integers()) if quantum}
+    seed, = reader.unpack('q')
+    mini_os.cpu_manager = CPUManager(cores=cores, aging=aging, max_process_age=max_process_age, placement=placement, work_stealing=bool(work_stealing),
+                                     scheduler=scheduler, quanta=quanta, seed=seed)
+
+    pools, block_size, memory_defragment = reader.unpack('IqB')
+    blocks, engines = {}, {}
+    for _ in range(pools):
+        priority, n = reader.unpack('qI')
+        blocks[priority] = n
+        engines[priority] = reader.string()
+    mm = mini_os.memory_manager = MemoryManager(blocks=blocks, block_size=block_size, engines=engines, defragment=bool(memory_defragment))
+
+    scanners, printers, modems, sata_devices = reader.unpack('4I')
+    rm = mini_os.resource_manager = ResourceManager(scanners=scanners, printers=printers, modems=modems, sata_devices=sata_devices)
+
+    base_dir = reader.string()
+    disk_blocks, disk_block_size, disk_blocks_override = reader.unpack('QQq')
+    policy = reader.string()
+    storage = reader.string()
+    disk_image = reader.string()
+    fsm = mini_os.filesystem_manager = FileSystemManager(
+        base_dir=base_dir,
+        blocks=disk_blocks,
+        block_size=disk_block_size,
+        allocation_policy=policy,
+        disk_image=disk_image or None,
+        storage=storage if storage in STORAGES else 'host',
+        defragment=mini_os.defragment,
+    )
+    mini_os.disk_blocks = disk_blocks_override or None
+    # snapshots are only taken without virtual memory
+    mini_os.virtual_memory_manager = None
+    mini_os.storage = fsm.storage.name if fsm.storage.name in STORAGES else 'host'
+    mini_os.processes_path = reader.string() or None
+
+    reader = Reader(sections[Snapshot.SECTION_PROCESSES])
+    processes = []
+    mini_os.processes = {}
+    for _ in range(reader.unpack('I')[0]):
+        process, live = _decode_process(reader)
+        processes.append(process)
+        if live:
+            mini_os.processes[process.pid] = process
+    mini_os.arrivals = [(start_time, sequence, processes[i]) for start_time, sequence, i in (reader.unpack('qqq') for _ in range(reader.unpack('I')[0]))]
+
+    def get_process(i):
+        return processes[i] if i >= 0 else None
+
+    reader = Reader(sections[Snapshot.SECTION_CLOCK])
+    mini_os.cpu_time, mini_os.arrival_sequence, rows, seconds, loading, loaded_until = reader.unpack('qqqdBq')
+    mini_os.loader_stats = {'rows': rows, 'seconds': seconds}
+    mini_os.metrics = dict(zip(('finished', 'wait', 'turnaround', 'spawn_failures', 'admission_failures'), reader.integers()))
+    mini_os.loaded_until = loaded_until if loaded_until >= 0 else None
+    mini_os.loader = None
+    if loading and mini_os.processes_path is not None:
+        # the rows loaded before the snapshot are skipped without being parsed
+        mini_os.loader = mini_os._stream_processes(mini_os.processes_path, 1 << 16, rows)
+
+    reader = Reader(sections[Snapshot.SECTION_QUEUES])
+    cm = mini_os.cpu_manager
+    cm.next_core, cm.ticks = reader.unpack('qq')
+    cm.busy_ticks = reader.integers()
+    cm.migrations = reader.integers()
+    cm.running = [get_process(i) for i in reader.integers()]
+    cm.parked = set(processes[i] for i in reader.integers())
+    for index, core in enumerate(cm.cores):
+        core.cpu_time, = reader.unpack('q')
+        for process in _decode_scheduler(reader, core, processes):
+            cm.core_of[process] = index
+
+    reader = Reader(sections[Snapshot.SECTION_MEMORY])
+    mini_os.pending, mini_os.admission_stats = {}, {}
+    for priority in mm.blocks:
+        for _ in range(reader.unpack('I')[0]):
+            start, n, i = reader.unpack('qqq')
+            mm.reserve_memory_blocks(n, processes[i], start)
+
+        stats = mm.stats[priority]
+        stats.allocations, stats.frees, stats.failures, stats.latency, stats.max_latency, stats.free_latency, stats.peak_used = reader.unpack('qqqdddq')
+
+        mini_os.pending[priority] = [(process_priority, sequence, processes[i]) for process_priority, sequence, i in (reader.unpack('qqq') for _ in range(reader.unpack('I')[0]))]
+        mini_os.admission_stats[priority] = dict(zip(('admitted', 'delay', 'max_delay', 'peak_pending'), reader.integers()))
+    mini_os.pending_sequence, = reader.unpack('q')
+
+    reader = Reader(sections[Snapshot.SECTION_RESOURCES])
+    rm.sequence, = reader.unpack('q')
+    types = list(ResourceManager.REQUESTS.values())
+    for type in types:
+        rm.free[type] = [rm.__dict__[type][position] for position in reader.integers()]
+        rm.waiting[type] = [(priority, sequence, processes[i]) for priority, sequence, i in (reader.unpack('qqq') for _ in range(reader.unpack('I')[0]))]
+        for _, _, process in rm.waiting[type]:
+            rm.blocked[process] = type
+    for _ in range(reader.unpack('I')[0]):
+        i, n = reader.unpack('qI')
+        process = processes[i]
+        resources = [rm.__dict__[types[type]][position] for type, position in (reader.unpack('II') for _ in range(n))]
+        for resource in resources:
+            resource.process = process
+        rm.held[process] = resources
+
+    reader = Reader(sections[Snapshot.SECTION_FILESYSTEM])
+    # owners still alive get their process back, the others a stand-in as in the journal
+    by_pid = {process.pid: process for process in processes}
+    for _ in range(reader.unpack('I')[0]):
+        operation, path, start, length, size, owner = FileSystemManager._decode_record(reader.blob())
+        if owner is not None:
+            owner = by_pid.get(owner.pid, owner)
+        fsm._apply_record(operation, path, start, length, size, owner)
+
+    in_memory, = reader.unpack('B')
+    if in_memory:
+        for path, extent in fsm.paths.items():
+            if reader.unpack('B')[0]:
+                fsm.storage.store(path, extent.start, reader.blob())
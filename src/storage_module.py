@@ -0,0 +1,151 @@
+import mmap
+import os
+
+class HostDirectoryStorage():
+    # one host file per path, the blocks only exist in the bookkeeping
+    name = 'host'
+
+    def __init__(self, blocks=None, block_size=None):
+        # host directories known to exist
+        self.directories = set()
+
+    def _make_directory(self, directory):
+        if not directory or directory in self.directories:
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        self.directories.add(directory)
+
+    def store(self, path, start, bytes):
+        self._make_directory(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(bytes)
+
+    def store_at(self, path, start, offset, bytes):
+        if not os.path.exists(path):
+            self.store(path, start, b'')
+
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(bytes)
+
+    def load(self, path, start, size, copy=True):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def contains(self, path, start):
+        return os.path.exists(path)
+
+    def move(self, path, start, target, size):
+        # files are found by path, wherever their blocks are
+        pass
+
+    def remove(self, path, start):
+        os.remove(path)
+        return True
+
+    def close(self):
+        pass
+
+class DiskImageStorage():
+    # a single mapped file holding every block
+    name = 'disk_image'
+
+    def __init__(self, path, blocks, block_size):
+        self.path = path
+        self.block_size = block_size
+        size = max(blocks * block_size, 1)
+        self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        if os.path.getsize(path) < size:
+            self.file.truncate(size)
+
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.view = memoryview(self.map)
+
+    def write(self, offset, data):
+        self.view[offset:offset + len(data)] = data
+
+    def read(self, offset, size, copy=True):
+        view = self.view[offset:offset + size]
+        return bytes(view) if copy else view
+
+    def store(self, path, start, bytes):
+        self.write(start * self.block_size, bytes)
+
+    def store_at(self, path, start, offset, bytes):
+        self.write(start * self.block_size + offset, bytes)
+
+    def load(self, path, start, size, copy=True):
+        # without copy, the content is a memoryview over the mapped blocks, valid until it is overwritten
+        if start is None:
+            raise FileNotFoundError(path)
+        return self.read(start * self.block_size, size, copy)
+
+    def contains(self, path, start):
+        return start is not None
+
+    def move(self, path, start, target, size):
+        self.write(target * self.block_size, self.read(start * self.block_size, size))
+
+    def remove(self, path, start):
+        # freed blocks keep their bytes until overwritten
+        return start is not None
+
+    def close(self):
+        # views handed out by load(copy=False) should be released first. A view still held keeps the map alive,
+        # so its blocks are flushed now and unmapped once the last view is gone
+        if self.file.closed:
+            return
+
+        self.view.release()
+        self.map.flush()
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+        self.map = None
+        self.file.close()
+
+class MemoryStorage():
+    # a RAM disk keyed by the starting block of each extent, nothing touches the host
+    name = 'memory'
+
+    def __init__(self, blocks=None, block_size=None):
+        self.extents = {}
+
+    def store(self, path, start, bytes):
+        self.extents[start] = bytearray(bytes)
+
+    def store_at(self, path, start, offset, bytes):
+        # growing content is copied, so views handed out by load stay valid
+        content = self.extents.get(start, bytearray())
+        end = offset + len(bytes)
+        if len(content) < end:
+            content = self.extents[start] = content + bytearray(end - len(content))
+        content[offset:end] = bytes
+
+    def load(self, path, start, size, copy=True):
+        content = self.extents.get(start)
+        if content is None:
+            raise FileNotFoundError(path)
+        return bytes(content[:size]) if copy else memoryview(content)[:size]
+
+    def contains(self, path, start):
+        return start in self.extents
+
+    def move(self, path, start, target, size):
+        # keeps the first size bytes, the rest is about to be rewritten
+        content = self.extents.pop(start, None)
+        if content is not None:
+            self.extents[target] = content[:size] if size < len(content) else content
+
+    def remove(self, path, start):
+        return self.extents.pop(start, None) is not None
+
+    def close(self):
+        self.extents.clear()
+
+STORAGES = {
+    'host': HostDirectoryStorage,
+    'memory': MemoryStorage,
+}
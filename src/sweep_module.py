@@ -0,0 +1,76 @@
+from src.mini_os import MiniOS
+
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+METRICS = ['makespan', 'finished', 'average_wait', 'average_turnaround', 'throughput', 'spawn_failures', 'admission_failures', 'average_admission_delay', 'max_admission_delay', 'allocation_failures', 'seconds']
+
+def expand_grid(grid, workloads):
+    # every combination of the grid values, run on every (processes, files) workload
+    names = sorted(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        for processes_path, files_path in workloads:
+            scenario = dict(zip(names, values))
+            scenario['processes'] = processes_path
+            scenario['files'] = files_path
+            yield scenario
+
+def run_scenario(scenario):
+    parameters = {name: value for name, value in scenario.items() if name not in ('processes', 'files')}
+    started_at = time.perf_counter()
+
+    # runs as fast as possible, discarding everything the simulation prints
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # in memory, parallel scenarios never share files on the host
+        mini_os = MiniOS(**{'time_scale': 0, 'verbosity': MiniOS.VERBOSITY_QUIET, 'storage': 'memory', **parameters})
+        mini_os.start(scenario['processes'], scenario['files'])
+
+    result = dict(scenario)
+    result.update(mini_os.get_metrics())
+    result['seconds'] = time.perf_counter() - started_at
+    return result
+
+def run_sweep(grid, workloads, max_workers=None):
+    scenarios = list(expand_grid(grid, workloads))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run_scenario, scenarios))
+
+def write_csv(results, path):
+    columns = list(dict.fromkeys(name for result in results for name in result if name not in METRICS)) + METRICS
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+def write_json(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description='runs MiniOS over every combination of a parameter grid')
+    parser.add_argument('grid', help='JSON object mapping MiniOS parameters to the list of values to try')
+    parser.add_argument('--workload', nargs=2, action='append', metavar=('PROCESSES', 'FILES'), help='processes and files descriptions, may repeat')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='sweep.csv', help='.csv or .json table of the results')
+    args = parser.parse_args()
+
+    with open(args.grid) as f:
+        grid = json.load(f)
+    workloads = [tuple(os.path.abspath(path) for path in workload) for workload in args.workload or [('processes.txt', 'files.txt')]]
+
+    started_at = time.perf_counter()
+    results = run_sweep(grid, workloads, args.workers)
+    if args.output.endswith('.json'):
+        write_json(results, args.output)
+    else:
+        write_csv(results, args.output)
+    print(f'{len(results)} scenarios in {time.perf_counter() - started_at:.2f}s, written to {args.output}')
+
+if __name__ == '__main__':
+    main()
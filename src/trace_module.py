@@ -0,0 +1,163 @@
+import json
+
+class TraceRecorder():
+    EVENT_ARRIVAL = 0
+    EVENT_DISPATCH = 1
+    EVENT_PREEMPT = 2
+    EVENT_FINISH = 3
+    EVENT_PROMOTE = 4
+    EVENT_MIGRATE = 5
+    EVENT_PARK = 6
+    EVENT_WAKE = 7
+    EVENT_ALLOCATE = 8
+    EVENT_FREE = 9
+    EVENT_FILE_WRITE = 10
+    EVENT_FILE_DELETE = 11
+    EVENT_PEND = 12
+    EVENT_ADMIT = 13
+    EVENT_FILE_READ = 14
+
+    EVENT_NAMES = {
+        EVENT_ARRIVAL: 'arrival',
+        EVENT_DISPATCH: 'dispatch',
+        EVENT_PREEMPT: 'preempt',
+        EVENT_FINISH: 'finish',
+        EVENT_PROMOTE: 'promote',
+        EVENT_MIGRATE: 'migrate',
+        EVENT_PARK: 'park',
+        EVENT_WAKE: 'wake',
+        EVENT_ALLOCATE: 'allocate',
+        EVENT_FREE: 'free',
+        EVENT_FILE_WRITE: 'file_write',
+        EVENT_FILE_DELETE: 'file_delete',
+        EVENT_PEND: 'pend',
+        EVENT_ADMIT: 'admit',
+        EVENT_FILE_READ: 'file_read',
+    }
+
+    # chrome trace threads of the events not tied to a core
+    THREAD_SCHEDULER = 1000
+    THREAD_MEMORY = 1001
+    THREAD_FILESYSTEM = 1002
+
+    def __init__(self, capacity=1 << 16):
+        # preallocated columns used as a ring buffer, the oldest events are overwritten once it is full
+        self.capacity = capacity
+        self.times = [0] * capacity
+        self.kinds = [0] * capacity
+        self.subjects = [None] * capacity
+        self.values = [0] * capacity
+        self.cores = [0] * capacity
+        self.recorded = 0
+
+        # simulated time stamped on the events, advanced by whoever drives the simulation
+        self.clock = 0
+
+    def __len__(self):
+        return min(self.recorded, self.capacity)
+
+    @property
+    def dropped(self):
+        return max(0, self.recorded - self.capacity)
+
+    def record(self, kind, subject, value=0, core=0):
+        index = self.recorded % self.capacity
+        self.times[index] = self.clock
+        self.kinds[index] = kind
+        self.subjects[index] = subject
+        self.values[index] = value
+        self.cores[index] = core
+        self.recorded += 1
+
+    def events(self):
+        # yields (time, kind, subject, value, core), oldest first
+        for position in range(self.recorded - len(self), self.recorded):
+            index = position % self.capacity
+            yield self.times[index], self.kinds[index], self.subjects[index], self.values[index], self.cores[index]
+
+    def _get_slices(self):
+        # (pid, core, start, end) of every time a process held a core
+        running = {}
+        for time, kind, subject, _, core in self.events():
+            if kind == TraceRecorder.EVENT_DISPATCH:
+                running[core] = (subject, time)
+            elif kind in (TraceRecorder.EVENT_PREEMPT, TraceRecorder.EVENT_FINISH) and core in running:
+                pid, started_at = running.pop(core)
+                # finished processes ran through the tick they finished on
+                yield pid, core, started_at, time + 1 if kind == TraceRecorder.EVENT_FINISH else time
+
+    def to_chrome_trace(self, tick_us=1000):
+        # trace events for chrome://tracing and Perfetto, a tick lasts tick_us microseconds
+        trace_events = []
+        threads = {TraceRecorder.THREAD_SCHEDULER: 'scheduler', TraceRecorder.THREAD_MEMORY: 'memory', TraceRecorder.THREAD_FILESYSTEM: 'filesystem'}
+
+        for pid, core, start, end in self._get_slices():
+            threads.setdefault(core, f'core {core}')
+            trace_events.append({'name': str(pid), 'cat': 'cpu', 'ph': 'X', 'pid': 0, 'tid': core, 'ts': start * tick_us, 'dur': (end - start) * tick_us})
+
+        for time, kind, subject, value, core in self.events():
+            if kind in (TraceRecorder.EVENT_DISPATCH, TraceRecorder.EVENT_PREEMPT):
+                continue
+
+            if kind in (TraceRecorder.EVENT_ALLOCATE, TraceRecorder.EVENT_FREE):
+                tid = TraceRecorder.THREAD_MEMORY
+            elif kind in (TraceRecorder.EVENT_FILE_WRITE, TraceRecorder.EVENT_FILE_READ, TraceRecorder.EVENT_FILE_DELETE):
+                tid = TraceRecorder.THREAD_FILESYSTEM
+            else:
+                tid = TraceRecorder.THREAD_SCHEDULER
+
+            trace_events.append({
+                'name': TraceRecorder.EVENT_NAMES[kind], 'cat': 'event', 'ph': 'i', 's': 't', 'pid': 0, 'tid': tid, 'ts': time * tick_us,
+                'args': {'subject': str(subject), 'value': value, 'core': core},
+            })
+
+        for tid, name in threads.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid, 'args': {'name': name}})
+        trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': 0, 'args': {'name': 'MiniOS'}})
+
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path, tick_us=1000):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(tick_us), f)
+
+    def get_process_summary(self):
+        # pid -> arrival, finish, ticks run, wait and turnaround, for processes whose arrival and finish are still recorded
+        arrivals = {}
+        finishes = {}
+        for time, kind, subject, _, _ in self.events():
+            if kind == TraceRecorder.EVENT_ARRIVAL:
+                arrivals[subject] = time
+            elif kind == TraceRecorder.EVENT_FINISH:
+                finishes[subject] = time + 1
+
+        running = {}
+        for pid, _, start, end in self._get_slices():
+            running[pid] = running.get(pid, 0) + end - start
+
+        summary = {}
+        for pid, finish in finishes.items():
+            if pid not in arrivals:
+                continue
+
+            turnaround = finish - arrivals[pid]
+            summary[pid] = {
+                'arrival': arrivals[pid],
+                'finish': finish,
+                'running': running.get(pid, 0),
+                'wait': turnaround - running.get(pid, 0),
+                'turnaround': turnaround,
+            }
+        return summary
+
+    def show_process_summary(self):
+        summary = self.get_process_summary()
+        print('\nProcesses:')
+        for pid, stats in summary.items():
+            print(f'\t{pid}: arrived {stats["arrival"]}, finished {stats["finish"]}, waited {stats["wait"]}, turnaround {stats["turnaround"]}')
+
+        if summary:
+            print(f'\tAVERAGE: waited {sum(stats["wait"] for stats in summary.values()) / len(summary):.2f}, '
+                  f'turnaround {sum(stats["turnaround"] for stats in summary.values()) / len(summary):.2f}')
+        if self.dropped:
+            print(f'\t{self.dropped} older events were dropped')
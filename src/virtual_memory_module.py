@@ -0,0 +1,208 @@
+from lib.page_replacement import POLICIES
+
+import random
+from array import array
+
+class LocalityWorkload():
+    # page references of a process, mostly around a base that now and then jumps elsewhere
+
+    def __init__(self, pages, seed, window=4, jump=0.1, write_ratio=0.3):
+        self.pages = pages
+        self.random = random.Random(seed)
+        self.window = min(window, pages)
+        self.jump = jump
+        self.write_ratio = write_ratio
+        self.base = 0
+
+    def next_reference(self):
+        if self.random.random() < self.jump:
+            self.base = self.random.randrange(self.pages)
+
+        page = (self.base + self.random.randrange(self.window)) % self.pages
+        return page, self.random.random() < self.write_ratio
+
+class AddressSpace():
+    __slots__ = ('process', 'frames', 'slots', 'dirty', 'workload', 'resident', 'peak_resident', 'references', 'faults')
+
+    def __init__(self, process, pages, workload):
+        self.process = process
+        # page -> frame holding it and page -> swap slot holding its last copy, -1 for none
+        self.frames = array('q', [-1]) * pages
+        self.slots = array('q', [-1]) * pages
+        self.dirty = bytearray(pages)
+        self.workload = workload
+
+        self.resident = 0
+        self.peak_resident = 0
+        self.references = 0
+        self.faults = 0
+
+class VirtualMemoryManager():
+    SWAP_PATH = 'SWAP'
+
+    def __init__(self, frames, policy='lru', working_set_window=16, references_per_tick=4):
+        # frame -> (address space, page) loaded in it
+        self.frames = [None] * frames
+        self.free_frames = list(range(frames - 1, -1, -1))
+        self.policy = POLICIES[policy](frames, working_set_window)
+        self.policy_name = policy
+        self.references_per_tick = references_per_tick
+
+        # process -> its address space, pages are loaded on first touch. pid -> stats of the removed ones
+        self.spaces = {}
+        self.process_stats = {}
+
+        # swap slots are blocks of an extent reserved on the disk
+        self.filesystem_manager = None
+        self.swap_extent = None
+        self.free_slots = []
+
+        self.clock = 0
+        self.stats = {
+            'references': 0,
+            'faults': 0,
+            'evictions': 0,
+            'swap_ins': 0,
+            'swap_outs': 0,
+            'failed_faults': 0,
+        }
+
+    def attach_swap(self, filesystem_manager, blocks):
+        # reserves up to blocks blocks of the disk as swap, as many as its largest free run allows
+        if len(self.free_slots) != self.get_swap_size():
+            raise Exception('swap is in use and cannot be moved')
+
+        if self.swap_extent is not None and self.filesystem_manager is not None:
+            self.filesystem_manager.release_extent(VirtualMemoryManager.SWAP_PATH)
+
+        blocks = min(blocks, filesystem_manager.largest_free_extent)
+        self.filesystem_manager = filesystem_manager
+        self.swap_extent = filesystem_manager.reserve_extent(VirtualMemoryManager.SWAP_PATH, blocks) if blocks else None
+        self.free_slots = list(range(self.get_swap_size() - 1, -1, -1))
+
+    def get_swap_size(self):
+        return self.swap_extent.length if self.swap_extent is not None else 0
+
+    def add_process(self, process):
+        pages = max(process.memory_blocks, 1)
+        self.spaces[process] = AddressSpace(process, pages, LocalityWorkload(pages, str(process.pid)))
+
+    def remove_process(self, process):
+        space = self.spaces.get(process)
+        if space is None:
+            return False
+
+        self.process_stats[process.pid] = self.get_process_stats(process)
+        del self.spaces[process]
+
+        for frame in space.frames:
+            if frame >= 0:
+                self.policy.remove(frame)
+                self.frames[frame] = None
+                self.free_frames.append(frame)
+        for slot in space.slots:
+            if slot >= 0:
+                self.free_slots.append(slot)
+        return True
+
+    def _evict(self, frame):
+        space, page = self.frames[frame]
+
+        # dirty pages take a swap slot first, clean ones already hold one or were never written. Pages have no
+        # content in the simulation, so only the slots are counted and nothing reaches the disk
+        if space.dirty[page]:
+            if space.slots[page] < 0:
+                if not self.free_slots:
+                    return False
+                space.slots[page] = self.free_slots.pop()
+            self.stats['swap_outs'] += 1
+            space.dirty[page] = 0
+
+        self.policy.remove(frame)
+        self.frames[frame] = None
+        self.free_frames.append(frame)
+        space.frames[page] = -1
+        space.resident -= 1
+        self.stats['evictions'] += 1
+        return True
+
+    def _fault(self, space, page):
+        if not self.free_frames and not self._evict(self.policy.victim()):
+            return None
+
+        frame = self.free_frames.pop()
+        self.frames[frame] = (space, page)
+        self.policy.insert(frame, self.clock)
+        space.frames[page] = frame
+        space.resident += 1
+        space.peak_resident = max(space.peak_resident, space.resident)
+
+        space.faults += 1
+        self.stats['faults'] += 1
+        if space.slots[page] >= 0:
+            self.stats['swap_ins'] += 1
+        return frame
+
+    def access(self, process, page, write=False):
+        # touches page of process, faulting it in when not resident. False when no frame could be freed for it
+        space = self.spaces[process]
+        space.references += 1
+        self.stats['references'] += 1
+
+        frame = space.frames[page]
+        if frame < 0:
+            frame = self._fault(space, page)
+            if frame is None:
+                self.stats['failed_faults'] += 1
+                return False
+        else:
+            self.policy.touch(frame, self.clock)
+
+        if write:
+            space.dirty[page] = 1
+        return True
+
+    def run(self, process):
+        # the references a running process makes during a tick
+        space = self.spaces.get(process)
+        if space is None:
+            return
+
+        for _ in range(self.references_per_tick):
+            self.access(process, *space.workload.next_reference())
+
+    def tick(self, now):
+        self.clock = now
+        for frame in self.policy.expire(now):
+            self._evict(frame)
+
+    def get_process_stats(self, process):
+        space = self.spaces[process]
+        return {
+            'references': space.references,
+            'faults': space.faults,
+            'fault_rate': space.faults / space.references if space.references else 0.0,
+            'resident': space.resident,
+            'peak_resident': space.peak_resident,
+        }
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['fault_rate'] = stats['faults'] / stats['references'] if stats['references'] else 0.0
+        stats['resident'] = len(self.frames) - len(self.free_frames)
+        stats['frames'] = len(self.frames)
+        stats['swap_used'] = self.get_swap_size() - len(self.free_slots)
+        stats['swap_size'] = self.get_swap_size()
+        return stats
+
+    def show_stats(self, per_process=False):
+        stats = self.get_stats()
+        print(f'\nVirtual memory ({self.policy_name}):')
+        print(f'\t{stats["references"]} references, {stats["faults"]} faults ({stats["fault_rate"]:.2%}), '
+              f'{stats["swap_ins"]} swap ins, {stats["swap_outs"]} swap outs, {stats["failed_faults"]} failed faults')
+        print(f'\t{stats["resident"]}/{stats["frames"]} frames resident, {stats["swap_used"]}/{stats["swap_size"]} swap blocks used')
+
+        if per_process:
+            for pid, process_stats in self.process_stats.items():
+                print(f'\t{pid}: {process_stats["faults"]}/{process_stats["references"]} faults ({process_stats["fault_rate"]:.2%}), '
+                      f'{process_stats["peak_resident"]} pages peak resident')
@@ -0,0 +1,181 @@
+from lib.utils import get_random_bytes
+
+import argparse
+import itertools
+import os
+import random
+import time
+
+class Distribution():
+    # integer samples described as kind:parameters, e.g. uniform:1:8, exponential:4, choice:0/1,1/3 or bernoulli:0.1
+    KINDS = ('constant', 'uniform', 'exponential', 'choice', 'bernoulli')
+
+    def __init__(self, spec):
+        kind, _, parameters = spec.partition(':')
+        if kind not in Distribution.KINDS:
+            raise ValueError(f'unknown distribution {spec!r}')
+
+        self.spec = spec
+        self.kind = kind
+        if kind == 'choice':
+            # value/weight pairs, the weight defaults to 1
+            pairs = [item.partition('/') for item in parameters.split(',')]
+            self.values = [int(value) for value, _, _ in pairs]
+            self.weights = list(itertools.accumulate(float(weight or 1) for _, _, weight in pairs))
+        else:
+            self.parameters = [float(parameter) for parameter in parameters.split(':')] if parameters else []
+
+    def __repr__(self):
+        return f'Distribution({self.spec!r})'
+
+    def sample(self, rng):
+        if self.kind == 'constant':
+            return int(self.parameters[0])
+        if self.kind == 'uniform':
+            return rng.randint(int(self.parameters[0]), int(self.parameters[1]))
+        if self.kind == 'exponential':
+            return int(rng.expovariate(1 / self.parameters[0])) if self.parameters[0] else 0
+        if self.kind == 'choice':
+            return rng.choices(self.values, cum_weights=self.weights)[0]
+        return int(rng.random() < self.parameters[0])
+
+class WorkloadGenerator():
+    # builds processes.txt and files.txt traces. Each output has its own stream derived from the seed,
+    # so the same seed and settings always give byte-identical files
+    DEFAULTS = {
+        'arrival': 'exponential:2',
+        'priority': 'choice:0/1,1/3,2/3,3/3',
+        'burst': 'uniform:1:10',
+        'memory': 'uniform:1:64',
+        'printer': 'bernoulli:0.1',
+        'scanner': 'bernoulli:0.05',
+        'modem': 'bernoulli:0.05',
+        'disk': 'bernoulli:0.1',
+        'file_size': 'uniform:1:8',
+        'gap': 'uniform:0:4',
+    }
+    DEVICES = ('printer', 'scanner', 'modem', 'disk')
+    CHUNK_ROWS = 1 << 14
+
+    def __init__(self, seed=0, **distributions):
+        unknown = set(distributions) - set(WorkloadGenerator.DEFAULTS)
+        if unknown:
+            raise ValueError(f'unknown distributions {sorted(unknown)}')
+
+        self.seed = seed
+        self.distributions = {name: Distribution(distributions.get(name) or spec) for name, spec in WorkloadGenerator.DEFAULTS.items()}
+
+    def get_random(self, stream):
+        return random.Random(f'{self.seed}:{stream}')
+
+    def generate_processes(self, count):
+        # rows of start, priority, cpu time, memory blocks, printer, scanner, modem, disk in arrival order
+        rng = self.get_random('processes')
+        arrival, priority, burst, memory = (self.distributions[name] for name in ('arrival', 'priority', 'burst', 'memory'))
+        devices = [self.distributions[name] for name in WorkloadGenerator.DEVICES]
+
+        start_time = 0
+        for _ in range(count):
+            start_time += arrival.sample(rng)
+            process_priority = priority.sample(rng)
+            # realtime processes never request devices, the samples are still drawn to keep the stream aligned
+            requests = [device.sample(rng) * bool(process_priority) for device in devices]
+            yield (start_time, process_priority, max(burst.sample(rng), 1), max(memory.sample(rng), 1), *requests)
+
+    def generate_files(self, count, blocks, operations=0, processes=1):
+        # the disk size, the files laid on it left to right with random gaps, then create and delete operations
+        rng = self.get_random('files')
+        file_size, gap = self.distributions['file_size'], self.distributions['gap']
+
+        files = []
+        position = 0
+        for index in range(count):
+            start = position + gap.sample(rng)
+            size = max(file_size.sample(rng), 1)
+            if start + size > blocks:
+                break
+            files.append((f'F{index}', start, size))
+            position = start + size
+
+        yield (blocks,)
+        yield (len(files),)
+        yield from files
+
+        names = [name for name, _, _ in files]
+        created = 0
+        for _ in range(operations):
+            pid = rng.randrange(max(processes, 1))
+            if names and rng.random() < 0.5:
+                yield (pid, 1, names.pop(rng.randrange(len(names))))
+            else:
+                name = f'N{created}'
+                created += 1
+                names.append(name)
+                yield (pid, 0, name, max(file_size.sample(rng), 1))
+
+    def write(self, rows, path):
+        # joins rows a chunk at a time so millions of them never sit in memory at once
+        written = 0
+        with open(path, 'w', newline='\n') as f:
+            while True:
+                chunk = list(itertools.islice(rows, WorkloadGenerator.CHUNK_ROWS))
+                if not chunk:
+                    break
+                f.write(''.join(', '.join(map(str, row)) + '\n' for row in chunk))
+                written += len(chunk)
+        return written
+
+    def write_processes(self, path, count):
+        return self.write(self.generate_processes(count), path)
+
+    def write_files(self, path, count, blocks, operations=0, processes=1):
+        return self.write(self.generate_files(count, blocks, operations, processes), path)
+
+    def write_payloads(self, directory, count, blocks, block_size=512, chunk_size=1 << 20):
+        # contents of the initial files of the trace, as large as their extents, written in chunks from a seeded stream
+        rng = self.get_random('payloads')
+        rows = self.generate_files(count, blocks)
+        next(rows)
+        files = itertools.islice(rows, next(rows)[0])
+        os.makedirs(directory, exist_ok=True)
+
+        written = 0
+        for name, _, size in files:
+            remaining = size * block_size
+            with open(os.path.join(directory, name), 'wb') as f:
+                while remaining:
+                    n = min(remaining, chunk_size)
+                    f.write(get_random_bytes(n, rng))
+                    remaining -= n
+                    written += n
+        return written
+
+def main():
+    parser = argparse.ArgumentParser(description='generates seeded processes.txt and files.txt traces')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=1000, help='process rows to generate')
+    parser.add_argument('--files', type=int, default=100, help='files initially on the disk')
+    parser.add_argument('--blocks', type=int, default=None, help='disk blocks, enough for every file by default')
+    parser.add_argument('--operations', type=int, default=0, help='file operations after the initial files')
+    parser.add_argument('--processes-output', default='processes.txt')
+    parser.add_argument('--files-output', default='files.txt')
+    parser.add_argument('--payloads', default=None, metavar='DIRECTORY', help='also writes the contents of the files there')
+    parser.add_argument('--block-size', type=int, default=512)
+    for name, spec in WorkloadGenerator.DEFAULTS.items():
+        parser.add_argument(f'--{name.replace("_", "-")}', dest=name, default=spec, help=f'distribution, {spec} by default')
+    args = parser.parse_args()
+
+    generator = WorkloadGenerator(args.seed, **{name: getattr(args, name) for name in WorkloadGenerator.DEFAULTS})
+    blocks = args.blocks if args.blocks is not None else max(args.files * 16, 1)
+
+    started_at = time.perf_counter()
+    processes = generator.write_processes(args.processes_output, args.processes)
+    files = generator.write_files(args.files_output, args.files, blocks, args.operations, args.processes)
+    print(f'{processes} processes written to {args.processes_output}, {files} lines written to {args.files_output}')
+    if args.payloads:
+        written = generator.write_payloads(args.payloads, args.files, blocks, args.block_size)
+        print(f'{written} payload bytes written to {args.payloads}')
+    print(f'done in {time.perf_counter() - started_at:.2f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+
+from src.async_filesystem_module import AsyncFileSystemManager
+from src.filesystem_module import FileSystemManager
+from src.process_module import Process
+from src.storage_module import MemoryStorage
+
+class BlockingStorage(MemoryStorage):
+    # holds stores to a path until released, so other writes run while they are in flight
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.entered = threading.Event()
+        self.released = threading.Event()
+
+    def store(self, path, start, bytes):
+        if path == self.path:
+            self.entered.set()
+            self.released.wait(5)
+        super().store(path, start, bytes)
+
+class TestAsyncFileSystem(unittest.TestCase):
+
+    def test_concurrent_writes_to_a_path_are_coalesced(self):
+        fsm = FileSystemManager(base_dir=tempfile.mkdtemp() + '/', blocks=8, block_size=16)
+        afsm = AsyncFileSystemManager(fsm)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        async def run():
+            written = await asyncio.gather(*[afsm.update(bytes([index]) * 16, 'a', process) for index in range(4)])
+            return written, await afsm.read('a')
+
+        written, (content, read) = asyncio.run(run())
+        self.assertEqual(written, [True] * 4)
+        self.assertEqual(content, bytes([3]) * 16, 'the last write wins')
+        self.assertEqual(afsm.stats['writes'], 1)
+        self.assertEqual(afsm.stats['coalesced_writes'], 3)
+        self.assertEqual(fsm.max_available_blocks, 7)
+        afsm.close()
+
+    def test_concurrent_creates_get_distinct_blocks(self):
+        fsm = FileSystemManager(base_dir=tempfile.mkdtemp() + '/', blocks=32, block_size=16)
+        afsm = AsyncFileSystemManager(fsm, max_workers=8)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        async def run():
+            await asyncio.gather(*[afsm.create(b'x' * 32, f'f{index}', process) for index in range(16)])
+            starts = sorted(extent.start for extent in fsm.paths.values())
+            return starts, await asyncio.gather(*[afsm.delete(f'f{index}', process) for index in range(16)])
+
+        starts, deleted = asyncio.run(run())
+        self.assertEqual(starts, list(range(0, 32, 2)), 'extents do not overlap')
+        self.assertEqual(deleted, [True] * 16)
+        self.assertEqual(fsm.max_available_blocks, 32, 'every block is released')
+        afsm.close()
+
+    def test_defragmenter_leaves_writes_in_flight_in_place(self):
+        storage = BlockingStorage('a')
+        fsm = FileSystemManager(base_dir='', blocks=9, block_size=4, defragment=True, storage=storage)
+        afsm = AsyncFileSystemManager(fsm)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+        for name in 'xy':
+            fsm.create(name.encode() * 4, name, process)
+        storage.released.set()
+        fsm.create(b'a' * 4, 'a', process)
+        fsm.create(b'z' * 4, 'z', process)
+        fsm.delete('x', process)
+        storage.released.clear()
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            write = asyncio.ensure_future(afsm.update(b'A' * 4, 'a', process))
+            await loop.run_in_executor(None, storage.entered.wait, 5)
+
+            # needs the whole free space, compacting would have to move a
+            blocked = await afsm.create(b'b' * 24, 'b', process)
+            storage.released.set()
+            written = await write
+            return blocked, written, await afsm.create(b'b' * 24, 'b', process)
+
+        blocked, written, created = asyncio.run(run())
+        self.assertFalse(blocked, 'the extent being written is not moved')
+        self.assertTrue(written)
+        self.assertTrue(created, 'the disk compacts once the write landed')
+        self.assertEqual(fsm.in_flight, {})
+        for name in 'ayz':
+            self.assertEqual(fsm.read(name), ((name.upper() if name == 'a' else name).encode() * 4, True), name)
+        self.assertEqual(fsm.read('b'), (b'b' * 24, True))
+        afsm.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from src.cpu_module import CPUManager
+from src.process_module import Process
+
+class TestCPU(unittest.TestCase):
+
+    def test_arrivals_go_to_least_loaded_core(self):
+        cm = CPUManager(cores=2, work_stealing=False)
+        processes = [Process(f'p{i}', priority=1, cpu_time=2) for i in range(3)]
+        for process in processes:
+            cm.add_process(process)
+
+        self.assertEqual([cm.get_core(process) for process in processes], [0, 1, 0])
+        self.assertEqual(cm.get_active_processes(), processes[:2], 'every core runs a process')
+
+        self.assertEqual(cm.run_processes(), [])
+        self.assertEqual(cm.run_processes(), processes[:2], 'cores run in parallel')
+        self.assertEqual(cm.run_processes(), [])
+        self.assertEqual(cm.run_processes(), [processes[2]])
+
+        self.assertEqual([stats['utilization'] for stats in cm.get_core_stats()], [1.0, 0.5])
+
+    def test_idle_cores_steal_waiting_processes(self):
+        cm = CPUManager(cores=2, placement=CPUManager.PLACEMENT_ROUND_ROBIN)
+        long = Process('p0', priority=1, cpu_time=4)
+        short = Process('p1', priority=1, cpu_time=1)
+        waiting = Process('p2', priority=3, cpu_time=1)
+        for process in (long, short, waiting):
+            cm.add_process(process)
+        self.assertEqual(cm.get_core(waiting), 0)
+
+        self.assertEqual(cm.run_processes(), [short])
+        self.assertEqual(cm.run_processes(), [waiting], 'the idle core runs the process waiting on the other')
+        self.assertEqual([stats['migrations'] for stats in cm.get_core_stats()], [0, 1])
+        self.assertIs(cm.get_active_processes()[0], long, 'the active process is never stolen')
+
+if __name__ == '__main__':
+    unittest.main()
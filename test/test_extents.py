@@ -0,0 +1,94 @@
+import random
+import unittest
+
+from lib.extents import FreeExtentIndex
+
+class TestFreeExtentIndex(unittest.TestCase):
+
+    def test_first_fit_takes_lowest_run(self):
+        index = FreeExtentIndex(16)
+        index.reserve(2, 2)
+        index.reserve(8, 2)
+
+        # free runs are [0, 2), [4, 8) and [10, 16)
+        self.assertEqual(index.find(2), 0, 'first fit uses the first run large enough')
+        self.assertEqual(index.find(3), 4, 'first fit skips runs too small')
+        self.assertEqual(index.find(5), 10, 'first fit finds runs at the end of the disk')
+        self.assertIsNone(index.find(7), 'no run is large enough')
+
+    def test_best_fit_takes_smallest_run(self):
+        index = FreeExtentIndex(16, FreeExtentIndex.BEST_FIT)
+        index.reserve(2, 2)
+        index.reserve(8, 2)
+
+        self.assertEqual(index.find(3), 4, 'best fit uses the smallest run large enough')
+        self.assertEqual(index.find(5), 10, 'best fit falls back to larger runs')
+
+    def test_next_fit_continues_from_last_allocation(self):
+        index = FreeExtentIndex(16, FreeExtentIndex.NEXT_FIT)
+        self.assertEqual(index.allocate(4), 0)
+        index.release(0, 4)
+
+        self.assertEqual(index.allocate(4), 4, 'next fit resumes after the previous allocation')
+        self.assertEqual(index.allocate(8), 8)
+        self.assertEqual(index.allocate(4), 0, 'next fit wraps around the disk')
+
+    def test_release_coalesces_neighbours(self):
+        index = FreeExtentIndex(16)
+        for _ in range(4):
+            index.allocate(4)
+        self.assertEqual(index.free, 0)
+
+        index.release(0, 4)
+        index.release(8, 4)
+        self.assertEqual(index.largest, 4)
+        self.assertEqual(index.fragmentation, 0.5)
+
+        index.release(4, 4)
+        self.assertEqual(list(index), [(0, 12)], 'released runs are merged')
+        self.assertEqual(index.largest, 12)
+        self.assertEqual(index.fragmentation, 0.0)
+
+    def test_reserve_spans_several_runs(self):
+        index = FreeExtentIndex(16)
+        index.reserve(4, 2)
+        index.reserve(10, 2)
+
+        self.assertEqual(index.reserve(2, 12), 8, 'only free blocks are counted')
+        self.assertEqual(list(index), [(0, 2), (14, 2)])
+        self.assertEqual(index.free, 4)
+
+    def test_matches_a_linear_model(self):
+        rng = random.Random(0)
+        for policy in (FreeExtentIndex.FIRST_FIT, FreeExtentIndex.BEST_FIT):
+            index = FreeExtentIndex(128, policy)
+            used = {}
+            for _ in range(500):
+                if used and rng.random() < 0.5:
+                    start = rng.choice(list(used))
+                    index.release(start, used.pop(start))
+                else:
+                    n = rng.randrange(1, 9)
+                    start = index.allocate(n)
+                    if start is not None:
+                        used[start] = n
+
+                free = [block for block in range(128) if not any(start <= block < start + n for start, n in used.items())]
+                runs = []
+                for block in free:
+                    if runs and runs[-1][0] + runs[-1][1] == block:
+                        runs[-1][1] += 1
+                    else:
+                        runs.append([block, 1])
+                self.assertEqual(list(index), [tuple(run) for run in runs])
+                self.assertEqual(len(index), len(runs))
+                self.assertEqual(index.largest, max((n for _, n in runs), default=0))
+                if runs:
+                    n = rng.randrange(1, 9)
+                    fitting = [(length, start) for start, length in runs if length >= n]
+                    expected = (min(fitting)[1] if policy == FreeExtentIndex.BEST_FIT else min(fitting, key=lambda run: run[1])[1]) if fitting else None
+                    self.assertEqual(index.find(n), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import random
+import unittest
+
+from lib.fenwick import FenwickTree
+
+class TestFenwick(unittest.TestCase):
+
+    def test_find_matches_a_linear_scan(self):
+        rng = random.Random(0)
+        tree = FenwickTree(4)
+        weights = []
+        for index in range(37):
+            if index >= len(tree):
+                tree.grow(2 * len(tree))
+            weights.append(rng.randrange(5))
+            tree.add(index, weights[-1])
+
+        self.assertEqual(tree.total, sum(weights))
+        self.assertEqual(tree.prefix(20), sum(weights[:20]))
+        for value in range(tree.total):
+            index = 0
+            while sum(weights[:index + 1]) <= value:
+                index += 1
+            self.assertEqual(tree.find(value), index)
+
+if __name__ == '__main__':
+    unittest.main()
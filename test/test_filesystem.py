@@ -1,10 +1,12 @@
+import os
 import random
+import tempfile
 import unittest
 
 from src.filesystem_module import FileSystemManager
 from src.process_module import Process
 
-from lib.utils import get_random_bytes
+from lib.utils import get_density_bar, get_random_bytes
 
 class TestFileSystem(unittest.TestCase):
 
@@ -230,6 +232,250 @@ class TestFileSystem(unittest.TestCase):
         # deletes test file
         fsm.delete(path, realtime_process)
 
+    def test_utilization_map_tracks_loaded_blocks(self):
+        fsm = FileSystemManager(base_dir='src/drives/tests/', blocks=10_000_000)
+        fsm.load_block('X', 2, 3)
+
+        utilization_map = fsm.get_utilization_map()
+        self.assertEqual(len(utilization_map), 10_000_000, 'utilization map covers the whole disk')
+        self.assertEqual([block.path if block else None for block in utilization_map[:6]], [None, None, 'X', 'X', 'X', None])
+        self.assertEqual(fsm.max_available_blocks, 10_000_000 - 3, 'loaded blocks are not available')
+
+    def test_encoded_utilization_map(self):
+        fsm = FileSystemManager(blocks=16, block_size=1)
+        fsm.load_block('X', 0, 3)
+        fsm.load_block('Y', 8, 4)
+
+        self.assertEqual(fsm.get_utilization_map(encoded=True), [(0, 3, 'X'), (3, 5, None), (8, 4, 'Y'), (12, 4, None)])
+        self.assertEqual(get_density_bar([(start, length) for start, length, path in fsm.get_utilization_map(encoded=True) if path], 16, 8), '#-  ##  ', 'half used cells are half dark')
+
+    def test_journal_restores_paths(self):
+        directory = tempfile.mkdtemp()
+
+        class JournaledFileSystemManager(FileSystemManager):
+            JOURNAL_PATH = os.path.join(directory, 'filesystem_manager.journal')
+            CHECKPOINT_PATH = os.path.join(directory, 'filesystem_manager.checkpoint')
+
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+        fsm = JournaledFileSystemManager(base_dir=directory + '/', blocks=8, use_lock=True, checkpoint_interval=3)
+        for name in 'abcd':
+            fsm.create(get_random_bytes(n=1024), name, process)
+        fsm.delete('b', process)
+        fsm.close()
+
+        # simulates a crash in the middle of appending a record
+        with open(JournaledFileSystemManager.JOURNAL_PATH, 'ab') as f:
+            f.write(b'\x10\x00\x00')
+
+        fsm = JournaledFileSystemManager(base_dir=directory + '/', blocks=8, use_lock=True, checkpoint_interval=3)
+        self.assertEqual(sorted(fsm.paths), [directory + '/' + name for name in 'acd'], 'journaled files are restored')
+        self.assertEqual(fsm.max_available_blocks, 5, 'restored files hold their blocks')
+        self.assertEqual(fsm.blocks.get_owner(fsm.paths[directory + '/a'].start).pid, 'test_suite')
+
+        fsm.create(get_random_bytes(n=1024), 'e', process)
+        fsm.close()
+        fsm = JournaledFileSystemManager(base_dir=directory + '/', blocks=8, use_lock=True)
+        self.assertIn(directory + '/e', fsm.paths, 'records appended after a torn one are replayed')
+        fsm.close()
+
+    def test_disk_image_reads_without_copy(self):
+        directory = tempfile.mkdtemp()
+        fsm = FileSystemManager(base_dir='', blocks=4, block_size=16, disk_image=os.path.join(directory, 'sda1.img'))
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        fsm.create(b'a' * 20, 'a', process)
+        fsm.create(b'b' * 10, 'b', process)
+        self.assertEqual(fsm.paths['b'].start, 2, 'files are laid out at their blocks')
+
+        content, read = fsm.read('b', copy=False)
+        self.assertTrue(read)
+        self.assertIsInstance(content, memoryview)
+        self.assertEqual(content.tobytes(), b'b' * 10)
+        content.release()
+
+        self.assertTrue(fsm.delete('a', process))
+        _, read = fsm.read('a')
+        self.assertFalse(read, 'deleted files cannot be read')
+
+        content, _ = fsm.read('b', copy=False)
+        fsm.close()
+        self.assertEqual(content.tobytes(), b'b' * 10, 'closing leaves held views readable')
+        content.release()
+
+        with open(os.path.join(directory, 'sda1.img'), 'rb') as f:
+            self.assertEqual(f.read()[32:42], b'b' * 10, 'disk image holds the written blocks')
+
+    def test_cache_serves_repeated_reads(self):
+        directory = tempfile.mkdtemp() + '/'
+        fsm = FileSystemManager(base_dir=directory, blocks=8, block_size=16, cache_size=64)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        fsm.create(b'a' * 40, 'a', process)
+        fsm.create(b'b' * 40, 'b', process)
+        self.assertEqual(fsm.get_cache_stats()['evictions'], 1, 'cache is bounded by bytes')
+
+        self.assertEqual(fsm.read('b'), (b'b' * 40, True))
+        self.assertEqual(fsm.get_cache_stats()['hits'], 3, 'cached blocks are served from the cache')
+        self.assertEqual(fsm.read('a'), (b'a' * 40, True))
+        self.assertEqual(fsm.get_cache_stats()['misses'], 1, 'evicted blocks are read from the host')
+
+        fsm.delete('a', process)
+        self.assertFalse(any(id in fsm.cache for id in range(3)), 'deleted files leave the cache')
+
+    def test_write_back_cache_defers_host_writes(self):
+        directory = tempfile.mkdtemp() + '/'
+        fsm = FileSystemManager(base_dir=directory, blocks=8, block_size=16, cache_size=64, cache_policy='clock', write_back=True)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        fsm.create(b'a' * 40, 'a', process)
+        self.assertFalse(os.path.exists(directory + 'a'), 'write back does not touch the host')
+        self.assertEqual(fsm.read('a'), (b'a' * 40, True))
+
+        # evicting any block of a dirty file writes it back
+        fsm.create(b'b' * 40, 'b', process)
+        with open(directory + 'a', 'rb') as f:
+            self.assertEqual(f.read(), b'a' * 40)
+
+        fsm.flush()
+        with open(directory + 'b', 'rb') as f:
+            self.assertEqual(f.read(), b'b' * 40)
+
+    def test_update_reuses_blocks(self):
+        directory = tempfile.mkdtemp() + '/'
+        fsm = FileSystemManager(base_dir=directory, blocks=8, block_size=16)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        fsm.create(b'a' * 40, 'a', process)
+        fsm.update(b'b' * 10, 'a', process)
+        self.assertEqual(fsm.max_available_blocks, 7, 'shrinking releases the tail blocks')
+
+        fsm.update(b'c' * 64, 'a', process)
+        self.assertEqual(fsm.paths[directory + 'a'].start, 0, 'file grows in place')
+        self.assertEqual(fsm.max_available_blocks, 4)
+        self.assertEqual(fsm.read('a'), (b'c' * 64, True))
+
+    def test_append_and_write_at(self):
+        directory = tempfile.mkdtemp()
+        fsm = FileSystemManager(base_dir='', blocks=8, block_size=16, disk_image=os.path.join(directory, 'sda1.img'), cache_size=64)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        fsm.create(b'a' * 16, 'a', process)
+        fsm.create(b'b' * 16, 'b', process)
+        self.assertEqual(fsm.read('a'), (b'a' * 16, True))
+
+        # the block after a is taken, so a moves along with its content
+        self.assertTrue(fsm.append('a', b'x' * 4))
+        self.assertEqual(fsm.paths['a'].start, 2)
+        self.assertEqual(fsm.read('a'), (b'a' * 16 + b'x' * 4, True))
+        self.assertEqual(fsm.max_available_blocks, 5, 'moved files release their previous blocks')
+
+        self.assertTrue(fsm.write_at('a', 2, b'yy'))
+        self.assertTrue(fsm.write_at('a', 22, b'z'))
+        self.assertEqual(fsm.read('a'), (b'aayy' + b'a' * 12 + b'x' * 4 + b'\x00\x00z', True))
+        fsm.close()
+
+    def test_directory_index(self):
+        directory = tempfile.mkdtemp() + '/'
+        fsm = FileSystemManager(base_dir=directory, blocks=8, block_size=16)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        for path in ['home/a.txt', 'home/docs/b.txt', 'home/docs/c.txt', 'tmp/d.txt']:
+            fsm.create(b'x' * 16, path, process)
+
+        self.assertEqual(fsm.listdir(), ['home', 'tmp'])
+        self.assertEqual(fsm.listdir('home'), ['docs', 'a.txt'])
+        self.assertEqual([entry[0] for entry in fsm.walk('home')], ['home', 'home/docs'])
+        self.assertEqual(fsm.stat('home/docs/b.txt')['size'], 16)
+        self.assertEqual(fsm.stat('home')['files'], 3)
+
+        self.assertEqual(fsm.delete_tree('home/docs', process), 2, 'subtree files are deleted')
+        self.assertEqual(fsm.listdir('home'), ['a.txt'], 'empty directories leave the index')
+        self.assertIsNone(fsm.stat('home/docs'))
+        self.assertEqual(fsm.max_available_blocks, 6)
+
+    def test_defragment_compacts_on_failed_write(self):
+        directory = tempfile.mkdtemp()
+        fsm = FileSystemManager(base_dir='', blocks=8, block_size=4, disk_image=os.path.join(directory, 'sda1.img'), defragment=True)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        for name in 'abcd':
+            self.assertTrue(fsm.create(name.encode() * 8, name, process))
+        self.assertTrue(fsm.delete('a', process))
+        self.assertTrue(fsm.delete('c', process))
+        self.assertEqual(fsm.largest_free_extent, 2)
+
+        self.assertTrue(fsm.create(b'e' * 16, 'e', process), 'the disk is compacted to fit the write')
+        self.assertEqual(fsm.paths['b'].start, 0)
+        self.assertEqual(fsm.paths['d'].start, 2)
+        self.assertEqual(fsm.paths['e'].start, 4)
+        self.assertEqual(fsm.read('d'), (b'd' * 8, True), 'moved files keep their content')
+        self.assertEqual(fsm.get_defragmentation_stats()['blocks_moved'], 4)
+        fsm.close()
+
+    def test_defragment_tick_is_bounded(self):
+        fsm = FileSystemManager(base_dir=tempfile.mkdtemp() + '/', blocks=16, block_size=4)
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        for name in 'abcdefgh':
+            self.assertTrue(fsm.create(b'x' * 8, name, process))
+        for name in 'aceg':
+            self.assertTrue(fsm.delete(name, process))
+
+        fsm.defragmenter.blocks_per_tick = 4
+        fsm.defragmenter.threshold = 0.0
+        self.assertEqual(fsm.defragmenter.tick(), 4, 'a tick moves at most blocks_per_tick blocks')
+        self.assertEqual([fsm.paths[fsm.BASE_DIR + name].start for name in 'bdfh'], [0, 2, 10, 14])
+
+        while fsm.defragmenter.tick():
+            pass
+        self.assertEqual([fsm.paths[fsm.BASE_DIR + name].start for name in 'bdfh'], [0, 2, 4, 6])
+        self.assertEqual(list(fsm.free_extents), [(8, 8)])
+        self.assertEqual(fsm.fragmentation, 0.0)
+
+    def test_memory_storage_keeps_files_off_the_host(self):
+        directory = tempfile.mkdtemp()
+        fsm = FileSystemManager(base_dir=directory + '/', blocks=16, block_size=4, storage='memory')
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        for name in 'abcd':
+            self.assertTrue(fsm.create(name.encode() * 8, name, process))
+        self.assertTrue(fsm.delete('a', process))
+        fsm.move(directory + '/d', 0)
+        self.assertEqual(fsm.read('d'), (b'd' * 8, True), 'moved files keep their content')
+
+        self.assertTrue(fsm.append('b', b'B' * 4))
+        self.assertEqual(fsm.paths[directory + '/b'].start, 6)
+        self.assertEqual(fsm.read('b'), (b'b' * 8 + b'B' * 4, True), 'relocated files keep their content')
+        self.assertTrue(fsm.update(b'u', 'c', process))
+        self.assertEqual(fsm.read('c'), (b'u', True))
+
+        self.assertTrue(fsm.delete('d', process))
+        self.assertEqual(fsm.read('d'), (b'', False))
+        self.assertFalse(fsm.delete('d', process))
+        self.assertEqual(len(fsm.storage.extents), 2, 'only live files hold content')
+        self.assertEqual(os.listdir(directory), [])
+        fsm.close()
+
+    def test_block_table_releases_interned_paths(self):
+        fsm = FileSystemManager(base_dir='', blocks=16, block_size=4, storage='memory')
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        for cycle in range(200):
+            self.assertTrue(fsm.create(b'x' * 8, f'f{cycle}', process))
+            self.assertTrue(fsm.append(f'f{cycle}', b'y' * 4))
+            self.assertTrue(fsm.update(b'z', f'f{cycle}', process))
+            self.assertTrue(fsm.delete(f'f{cycle}', process))
+
+        self.assertEqual(len(fsm.blocks._paths), 0)
+        self.assertEqual(len(fsm.blocks._owners), 0)
+        self.assertLessEqual(len(fsm.blocks._paths.values), 2, 'freed ids are reused')
+
+        fsm.create(b'x' * 8, 'kept', process)
+        self.assertEqual(fsm.blocks.get_path(0), 'kept')
+        self.assertEqual(fsm.blocks.get_owner(1), process)
+        self.assertEqual(len(fsm.blocks._paths), 1)
+        fsm.close()
+
     
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from src.memory_module import MemoryManager
+from src.process_module import Process
+
+class TestMemory(unittest.TestCase):
+
+    def test_first_fit_reuses_freed_blocks(self):
+        mm = MemoryManager(blocks={Process.TYPE_USER: 8})
+        first = Process('p0', priority=Process.TYPE_USER)
+        second = Process('p1', priority=Process.TYPE_USER)
+        third = Process('p2', priority=Process.TYPE_USER)
+
+        self.assertTrue(mm.assign_memory_blocks(4, first))
+        self.assertTrue(mm.assign_memory_blocks(4, second))
+        self.assertFalse(mm.assign_memory_blocks(4, third), 'pool is exhausted')
+
+        self.assertTrue(mm.free_memory_blocks(first))
+        self.assertEqual(mm.available_memory_blocks[Process.TYPE_USER], 4, 'freed blocks are available again')
+        self.assertTrue(mm.assign_memory_blocks(4, third))
+        self.assertTrue(all(block.owner is third for block in mm.blocks[Process.TYPE_USER][:4]))
+
+    def test_defragment_compacts_pool(self):
+        mm = MemoryManager(blocks={Process.TYPE_USER: 8}, defragment=True)
+        processes = [Process(f'p{i}', priority=Process.TYPE_USER) for i in range(5)]
+
+        for process in processes[:4]:
+            self.assertTrue(mm.assign_memory_blocks(2, process))
+        self.assertTrue(mm.free_memory_blocks(processes[0]))
+        self.assertTrue(mm.free_memory_blocks(processes[2]))
+
+        self.assertTrue(mm.assign_memory_blocks(4, processes[4]), 'the pool is compacted to fit the allocation')
+        self.assertEqual(mm.allocations[processes[3]], (Process.TYPE_USER, 2))
+        self.assertEqual([block.owner for block in mm.blocks[Process.TYPE_USER]], [processes[1]] * 2 + [processes[3]] * 2 + [processes[4]] * 4)
+
+    def test_buddy_splits_and_coalesces(self):
+        mm = MemoryManager(blocks={Process.TYPE_REALTIME: 64}, engines={Process.TYPE_REALTIME: MemoryManager.ENGINE_BUDDY})
+        processes = [Process(f'p{i}', priority=Process.TYPE_REALTIME) for i in range(3)]
+
+        # 24 blocks are rounded up to 32
+        self.assertTrue(mm.assign_memory_blocks(24, processes[0]))
+        self.assertEqual(mm.available_memory_blocks[Process.TYPE_REALTIME], 32)
+        self.assertTrue(mm.assign_memory_blocks(16, processes[1]))
+        self.assertTrue(mm.assign_memory_blocks(16, processes[2]))
+        self.assertEqual(mm.available_memory_blocks[Process.TYPE_REALTIME], 0)
+
+        stats = mm.get_allocation_stats()[Process.TYPE_REALTIME]
+        self.assertEqual(stats['internal_fragmentation'], 1 - 56 / 64)
+
+        for process in processes:
+            mm.free_memory_blocks(process)
+        self.assertEqual(mm.allocators[Process.TYPE_REALTIME].largest, 64, 'freed buddies are merged back')
+        self.assertTrue(mm.assign_memory_blocks(64, processes[0]))
+
+    def test_buddy_handles_pools_not_power_of_two(self):
+        mm = MemoryManager(blocks={Process.TYPE_USER: 960}, engines={Process.TYPE_USER: MemoryManager.ENGINE_BUDDY})
+        process = Process('p0', priority=Process.TYPE_USER)
+
+        self.assertFalse(mm.assign_memory_blocks(513, process), 'no aligned run of 1024 blocks exists')
+        self.assertTrue(mm.assign_memory_blocks(512, process))
+        self.assertEqual(mm.available_memory_blocks[Process.TYPE_USER], 448)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.mini_os import MiniOS
+from src.process_module import Process
+from src.resource_module import ResourceManager
+
+class TestMiniOS(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.processes_path = os.path.join(self.directory, 'processes.txt')
+        self.files_path = os.path.join(self.directory, 'files.txt')
+        with open(self.processes_path, 'w') as f:
+            f.write('0, 1, 3, 8, 0, 0, 0, 0\n0, 1, 1, 6, 0, 0, 0, 0\n1, 2, 2, 20, 0, 0, 0, 0\n2, 1, 1, 2, 0, 0, 0, 0\n')
+        with open(self.files_path, 'w') as f:
+            f.write('10\n0\n')
+
+    def run_quietly(self, function, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args)
+
+    def test_memory_is_taken_on_arrival_and_released_on_finish(self):
+        mini_os = MiniOS(time_scale=0, user_memory_blocks=10, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.assertTrue(self.run_quietly(mini_os.start, self.processes_path, self.files_path))
+
+        metrics = mini_os.get_metrics()
+        self.assertEqual(metrics['finished'], 3)
+        self.assertEqual(metrics['spawn_failures'], 1, 'processes larger than their pool are rejected')
+        self.assertEqual(mini_os.memory_manager.available_memory_blocks[Process.TYPE_USER], 10, 'finished processes give their memory back')
+
+        stats = mini_os.get_admission_stats()[Process.TYPE_USER]
+        self.assertEqual(stats['admitted'], 3)
+        self.assertEqual(stats['max_delay'], 2, 'the second process waits for the first to finish')
+        self.assertEqual(stats['peak_pending'], 2, 'later arrivals queue behind the pending ones')
+        self.assertEqual(stats['peak_used'], 8)
+        self.assertEqual(stats['pending'], 0)
+
+    def test_pending_processes_survive_a_snapshot(self):
+        mini_os = MiniOS(time_scale=0, user_memory_blocks=10, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.assertFalse(self.run_quietly(mini_os.start, self.processes_path, self.files_path, 2))
+        self.assertEqual(len(mini_os.pending[Process.TYPE_USER]), 1)
+        path = os.path.join(self.directory, 'snapshot')
+        mini_os.snapshot(path)
+        self.run_quietly(mini_os.run)
+
+        restored = MiniOS(verbosity=MiniOS.VERBOSITY_QUIET)
+        restored.restore(path)
+        self.assertEqual([process.pid for _, _, process in restored.pending[Process.TYPE_USER]], ['p1'])
+        self.run_quietly(restored.run)
+        self.assertEqual(restored.get_metrics(), mini_os.get_metrics())
+        self.assertEqual(restored.get_admission_stats(), mini_os.get_admission_stats())
+
+    def write_processes(self, rows):
+        with open(self.processes_path, 'w') as f:
+            f.write(''.join(f'{arrival}, 1, {cpu_time}, 1, 0, 0, 0, 0\n' for arrival, cpu_time in rows))
+
+    def count_ticks(self, mini_os):
+        ticks = []
+        run_processes = mini_os.cpu_manager.run_processes
+        def counted():
+            ticks.append(mini_os.cpu_time)
+            return run_processes()
+        mini_os.cpu_manager.run_processes = counted
+        return ticks
+
+    def test_run_stops_once_the_queues_drain(self):
+        self.write_processes([(0, 2), (0, 3), (1, 1)])
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        ticks = self.count_ticks(mini_os)
+        self.assertTrue(self.run_quietly(mini_os.start, self.processes_path, self.files_path))
+
+        self.assertEqual(mini_os.get_metrics()['finished'], 3)
+        self.assertEqual(mini_os.cpu_time, 6)
+        self.assertEqual(len(ticks), 6, 'no tick runs after the last process finished')
+        self.assertFalse(mini_os.arrivals or len(mini_os.cpu_manager) or any(mini_os.pending.values()))
+        self.assertTrue(self.run_quietly(mini_os.run), 'running a drained system returns right away')
+        self.assertEqual(mini_os.cpu_time, 6)
+
+    def test_run_skips_idle_gaps_to_the_next_arrival(self):
+        self.write_processes([(0, 1), (100000, 2)])
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        ticks = self.count_ticks(mini_os)
+        self.assertTrue(self.run_quietly(mini_os.start, self.processes_path, self.files_path))
+
+        self.assertEqual(ticks, [0, 100000, 100001], 'the cpu time jumps over the gap')
+        self.assertEqual(mini_os.cpu_time, 100002)
+        self.assertEqual(mini_os.get_metrics()['finished'], 2)
+
+    def test_run_sleeps_only_with_a_time_scale(self):
+        self.write_processes([(0, 3)])
+        with mock.patch('src.mini_os.time.sleep') as sleep:
+            mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+            self.assertTrue(self.run_quietly(mini_os.start, self.processes_path, self.files_path))
+            sleep.assert_not_called()
+
+            mini_os = MiniOS(quantum=2, time_scale=0.5, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+            self.assertTrue(self.run_quietly(mini_os.start, self.processes_path, self.files_path))
+            self.assertEqual(sleep.call_args_list, [mock.call(1.0)] * 3)
+
+    def test_run_until_pauses_and_resumes(self):
+        self.write_processes([(0, 2), (1, 3), (8, 1)])
+        uninterrupted = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.assertTrue(self.run_quietly(uninterrupted.start, self.processes_path, self.files_path))
+
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.assertFalse(self.run_quietly(mini_os.start, self.processes_path, self.files_path, 3))
+        self.assertEqual(mini_os.cpu_time, 3)
+        self.assertEqual(mini_os.get_metrics()['finished'], 1)
+        self.assertFalse(self.run_quietly(mini_os.run, 3), 'the pause holds until the limit moves')
+        self.assertFalse(self.run_quietly(mini_os.run, 6))
+        self.assertEqual(mini_os.cpu_time, 6, 'skipping the idle gap stops at until')
+        self.assertEqual(mini_os.get_metrics()['finished'], 2)
+
+        self.assertTrue(self.run_quietly(mini_os.run))
+        self.assertEqual(mini_os.cpu_time, uninterrupted.cpu_time)
+        self.assertEqual(mini_os.get_metrics(), uninterrupted.get_metrics())
+
+    def test_read_lines_joins_lines_split_across_chunks(self):
+        path = os.path.join(self.directory, 'lines.txt')
+        with open(path, 'w') as f:
+            f.write('0, 1, 2\n\n10, 1, 2\n  \n20, 3')
+
+        for chunk_size in (1, 3, 7, 64):
+            self.assertEqual(list(MiniOS._read_lines(path, chunk_size)), ['0, 1, 2', '', '10, 1, 2', '  ', '20, 3'])
+
+        with open(path, 'a') as f:
+            f.write('\n')
+        self.assertEqual(list(MiniOS._read_lines(path, 4)), ['0, 1, 2', '', '10, 1, 2', '  ', '20, 3', ''])
+
+    def test_loader_tolerates_blank_and_unterminated_rows(self):
+        with open(self.processes_path, 'w') as f:
+            f.write('\n0, 1, 1, 1, 0, 0, 0, 0\n\n   \n1, 1, 1, 1, 0, 0, 0, 0\n2, 1, 1, 1, 0, 0, 0, 0')
+
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        mini_os.load_processes(self.processes_path, chunk_size=5)
+        mini_os.cpu_time = 2
+        mini_os.feed_arrivals()
+        self.assertEqual([process.pid for _, _, process in sorted(mini_os.arrivals)], ['p0', 'p1', 'p2'], 'blank rows do not take a pid')
+        self.assertEqual(mini_os.loader_stats['rows'], 3)
+
+        mini_os.cpu_time = 0
+        self.run_quietly(mini_os.run)
+        self.assertEqual(mini_os.get_metrics()['finished'], 3)
+
+    def test_loader_pulls_rows_up_to_the_current_tick(self):
+        self.write_processes([(0, 1), (0, 1), (5, 1), (10, 1), (20, 1)])
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        mini_os.load_processes(self.processes_path, chunk_size=8)
+
+        # one row past the current tick is read to know nothing else arrives before it
+        self.assertEqual([start for start, _, _ in sorted(mini_os.arrivals)], [0, 0, 5])
+        self.assertEqual(mini_os.loader_stats['rows'], 3)
+
+        mini_os.cpu_time = 4
+        mini_os.feed_arrivals()
+        self.assertEqual(mini_os.loader_stats['rows'], 3, 'nothing is read before the last row arrives')
+
+        mini_os.cpu_time = 5
+        mini_os.feed_arrivals()
+        self.assertEqual(mini_os.loader_stats['rows'], 4)
+
+        mini_os.cpu_time = 20
+        mini_os.feed_arrivals()
+        self.assertEqual(mini_os.loader_stats['rows'], 5)
+        self.assertIsNone(mini_os.loader, 'the loader is dropped once the trace ends')
+
+    def test_loader_throughput_is_reported(self):
+        self.write_processes([(0, 1), (1, 1), (2, 1)])
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.assertEqual(mini_os.loader_throughput, 0.0)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            mini_os.start(self.processes_path, self.files_path)
+        self.assertEqual(mini_os.loader_stats['rows'], 3)
+        self.assertGreater(mini_os.loader_stats['seconds'], 0)
+        self.assertAlmostEqual(mini_os.loader_throughput, 3 / mini_os.loader_stats['seconds'])
+        self.assertIn(f'LOADED PROCESSES: 3 ({mini_os.loader_throughput:.0f} rows/s)', output.getvalue())
+
+        mini_os.loader_stats = {'rows': 10, 'seconds': 0.5}
+        self.assertEqual(mini_os.loader_throughput, 20.0)
+
+    def test_spawn_and_admission_errors_follow_the_verbosity(self):
+        with open(self.processes_path, 'w') as f:
+            f.write('0, 1, 1, 100, 0, 0, 0, 0\n0, 1, 1, 1, 0, 0, 1, 0\n0, 1, 1, 1, 0, 0, 0, 0\n')
+
+        for verbosity, printed in ((MiniOS.VERBOSITY_QUIET, False), (MiniOS.VERBOSITY_SUMMARY, False), (MiniOS.VERBOSITY_FULL, True)):
+            mini_os = MiniOS(time_scale=0, user_memory_blocks=10, verbosity=verbosity, storage='memory')
+            # no modem for the second process to request
+            mini_os.resource_manager = ResourceManager(scanners=1, printers=1, modems=0, sata_devices=1)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertTrue(mini_os.start(self.processes_path, self.files_path))
+
+            self.assertEqual('ERROR::' in output.getvalue(), printed, verbosity)
+            self.assertIn('FAILED: 1 spawns, 1 admissions', output.getvalue())
+            self.assertEqual(mini_os.get_metrics()['spawn_failures'], 1)
+            self.assertEqual(mini_os.get_metrics()['admission_failures'], 1)
+            self.assertEqual(mini_os.get_metrics()['finished'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
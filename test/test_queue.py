@@ -0,0 +1,72 @@
+import unittest
+
+from src.process_module import Process
+from src.queue_module import QueueManager
+
+class TestQueue(unittest.TestCase):
+
+    def test_highest_priority_process_runs_first(self):
+        qm = QueueManager()
+        user = Process('p0', priority=3, cpu_time=2)
+        realtime = Process('p1', priority=0, cpu_time=1)
+        qm.add_process(user)
+        qm.add_process(realtime)
+
+        self.assertIs(qm.get_active_process(), realtime)
+        qm.run_processes()
+        self.assertIs(qm.get_active_process(), user, 'finished processes leave the queues')
+        qm.run_processes()
+        qm.run_processes()
+        self.assertIsNone(qm.get_active_process())
+        self.assertEqual(len(qm), 0)
+
+    def test_waiting_processes_are_promoted(self):
+        qm = QueueManager(aging=1, max_process_age=2)
+        running = Process('p0', priority=1, cpu_time=10)
+        waiting = Process('p1', priority=3, cpu_time=1)
+        qm.add_process(running)
+        qm.add_process(waiting)
+
+        # the age of p1 exceeds max_process_age after 3 ticks
+        for _ in range(3):
+            qm.run_processes()
+        self.assertEqual(qm.get_level(waiting), 2, 'waiting process is promoted once')
+        self.assertEqual(qm.get_level(running), 1, 'running process is not promoted')
+
+        for _ in range(3):
+            qm.run_processes()
+        self.assertEqual(qm.get_level(waiting), 1)
+        self.assertEqual(qm.get_queue(1), [running, waiting], 'promoted processes join the tail of the level')
+
+    def test_removed_processes_are_skipped(self):
+        qm = QueueManager()
+        processes = [Process(f'p{i}', priority=2, cpu_time=1) for i in range(3)]
+        for process in processes:
+            qm.add_process(process)
+
+        qm.remove_process(processes[0])
+        qm.remove_process(processes[1])
+        self.assertIs(qm.get_active_process(), processes[2])
+        self.assertEqual(qm.get_queue(2), [processes[2]])
+
+    def test_quanta_rotate_processes_of_a_level(self):
+        qm = QueueManager(aging=0, quanta={2: 2})
+        processes = [Process(f'p{i}', priority=2, cpu_time=3) for i in range(2)]
+        realtime = Process('p2', priority=0, cpu_time=2)
+        for process in processes + [realtime]:
+            qm.add_process(process)
+
+        qm.run_processes()
+        qm.run_processes()
+        self.assertIs(qm.get_active_process(), processes[0], 'levels without a quantum run to completion')
+
+        ran = []
+        for _ in range(6):
+            ran.append(qm.get_active_process().pid)
+            qm.run_processes()
+        self.assertEqual(ran, ['p0', 'p0', 'p1', 'p1', 'p0', 'p1'])
+        self.assertEqual(len(qm), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from src.cpu_module import CPUManager
+from src.process_module import Process
+from src.resource_module import ResourceManager
+
+class TestResource(unittest.TestCase):
+
+    def test_acquire_takes_all_or_nothing(self):
+        rm = ResourceManager(scanners=1, printers=1, modems=0, sata_devices=1)
+        first = Process('p0', priority=3, printer=1, disk=1)
+        second = Process('p1', priority=3, scanner=1, printer=1)
+
+        self.assertTrue(rm.acquire(first))
+        self.assertFalse(rm.has_resource_available('printers'))
+        self.assertFalse(rm.acquire(second), 'the printer is taken')
+        self.assertTrue(rm.has_resource_available('scanners'), 'waiting processes hold no resources')
+        self.assertEqual(rm.blocked[second], 'printers')
+
+        self.assertFalse(rm.can_satisfy(Process('p2', priority=3, modem=1)), 'there is no modem')
+        self.assertTrue(rm.acquire(Process('p3', priority=0, printer=1)), 'realtime processes use no resources')
+
+    def test_release_wakes_waiters_by_priority(self):
+        rm = ResourceManager(scanners=0, printers=2, modems=0, sata_devices=0)
+        cm = CPUManager(cores=1)
+        holders = [Process(f'p{i}', priority=3, printer=1) for i in range(2)]
+        low = Process('p2', priority=3, printer=1)
+        high = Process('p3', priority=1, printer=1)
+
+        for process in holders:
+            self.assertTrue(rm.acquire(process))
+        for process in (low, high):
+            self.assertFalse(rm.acquire(process))
+            cm.park(process)
+        self.assertEqual(len(cm), 0, 'parked processes are out of the queues')
+
+        self.assertEqual(rm.release(holders[0]), [high], 'the higher priority waiter goes first')
+        self.assertTrue(cm.wake(high))
+        self.assertFalse(cm.wake(high), 'woken processes are no longer parked')
+        self.assertEqual(cm.get_active_processes(), [high])
+
+        self.assertEqual(rm.release(holders[1]), [low])
+        self.assertEqual(rm.release(high), [])
+        self.assertEqual(len(rm.free['printers']), 1)
+
+if __name__ == '__main__':
+    unittest.main()
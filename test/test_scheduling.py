@@ -0,0 +1,81 @@
+import unittest
+
+from src.process_module import Process
+from src.scheduling_module import LotteryScheduler, SCHEDULERS, ShortestJobScheduler, StrideScheduler, create_scheduler
+
+class TestScheduling(unittest.TestCase):
+
+    def run_to_completion(self, scheduler):
+        finished = []
+        while len(scheduler):
+            process = scheduler.run_processes()
+            if process is not None:
+                finished.append((process.pid, scheduler.cpu_time))
+        return finished
+
+    def test_shortest_job_first(self):
+        scheduler = ShortestJobScheduler()
+        for pid, cpu_time in (('p0', 4), ('p1', 2), ('p2', 1)):
+            scheduler.add_process(Process(pid, priority=1, cpu_time=cpu_time))
+
+        self.assertEqual(scheduler.get_active_process().pid, 'p2')
+        self.assertEqual(scheduler.run_processes().pid, 'p2')
+        scheduler.add_process(Process('p3', priority=1, cpu_time=1))
+        self.assertEqual(self.run_to_completion(scheduler), [('p3', 2), ('p1', 4), ('p0', 8)])
+
+    def test_shortest_job_keeps_the_cpu_without_preemption(self):
+        for preemptive, expected in ((False, [('p0', 3), ('p1', 4)]), (True, [('p1', 2), ('p0', 4)])):
+            scheduler = ShortestJobScheduler(preemptive)
+            scheduler.add_process(Process('p0', priority=1, cpu_time=3))
+            scheduler.run_processes()
+            scheduler.add_process(Process('p1', priority=1, cpu_time=1))
+            self.assertEqual(self.run_to_completion(scheduler), expected)
+
+    def test_lottery_share_follows_tickets(self):
+        scheduler = LotteryScheduler(seed=1)
+        realtime = Process('p0', priority=0, cpu_time=10_000)
+        user = Process('p1', priority=3, cpu_time=10_000)
+        scheduler.add_process(realtime)
+        scheduler.add_process(user)
+
+        runs = [scheduler.get_active_process() for _ in range(3)]
+        self.assertTrue(runs[0] is runs[1] is runs[2], 'the draw holds for the whole tick')
+
+        wins = {realtime: 0, user: 0}
+        for _ in range(3300):
+            wins[scheduler.get_active_process()] += 1
+            scheduler.run_processes()
+        self.assertAlmostEqual(wins[realtime] / 3300, 32 / 33, delta=0.02)
+
+        scheduler.remove_process(realtime)
+        self.assertIs(scheduler.get_active_process(), user)
+        self.assertEqual(scheduler.free_slots, [0], 'slots are reused')
+
+    def test_stride_share_is_exact(self):
+        scheduler = StrideScheduler()
+        processes = [Process(f'p{priority}', priority=priority, cpu_time=1000) for priority in (1, 2)]
+        for process in processes:
+            scheduler.add_process(process)
+
+        wins = {process: 0 for process in processes}
+        for _ in range(300):
+            wins[scheduler.get_active_process()] += 1
+            scheduler.run_processes()
+        self.assertEqual([wins[process] for process in processes], [200, 100])
+
+    def test_every_policy_runs_every_process(self):
+        for policy in SCHEDULERS:
+            scheduler = create_scheduler(policy, seed=3)
+            processes = [Process(f'p{i}', priority=i % 4, cpu_time=i % 5 + 1) for i in range(20)]
+            for process in processes:
+                scheduler.add_process(process)
+
+            finished = self.run_to_completion(scheduler)
+            self.assertEqual(sorted(pid for pid, _ in finished), sorted(process.pid for process in processes), policy)
+            self.assertEqual(scheduler.cpu_time, sum(i % 5 + 1 for i in range(20)), policy)
+
+        with self.assertRaises(ValueError):
+            create_scheduler('fair_share')
+
+if __name__ == '__main__':
+    unittest.main()
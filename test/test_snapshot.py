@@ -0,0 +1,168 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from src.filesystem_module import FileSystemManager
+from src.mini_os import MiniOS
+from src.process_module import Process
+from src.scheduling_module import SCHEDULERS
+from src.snapshot_module import Snapshot
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.processes_path = os.path.join(self.directory, 'processes.txt')
+        self.files_path = os.path.join(self.directory, 'files.txt')
+        with open(self.processes_path, 'w') as f:
+            for index in range(12):
+                f.write(f'{index}, {index % 4}, {index % 3 + 1}, {index + 1}, {index % 2}, 0, 0, {index % 2}\n')
+        with open(self.files_path, 'w') as f:
+            f.write('10\n2\nX, 0, 2\nY, 4, 3\n')
+
+    def run_quietly(self, function, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args)
+
+    def test_restored_run_matches_uninterrupted_run(self):
+        mini_os = MiniOS(time_scale=0, cores=2, verbosity=MiniOS.VERBOSITY_QUIET)
+        self.assertFalse(self.run_quietly(mini_os.start, self.processes_path, self.files_path, 6))
+        path = os.path.join(self.directory, 'snapshot')
+        mini_os.snapshot(path)
+        self.assertTrue(self.run_quietly(mini_os.run))
+
+        restored = MiniOS(verbosity=MiniOS.VERBOSITY_QUIET)
+        restored.restore(path)
+        self.assertEqual(restored.cpu_time, 6)
+        self.assertEqual(sorted(restored.filesystem_manager.paths), ['X', 'Y'])
+        self.assertTrue(self.run_quietly(restored.run))
+
+        self.assertEqual(restored.get_metrics(), mini_os.get_metrics())
+        self.assertEqual(restored.cpu_manager.get_core_stats(), mini_os.cpu_manager.get_core_stats())
+
+    def test_every_scheduling_policy_is_restored(self):
+        for scheduler in SCHEDULERS:
+            mini_os = MiniOS(time_scale=0, cores=2, verbosity=MiniOS.VERBOSITY_QUIET, scheduler=scheduler, seed=5)
+            self.assertFalse(self.run_quietly(mini_os.start, self.processes_path, self.files_path, 7))
+            path = os.path.join(self.directory, scheduler)
+            mini_os.snapshot(path)
+            self.assertTrue(self.run_quietly(mini_os.run))
+
+            restored = MiniOS(verbosity=MiniOS.VERBOSITY_QUIET)
+            restored.restore(path)
+            self.assertEqual(restored.cpu_manager.scheduler, scheduler)
+            self.assertTrue(self.run_quietly(restored.run))
+            self.assertEqual(restored.get_metrics(), mini_os.get_metrics(), scheduler)
+
+    def test_incremental_snapshot_writes_changed_sections(self):
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET)
+        self.run_quietly(mini_os.start, self.processes_path, self.files_path, 4)
+        base = os.path.join(self.directory, 'base')
+        self.assertEqual(mini_os.snapshot(base), len(Snapshot.SECTIONS))
+
+        self.run_quietly(mini_os.run, 8)
+        increment = os.path.join(self.directory, 'increment')
+        written = mini_os.snapshot(increment, incremental=True)
+        self.assertLess(written, len(Snapshot.SECTIONS), 'configuration and files did not change')
+        full = os.path.join(self.directory, 'full')
+        mini_os.snapshot(full)
+        self.assertLess(os.path.getsize(increment), os.path.getsize(full))
+        self.run_quietly(mini_os.run)
+
+        restored = MiniOS(verbosity=MiniOS.VERBOSITY_QUIET)
+        restored.restore(increment)
+        self.assertEqual(restored.cpu_time, 8)
+        self.run_quietly(restored.run)
+        self.assertEqual(restored.get_metrics(), mini_os.get_metrics())
+
+    def test_incremental_snapshot_cannot_overwrite_its_parent(self):
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.run_quietly(mini_os.start, self.processes_path, self.files_path, 4)
+        first = os.path.join(self.directory, 'first')
+        second = os.path.join(self.directory, 'second')
+        mini_os.snapshot(first)
+        with self.assertRaises(ValueError):
+            mini_os.snapshot(first, incremental=True)
+
+        self.run_quietly(mini_os.run, 6)
+        mini_os.snapshot(second, incremental=True)
+        with self.assertRaises(ValueError, msg='first is the parent of second'):
+            mini_os.snapshot(first, incremental=True)
+
+        restored = MiniOS(verbosity=MiniOS.VERBOSITY_QUIET)
+        restored.restore(second)
+        self.assertEqual(restored.cpu_time, 6, 'refused snapshots leave the files as they were')
+        with self.assertRaises(ValueError, msg='restored snapshots know their chain'):
+            restored.snapshot(second, incremental=True)
+
+    def test_virtual_memory_is_not_silently_dropped(self):
+        paged = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory', virtual_memory='lru')
+        self.run_quietly(paged.start, self.processes_path, self.files_path, 4)
+        path = os.path.join(self.directory, 'paged')
+        with self.assertRaises(ValueError):
+            paged.snapshot(path)
+        self.assertFalse(os.path.exists(path))
+
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.run_quietly(mini_os.start, self.processes_path, self.files_path, 4)
+        mini_os.snapshot(path)
+        paged.restore(path)
+        self.assertIsNone(paged.virtual_memory_manager, 'restored runs hold contiguous memory')
+        self.run_quietly(paged.run)
+        self.run_quietly(mini_os.run)
+        self.assertEqual(paged.get_metrics(), mini_os.get_metrics())
+
+    def test_memory_storage_content_is_restored(self):
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET, storage='memory')
+        self.run_quietly(mini_os.start, self.processes_path, self.files_path, 4)
+        process = Process('test_suite', priority=Process.TYPE_REALTIME)
+        # write-back blocks only reach the storage when flushed
+        fsm = mini_os.filesystem_manager = FileSystemManager(base_dir='', blocks=16, block_size=4, cache_size=64, write_back=True, storage='memory')
+        self.assertTrue(fsm.create(b'cached', 'B', process))
+        self.assertTrue(fsm.dirty_paths)
+        path = os.path.join(self.directory, 'memory')
+        mini_os.snapshot(path)
+
+        restored = MiniOS(verbosity=MiniOS.VERBOSITY_QUIET)
+        restored.restore(path)
+        self.assertEqual(restored.filesystem_manager.storage.name, 'memory')
+        self.assertEqual(restored.filesystem_manager.read('B'), (b'cached', True))
+
+        restored = MiniOS(verbosity=MiniOS.VERBOSITY_QUIET)
+        mini_os.filesystem_manager = FileSystemManager(base_dir='', blocks=16, block_size=4, storage='memory')
+        mini_os.filesystem_manager.create(b'hi', 'A', process)
+        mini_os.filesystem_manager.load_block('X', 8, 2)
+        mini_os.snapshot(path)
+        restored.restore(path)
+        self.assertEqual(restored.filesystem_manager.read('A'), (b'hi', True))
+        self.assertEqual(restored.filesystem_manager.read('X'), (b'', False), 'files without content stay without it')
+
+    def test_long_incremental_chains_are_read(self):
+        base = os.path.join(self.directory, 'chain0')
+        Snapshot.write(base, {id: b'base' for id in Snapshot.SECTIONS})
+        parent = base
+        for index in range(1, 1500):
+            path = os.path.join(self.directory, f'chain{index}')
+            Snapshot.write(path, {Snapshot.SECTION_CLOCK: str(index).encode()}, parent)
+            parent = path
+
+        sections = Snapshot.read(parent)
+        self.assertEqual(sections[Snapshot.SECTION_CLOCK], b'1499')
+        self.assertEqual(sections[Snapshot.SECTION_CONFIG], b'base')
+        self.assertEqual(len(Snapshot.get_chain(parent)), 1500)
+
+    def test_looping_parent_chains_are_rejected(self):
+        first = os.path.join(self.directory, 'first')
+        second = os.path.join(self.directory, 'second')
+        Snapshot.write(second, {id: b'' for id in Snapshot.SECTIONS})
+        Snapshot.write(first, {}, second)
+        Snapshot.write(second, {}, first)
+        with self.assertRaises(ValueError):
+            Snapshot.read(first)
+        with self.assertRaises(ValueError):
+            Snapshot.write(first, {}, first)
+
+if __name__ == '__main__':
+    unittest.main()
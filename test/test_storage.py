@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from src.storage_module import DiskImageStorage, HostDirectoryStorage, MemoryStorage
+
+class TestStorage(unittest.TestCase):
+
+    def get_storages(self):
+        directory = tempfile.mkdtemp()
+        return [
+            (HostDirectoryStorage(), os.path.join(directory, 'host', 'a')),
+            (DiskImageStorage(os.path.join(directory, 'sda1.img'), 8, 4), 'a'),
+            (MemoryStorage(), 'a'),
+        ]
+
+    def test_round_trip(self):
+        for storage, path in self.get_storages():
+            storage.store(path, 1, b'abcdef')
+            self.assertTrue(storage.contains(path, 1), storage.name)
+            self.assertEqual(storage.load(path, 1, 6), b'abcdef', storage.name)
+
+            storage.store_at(path, 1, 4, b'EFGH')
+            self.assertEqual(storage.load(path, 1, 8), b'abcdEFGH', storage.name)
+
+            storage.move(path, 1, 4, 8)
+            self.assertEqual(storage.load(path, 4, 8), b'abcdEFGH', storage.name)
+
+            self.assertTrue(storage.remove(path, 4), storage.name)
+            storage.close()
+
+    def test_memory_storage_is_keyed_by_extent(self):
+        storage = MemoryStorage()
+        storage.store('a', 0, b'aaaa')
+        storage.store('a', 2, b'bbbb')
+        storage.move('a', 0, 6, 2)
+        self.assertEqual(sorted(storage.extents), [2, 6])
+        self.assertEqual(storage.load('a', 6, 4), b'aa', 'moves keep only the bytes asked for')
+
+        view = storage.load('a', 2, 4, copy=False)
+        storage.store_at('a', 2, 2, b'cccc')
+        self.assertEqual(view.tobytes(), b'bbbb', 'views stay valid when the content grows')
+        self.assertEqual(storage.load('a', 2, 6), b'bbcccc')
+
+        self.assertFalse(storage.remove('a', 0))
+        with self.assertRaises(FileNotFoundError):
+            storage.load('a', 0, 4)
+
+    def test_disk_image_closes_with_views_held(self):
+        path = os.path.join(tempfile.mkdtemp(), 'sda1.img')
+        storage = DiskImageStorage(path, 8, 4)
+        storage.store('a', 1, b'abcd')
+        view = storage.load('a', 1, 4, copy=False)
+
+        storage.close()
+        storage.close()
+        self.assertEqual(view.tobytes(), b'abcd', 'held views outlive the storage')
+        view.release()
+
+        reopened = DiskImageStorage(path, 8, 4)
+        self.assertEqual(reopened.load('a', 1, 4), b'abcd', 'blocks are flushed on close')
+        reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
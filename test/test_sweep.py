@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+from src.sweep_module import expand_grid, run_scenario
+
+class TestSweep(unittest.TestCase):
+
+    def test_scenarios_report_metrics(self):
+        directory = tempfile.mkdtemp()
+        processes_path = os.path.join(directory, 'processes.txt')
+        files_path = os.path.join(directory, 'files.txt')
+        with open(processes_path, 'w') as f:
+            f.write('0, 1, 3, 8, 0, 0, 0, 0\n0, 1, 2, 8, 0, 0, 0, 0\n1, 3, 1, 2000, 0, 0, 0, 0\n')
+        with open(files_path, 'w') as f:
+            f.write('10\n0\n')
+
+        scenarios = list(expand_grid({'cores': [1, 2], 'aging': [1]}, [(processes_path, files_path)]))
+        self.assertEqual([scenario['cores'] for scenario in scenarios], [1, 2])
+
+        single, dual = map(run_scenario, scenarios)
+        self.assertEqual(single['makespan'], 5)
+        self.assertEqual(single['average_turnaround'], 4.0)
+        self.assertEqual(single['average_wait'], 1.5)
+        self.assertEqual(single['spawn_failures'], 1, 'the last process does not fit in memory')
+        self.assertEqual(dual['makespan'], 3, 'both processes run at once')
+        self.assertEqual(dual['average_wait'], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
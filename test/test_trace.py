@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from src.async_filesystem_module import AsyncFileSystemManager
+from src.cpu_module import CPUManager
+from src.filesystem_module import FileSystemManager
+from src.process_module import Process
+from src.trace_module import TraceRecorder
+
+class TestTrace(unittest.TestCase):
+
+    def test_summary_and_chrome_trace(self):
+        tracer = TraceRecorder()
+        cm = CPUManager(cores=1)
+        cm.set_tracer(tracer)
+
+        user = Process('p0', priority=3, cpu_time=2)
+        realtime = Process('p1', priority=0, cpu_time=1)
+        tracer.record(TraceRecorder.EVENT_ARRIVAL, user.pid)
+        cm.add_process(user)
+        cm.run_processes()
+
+        tracer.clock = 1
+        tracer.record(TraceRecorder.EVENT_ARRIVAL, realtime.pid)
+        cm.add_process(realtime)
+        while len(cm):
+            cm.run_processes()
+            tracer.clock += 1
+
+        kinds = [kind for _, kind, _, _, _ in tracer.events()]
+        self.assertEqual(kinds.count(TraceRecorder.EVENT_PREEMPT), 1, 'p1 preempts p0')
+        self.assertEqual(tracer.get_process_summary(), {
+            'p1': {'arrival': 1, 'finish': 2, 'running': 1, 'wait': 0, 'turnaround': 1},
+            'p0': {'arrival': 0, 'finish': 3, 'running': 2, 'wait': 1, 'turnaround': 3},
+        })
+
+        slices = [event for event in tracer.to_chrome_trace(tick_us=10)['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual([(event['name'], event['ts'], event['dur']) for event in slices], [('p0', 0, 10), ('p1', 10, 10), ('p0', 20, 10)])
+
+    def test_ring_buffer_keeps_newest_events(self):
+        tracer = TraceRecorder(capacity=4)
+        for value in range(6):
+            tracer.record(TraceRecorder.EVENT_ALLOCATE, 'p0', value)
+
+        self.assertEqual(len(tracer), 4)
+        self.assertEqual(tracer.dropped, 2)
+        self.assertEqual([value for _, _, _, value, _ in tracer.events()], [2, 3, 4, 5])
+
+    def test_file_operations_are_recorded(self):
+        tracer = TraceRecorder()
+        fsm = FileSystemManager(base_dir='', blocks=8, block_size=4, storage='memory')
+        fsm.tracer = tracer
+        process = Process(pid='test_suite', priority=Process.TYPE_REALTIME)
+
+        fsm.create(b'abcd', 'a', process)
+        fsm.append('a', b'ef')
+        fsm.write_at('a', 0, b'A')
+        fsm.read('a')
+        fsm.read('missing')
+        fsm.delete('a', process)
+
+        afsm = AsyncFileSystemManager(fsm)
+        async def run():
+            await afsm.create(b'xy', 'b', process)
+            return await afsm.read('b')
+        asyncio.run(run())
+        afsm.close()
+
+        self.assertEqual([(TraceRecorder.EVENT_NAMES[kind], subject, value) for _, kind, subject, value, _ in tracer.events()], [
+            ('file_write', 'a', 4),
+            ('file_write', 'a', 2),
+            ('file_write', 'a', 1),
+            ('file_read', 'a', 6),
+            ('file_delete', 'a', 0),
+            ('file_write', 'b', 2),
+            ('file_read', 'b', 2),
+        ])
+        threads = {event['args']['subject']: event['tid'] for event in tracer.to_chrome_trace()['traceEvents'] if event.get('cat') == 'event'}
+        self.assertEqual(set(threads.values()), {TraceRecorder.THREAD_FILESYSTEM})
+
+if __name__ == '__main__':
+    unittest.main()
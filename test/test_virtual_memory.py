@@ -0,0 +1,85 @@
+import unittest
+
+from src.filesystem_module import FileSystemManager
+from src.process_module import Process
+from src.virtual_memory_module import VirtualMemoryManager
+
+class TestVirtualMemory(unittest.TestCase):
+
+    def count_faults(self, policy, references):
+        vmm = VirtualMemoryManager(frames=3, policy=policy)
+        process = Process('p0', priority=3, memory_blocks=8)
+        vmm.add_process(process)
+        for now, page in enumerate(references):
+            vmm.tick(now)
+            self.assertTrue(vmm.access(process, page))
+        return vmm.get_process_stats(process)['faults']
+
+    def test_policies(self):
+        references = [0, 1, 2, 0, 3, 0, 4, 0, 1]
+        self.assertEqual(self.count_faults('fifo', references), 7)
+        self.assertEqual(self.count_faults('lru', references), 6, 'page 0 stays resident as it is used often')
+        self.assertEqual(self.count_faults('clock', references), 7)
+
+    def test_dirty_pages_go_to_swap(self):
+        fsm = FileSystemManager(blocks=8, block_size=1)
+        vmm = VirtualMemoryManager(frames=1)
+        vmm.attach_swap(fsm, 2)
+        self.assertEqual(fsm.reserved[VirtualMemoryManager.SWAP_PATH].length, 2, 'swap blocks are taken from the disk')
+        self.assertEqual(fsm.max_available_blocks, 6)
+
+        process = Process('p0', priority=3, memory_blocks=4)
+        vmm.add_process(process)
+        self.assertTrue(vmm.access(process, 0, write=True))
+        self.assertTrue(vmm.access(process, 1, write=True))
+        self.assertTrue(vmm.access(process, 0))
+        self.assertTrue(vmm.access(process, 2, write=True))
+        self.assertFalse(vmm.access(process, 3), 'page 2 is dirty and swap is full')
+
+        stats = vmm.get_stats()
+        self.assertEqual((stats['swap_outs'], stats['swap_ins'], stats['failed_faults']), (2, 1, 1))
+        self.assertEqual(vmm.get_process_stats(process)['peak_resident'], 1)
+
+        vmm.remove_process(process)
+        self.assertEqual(vmm.get_stats()['swap_used'], 0)
+        self.assertEqual(vmm.process_stats['p0']['faults'], 4)
+
+    def test_swap_is_not_a_file(self):
+        fsm = FileSystemManager(base_dir='', blocks=8, block_size=1, defragment=True, storage='memory')
+        process = Process('test_suite', priority=Process.TYPE_REALTIME)
+        fsm.create(b'a', 'a', process)
+        vmm = VirtualMemoryManager(frames=1)
+        vmm.attach_swap(fsm, 2)
+        fsm.create(b'd', 'd', process)
+        fsm.create(b'b', 'b', process)
+        self.assertTrue(fsm.delete('a', process))
+        self.assertTrue(fsm.delete('d', process))
+
+        self.assertEqual(sorted(fsm.paths), ['b'])
+        self.assertEqual(fsm.listdir(), ['b'])
+        self.assertFalse(fsm.create(b'x', VirtualMemoryManager.SWAP_PATH, process), 'the label cannot be taken by a file')
+
+        # compacting moves b into the gap left by d, the swap stays where its slots are
+        self.assertTrue(fsm.create(b'c' * 4, 'c', process))
+        self.assertEqual(fsm.reserved[VirtualMemoryManager.SWAP_PATH].start, 1)
+        self.assertEqual(fsm.paths['b'].start, 3)
+        self.assertEqual(fsm.read('b'), (b'b', True))
+        self.assertFalse(fsm.create(b'e' * 2, 'e', process), 'the gap before the swap cannot grow')
+
+        vmm.attach_swap(FileSystemManager(base_dir='', blocks=4, block_size=1, storage='memory'), 2)
+        self.assertEqual(fsm.reserved, {}, 'moving the swap releases its old blocks')
+        self.assertEqual(fsm.max_available_blocks, 3)
+
+    def test_working_set_releases_idle_pages(self):
+        vmm = VirtualMemoryManager(frames=4, policy='working_set', working_set_window=2)
+        process = Process('p0', priority=3, memory_blocks=4)
+        vmm.add_process(process)
+        vmm.access(process, 0)
+        vmm.tick(1)
+        vmm.access(process, 1)
+
+        vmm.tick(3)
+        self.assertEqual(vmm.get_process_stats(process)['resident'], 1, 'page 0 left the working set')
+
+if __name__ == '__main__':
+    unittest.main()
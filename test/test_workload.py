@@ -0,0 +1,66 @@
+import os
+import random
+import tempfile
+import unittest
+
+from lib.utils import get_random_bytes
+from src.mini_os import MiniOS
+from src.workload_module import Distribution, WorkloadGenerator
+
+class TestWorkload(unittest.TestCase):
+
+    def write_trace(self, directory, seed, **distributions):
+        generator = WorkloadGenerator(seed, **distributions)
+        generator.write_processes(os.path.join(directory, 'processes.txt'), 500)
+        generator.write_files(os.path.join(directory, 'files.txt'), 50, 400, operations=20, processes=500)
+        generator.write_payloads(os.path.join(directory, 'payloads'), 50, 400)
+
+        contents = []
+        for name in ('processes.txt', 'files.txt', os.path.join('payloads', 'F0')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                contents.append(f.read())
+        return contents
+
+    def test_same_seed_gives_identical_traces(self):
+        first = self.write_trace(tempfile.mkdtemp(), 42)
+        second = self.write_trace(tempfile.mkdtemp(), 42)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, self.write_trace(tempfile.mkdtemp(), 43))
+
+    def test_distributions(self):
+        rng = random.Random(0)
+        self.assertEqual(Distribution('constant:3').sample(rng), 3)
+        self.assertTrue(all(2 <= Distribution('uniform:2:5').sample(rng) <= 5 for _ in range(100)))
+        self.assertEqual({Distribution('choice:1/0,7').sample(rng) for _ in range(100)}, {7})
+        self.assertEqual({Distribution('bernoulli:1').sample(rng) for _ in range(10)}, {1})
+        with self.assertRaises(ValueError):
+            Distribution('normal:1:2')
+
+    def test_trace_is_valid(self):
+        directory = tempfile.mkdtemp()
+        self.write_trace(directory, 1, priority='choice:0,1', memory='constant:4')
+
+        with open(os.path.join(directory, 'processes.txt')) as f:
+            rows = [tuple(map(int, line.split(','))) for line in f]
+        self.assertEqual(len(rows), 500)
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows), 'processes arrive in order')
+        self.assertFalse(any(any(row[4:]) for row in rows if row[1] == 0), 'realtime processes request no devices')
+
+        with open(os.path.join(directory, 'files.txt')) as f:
+            lines = f.read().splitlines()
+        occupied = int(lines[1])
+        extents = [(int(start), int(size)) for _, start, size in (line.split(',') for line in lines[2:2 + occupied])]
+        for (start, size), (next_start, _) in zip(extents, extents[1:]):
+            self.assertLessEqual(start + size, next_start, 'files do not overlap')
+        self.assertEqual(os.path.getsize(os.path.join(directory, 'payloads', 'F0')), extents[0][1] * 512)
+
+        mini_os = MiniOS(time_scale=0, verbosity=MiniOS.VERBOSITY_QUIET)
+        mini_os.start(os.path.join(directory, 'processes.txt'), os.path.join(directory, 'files.txt'))
+        self.assertEqual(mini_os.get_metrics()['finished'] + mini_os.get_metrics()['spawn_failures'], 500)
+
+    def test_random_bytes_follow_the_generator(self):
+        self.assertEqual(get_random_bytes(64, random.Random(5)), get_random_bytes(64, random.Random(5)))
+        self.assertEqual(len(get_random_bytes(1000)), 1000)
+
+if __name__ == '__main__':
+    unittest.main()